@@ -0,0 +1,176 @@
+from cfn_init_local.cloudformation.models import DEFAULT_CONFIG_SET
+from cfn_init_local.utils.hash_utils import HashUtils
+
+CHECKPOINT_REPOSITORY = "cfn-init-local-checkpoint"
+CHECKPOINT_IMAGE_FORMAT = CHECKPOINT_REPOSITORY + ":{key}"
+# Synthetic configSets added to the served cfn-init block so each config can be run on its own
+STEP_CONFIG_SET_FORMAT = "cfn-init-local-step-{index}"
+ALL_STEPS_CONFIG_SET = "cfn-init-local-all"
+
+
+class CheckpointStep(object):
+    """A single config of a configSet along with the key of the checkpoint taken once it is applied"""
+
+    def __init__(self, index, config_name, key):
+        self._index = index
+        self._config_name = config_name
+        self._key = key
+
+    @property
+    def config_name(self):
+        """
+
+        :return: name of the config applied in this step
+        """
+        return self._config_name
+
+    @property
+    def config_set(self):
+        """
+
+        :return: name of the synthetic configSet running only this step's config
+        """
+        return STEP_CONFIG_SET_FORMAT.format(index=self._index)
+
+    @property
+    def key(self):
+        """
+        Cumulative hash of every config applied up to and including this step
+
+        :return: the key
+        """
+        return self._key
+
+    @property
+    def image(self):
+        """
+
+        :return: name of the checkpoint image taken after this step
+        """
+        return CHECKPOINT_IMAGE_FORMAT.format(key=self._key)
+
+
+class CheckpointPlan(object):
+    """How to run a resource's configs one at a time, starting from the deepest existing checkpoint"""
+
+    def __init__(self, resource, steps, start_index, start_image):
+        self._resource = resource
+        self._steps = steps
+        self._start_index = start_index
+        self._start_image = start_image
+
+    @property
+    def resource(self):
+        """
+        The resource with a synthetic configSet per step added to its cfn-init block
+
+        :return: the resource
+        """
+        return self._resource
+
+    @property
+    def steps(self):
+        """
+
+        :return: every step of the configSet
+        """
+        return self._steps
+
+    @property
+    def restored_steps(self):
+        """
+
+        :return: steps already applied in the start image
+        """
+        return self._steps[:self._start_index]
+
+    @property
+    def remaining_steps(self):
+        """
+
+        :return: steps that still have to be run
+        """
+        return self._steps[self._start_index:]
+
+    @property
+    def start_image(self):
+        """
+
+        :return: image to start the resource's container from
+        """
+        return self._start_image
+
+    @property
+    def config_sets(self):
+        """
+
+        :return: configSets that run every step at once, e.g. for the idempotency check
+        """
+        return [ALL_STEPS_CONFIG_SET]
+
+
+class CheckpointStore(object):
+    """
+    Snapshots containers into images after each config of a configSet is applied. The image of each
+    snapshot is tagged with the cumulative hash of the base image, EC2 metadata and the configs applied
+    so far, so a later run with the same leading configs can start from the deepest snapshot.
+    """
+
+    def __init__(self, docker_client):
+        self._client = docker_client
+
+    def plan(self, resource, metadata, image, image_id, config_set=DEFAULT_CONFIG_SET):
+        """
+        Plan checkpointed execution of a resource
+
+        :param resource: the resource
+        :param metadata: EC2 metadata served to the resource
+        :param image: image the resource runs in without checkpoints
+        :param image_id: id of that image
+        :param config_set: configSet to checkpoint
+        :return: the CheckpointPlan or None if the resource's configs can't be resolved
+        """
+        try:
+            config_names = resource.get_config_names(config_set)
+        except ValueError:
+            return None
+        steps = []
+        key = HashUtils.stable_hash(image_id, metadata)
+        for index, config_name in enumerate(config_names):
+            key = HashUtils.stable_hash(key, config_name, resource.get_config(config_name))
+            steps.append(CheckpointStep(index, config_name, key))
+
+        start_index, start_image = 0, image
+        for index in range(len(steps), 0, -1):
+            if self._client.image_exists(steps[index - 1].image):
+                start_index, start_image = index, steps[index - 1].image
+                break
+
+        step_config_sets = {step.config_set: [step.config_name] for step in steps}
+        step_config_sets[ALL_STEPS_CONFIG_SET] = list(config_names)
+        return CheckpointPlan(resource.with_config_sets(step_config_sets), steps, start_index, start_image)
+
+    @staticmethod
+    def run(container, plan, **kwargs):
+        """
+        Run each remaining step of a plan, snapshotting the container after each one passes
+
+        :param container: container started from the plan's start image
+        :param plan: the CheckpointPlan
+        :param kwargs: passed through to each run of cfn-init
+        :return: the output of every step that was run
+        :raises Exception: the failure of the first step that fails
+        """
+        outputs = []
+        for step in plan.remaining_steps:
+            outputs.append(container.run_cfn_init([step.config_set], **kwargs))
+            container.commit(CHECKPOINT_REPOSITORY, step.key)
+        return "".join(outputs)
+
+    def clear(self):
+        """
+        Remove every checkpoint image
+
+        :return: number of images removed
+        """
+        return self._client.remove_images(CHECKPOINT_REPOSITORY)
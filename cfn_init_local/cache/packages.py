@@ -0,0 +1,102 @@
+import re
+import shlex
+
+PACKAGE_CACHE_VOLUME_PREFIX = "cfn-init-local-packages-"
+PACKAGE_CACHE_MOUNT = "/var/cfn-init-local/package-cache"
+PACKAGE_CACHE_LOCK = PACKAGE_CACHE_MOUNT + "/.lock"
+DEFAULT_MAX_SIZE_MB = 4096
+BYTES_PER_MB = 1024 * 1024
+# Where each package manager keeps what it downloads, by the name of its directory in the shared volume
+PACKAGE_CACHE_PATHS = {
+    "yum": "/var/cache/yum",
+    "dnf": "/var/cache/dnf",
+    "apt": "/var/cache/apt/archives",
+    "pip": "/root/.cache/pip"
+}
+# yum and dnf delete packages once installed and docker images of Debian and Ubuntu configure apt to do the same
+KEEP_PACKAGES_SCRIPT = "for conf in /etc/yum.conf /etc/dnf/dnf.conf; do [ -f $conf ] &&" \
+                       " sed -i -e '/^keepcache/d' -e '/^\\[main\\]/a keepcache=1' $conf; done;" \
+                       " rm -f /etc/apt/apt.conf.d/docker-clean; true"
+# Readers hold a shared lock and publishers an exclusive one, so packages are never read while being written
+SEED_SCRIPT_FORMAT = "flock -s {lock} sh -c {copy}"
+PUBLISH_SCRIPT_FORMAT = "flock {lock} sh -c {copy}"
+COPY_SCRIPT_FORMAT = "[ -d {source} ] && mkdir -p {destination} && cp -au {source}/. {destination}/;"
+# Removes the least recently used files until the shared cache is back under its max size
+PRUNE_SCRIPT_FORMAT = "total=$(du -sb {mount} | cut -f1); [ $total -le {max_bytes} ] ||" \
+                      " find {mount} -type f ! -name .lock -printf '%A@ %s %p\\n' | sort -n |" \
+                      " while read -r atime size path; do [ $total -le {max_bytes} ] && break;" \
+                      " rm -f \"$path\"; total=$((total - size)); done; true"
+VOLUME_NAME_PATTERN = re.compile(r"[^a-zA-Z0-9_.-]+")
+
+
+class PackageCache(object):
+    """
+    Package manager caches shared by the containers of every run, so packages are only downloaded once.
+
+    There is one docker volume per image family (by default the image, so packages are never shared between
+    distributions), mounted into every container. Each container seeds its package managers' caches from the
+    volume before cfn-init runs and publishes what it downloaded back once cfn-init passes, under a lock on the
+    volume. Package managers never write to the shared volume themselves, so containers can run concurrently
+    without corrupting it or contending for the package managers' own locks.
+    """
+
+    def __init__(self, docker_client, family=None, max_size_mb=DEFAULT_MAX_SIZE_MB):
+        """
+        :param docker_client: the DockerClient
+        :param family: name of the volume to share between every image. Each image has its own when not specified
+        :param max_size_mb: least recently used packages are removed from a volume once it grows past this size
+        """
+        self._client = docker_client
+        self._family = family
+        self._max_bytes = max_size_mb * BYTES_PER_MB
+
+    def volume(self, image):
+        """
+
+        :param image: image a container runs
+        :return: name of the volume holding the packages of the image's family
+        """
+        family = self._family if self._family is not None else image
+        return PACKAGE_CACHE_VOLUME_PREFIX + VOLUME_NAME_PATTERN.sub("-", family).strip("-")
+
+    @staticmethod
+    def seed(container):
+        """
+        Keep downloaded packages in a container and copy the shared packages into its package managers' caches
+
+        :param container: started container with the volume mounted
+        :raises DockerException: if seeding fails
+        """
+        copy = "".join(COPY_SCRIPT_FORMAT.format(source=PACKAGE_CACHE_MOUNT + "/" + name, destination=path)
+                       for name, path in PACKAGE_CACHE_PATHS.items())
+        script = "{}; {}".format(KEEP_PACKAGES_SCRIPT,
+                                 SEED_SCRIPT_FORMAT.format(lock=PACKAGE_CACHE_LOCK, copy=shlex.quote(copy + " true")))
+        container.execute(["/bin/sh", "-c", script])
+
+    def publish(self, container):
+        """
+        Copy the packages a container downloaded into the shared volume, then prune the volume to its max size
+
+        :param container: container cfn-init passed in
+        :raises DockerException: if publishing fails
+        """
+        copy = "".join(COPY_SCRIPT_FORMAT.format(source=path, destination=PACKAGE_CACHE_MOUNT + "/" + name)
+                       for name, path in PACKAGE_CACHE_PATHS.items())
+        copy += " " + PRUNE_SCRIPT_FORMAT.format(mount=PACKAGE_CACHE_MOUNT, max_bytes=self._max_bytes)
+        container.execute(["/bin/sh", "-c", PUBLISH_SCRIPT_FORMAT.format(lock=PACKAGE_CACHE_LOCK,
+                                                                          copy=shlex.quote(copy))])
+
+    def sizes(self):
+        """
+
+        :return: dict of the name of every package cache volume to its size in bytes (None if unknown)
+        """
+        return self._client.volume_sizes(PACKAGE_CACHE_VOLUME_PREFIX)
+
+    def clear(self):
+        """
+        Remove every package cache volume
+
+        :return: number of volumes removed
+        """
+        return self._client.remove_volumes(PACKAGE_CACHE_VOLUME_PREFIX)
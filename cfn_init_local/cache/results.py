@@ -0,0 +1,142 @@
+import json
+import os
+import time
+from cfn_init_local.utils.hash_utils import HashUtils
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "cfn-init-local")
+RESULTS_DIR_NAME = "results"
+RESULT_FILE_SUFFIX = ".json"
+DEFAULT_MAX_AGE_DAYS = 7
+DEFAULT_MAX_ENTRIES = 1000
+DEFAULT_MAX_RESULTS_SIZE_MB = 16
+BYTES_PER_MB = 1024 * 1024
+SECONDS_PER_DAY = 24 * 60 * 60
+
+
+class ResultCache(object):
+    """
+    Persistent on-disk cache of resources whose cfn-init passed.
+
+    Each passing result is stored as a small json file named after its key, so concurrent runs only
+    ever race on whole-file replaces.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_age_days=DEFAULT_MAX_AGE_DAYS,
+                 max_entries=DEFAULT_MAX_ENTRIES, max_size_mb=DEFAULT_MAX_RESULTS_SIZE_MB):
+        """
+        :param cache_dir: root cache directory. Results are kept in a subdirectory of it
+        :param max_age_days: results older than this are ignored and evicted
+        :param max_entries: max number of results kept. The oldest are evicted first
+        :param max_size_mb: max total size of the results kept. The oldest are evicted first
+        """
+        self._directory = os.path.join(cache_dir, RESULTS_DIR_NAME)
+        self._max_age = max_age_days * SECONDS_PER_DAY
+        self._max_entries = max_entries
+        self._max_bytes = max_size_mb * BYTES_PER_MB
+
+    @staticmethod
+    def key(cfn_init, metadata, image_id, config_set=None, settings=None):
+        """
+        Key identifying everything that can change the outcome of running cfn-init for a resource
+
+        :param cfn_init: the resource's cfn-init block
+        :param metadata: the EC2 metadata served to the resource
+        :param image_id: id (digest) of the image cfn-init runs in
+        :param config_set: the configSet run, if not cfn-init's default
+        :param settings: dict of the run settings that can change the outcome and differ from their defaults
+        :return: the key
+        """
+        # Optional parts are only hashed when set, so keys of runs without them are unchanged
+        parts = [cfn_init, metadata, image_id]
+        if config_set is not None:
+            parts.append(config_set)
+        if settings:
+            parts.append(settings)
+        return HashUtils.stable_hash(*parts)
+
+    def get(self, key):
+        """
+        Get the cached passing result for a key
+
+        :param key: the key
+        :return: the cached result (dict) or None if there is no unexpired result
+        """
+        path = self.__path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self._max_age:
+                return None
+            with open(path) as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key, stack, resource):
+        """
+        Record a passing result
+
+        :param key: the key
+        :param stack: name of the stack the resource belongs to
+        :param resource: name of the resource that passed
+        """
+        os.makedirs(self._directory, exist_ok=True)
+        path = self.__path(key)
+        tmp_path = "{}.{}.tmp".format(path, os.getpid())
+        with open(tmp_path, "w") as fh:
+            json.dump({"stack": stack, "resource": resource, "created": time.time()}, fh)
+        os.replace(tmp_path, path)
+
+    def clear(self):
+        """
+        Remove every cached result
+        """
+        for path, _, _ in self.__entries():
+            self.__remove(path)
+
+    def evict(self):
+        """
+        Remove results that are expired and then the oldest results until at most max_entries remain and they
+        take up at most max_size_mb
+
+        :return: number of results evicted
+        """
+        now = time.time()
+        entries = sorted(self.__entries(), key=lambda entry: entry[1], reverse=True)
+        evicted = kept = kept_bytes = 0
+        for path, mtime, size in entries:
+            if kept >= self._max_entries or kept_bytes + size > self._max_bytes or now - mtime > self._max_age:
+                self.__remove(path)
+                evicted += 1
+            else:
+                kept += 1
+                kept_bytes += size
+        return evicted
+
+    def __path(self, key):
+        return os.path.join(self._directory, key + RESULT_FILE_SUFFIX)
+
+    def __entries(self):
+        """
+        :return: (path, mtime, size) of every cached result
+        """
+        try:
+            names = os.listdir(self._directory)
+        except FileNotFoundError:
+            return []
+        entries = []
+        for name in names:
+            if not name.endswith(RESULT_FILE_SUFFIX):
+                continue
+            path = os.path.join(self._directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((path, stat.st_mtime, stat.st_size))
+        return entries
+
+    @staticmethod
+    def __remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
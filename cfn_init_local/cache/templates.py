@@ -0,0 +1,158 @@
+import hashlib
+import os
+import pickle
+import time
+from collections import namedtuple
+from cfn_init_local.cache.results import DEFAULT_CACHE_DIR, DEFAULT_MAX_AGE_DAYS, SECONDS_PER_DAY
+
+TEMPLATES_DIR_NAME = "templates"
+TEMPLATE_FILE_SUFFIX = ".pickle"
+# Bumped whenever what is cached changes shape, so entries written by other versions are ignored
+CACHE_FORMAT_VERSION = 1
+
+ParsedTemplate = namedtuple("ParsedTemplate", ["digest", "body", "cfn_init_index"])
+
+
+class TemplateCache(object):
+    """
+    Persistent on-disk cache of parsed templates, so templates that have not changed since the last run are not
+    parsed again.
+
+    There is one pickled entry per template file (and per way of parsing it), holding the template's modification
+    time, size and content hash along with its parsed body and the index of its resources using cfn-init. An
+    entry is used as is while the file's modification time and size are unchanged, and otherwise only if the
+    hash of its content still matches.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_age_days=DEFAULT_MAX_AGE_DAYS):
+        """
+        :param cache_dir: root cache directory. Templates are kept in a subdirectory of it
+        :param max_age_days: entries not used for this long are evicted
+        """
+        self._directory = os.path.join(cache_dir, TEMPLATES_DIR_NAME)
+        self._max_age = max_age_days * SECONDS_PER_DAY
+
+    @staticmethod
+    def digest(text):
+        """
+        Hash of the content of a template
+
+        :param text: content of the template
+        :return: sha256 hex digest
+        """
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def get(self, file_path, incremental=False, digest=None):
+        """
+        Get the parsed template cached for a file
+
+        :param file_path: path of the template
+        :param incremental: whether the template is decoded incrementally
+        :param digest: hash of the current content of the file. When not specified, the entry is only used if
+            the file's modification time and size are unchanged
+        :return: the ParsedTemplate or None if there is no entry or the file changed
+        """
+        entry_path = self.__path(file_path, incremental)
+        try:
+            with open(entry_path, "rb") as fh:
+                entry = pickle.load(fh)
+            if entry["format"] != CACHE_FORMAT_VERSION:
+                return None
+            if digest is None:
+                if entry["version"] != TemplateCache.__version(file_path):
+                    return None
+            elif entry["template"].digest != digest:
+                return None
+            os.utime(entry_path)
+            return entry["template"]
+        except Exception:
+            # Missing, unreadable or written by an incompatible version; parsing again is always safe
+            return None
+
+    def put(self, file_path, template, incremental=False):
+        """
+        Cache a parsed template
+
+        :param file_path: path of the template
+        :param template: the ParsedTemplate
+        :param incremental: whether the template was decoded incrementally
+        """
+        try:
+            os.makedirs(self._directory, exist_ok=True)
+            entry = {"format": CACHE_FORMAT_VERSION, "path": os.path.realpath(file_path),
+                     "version": TemplateCache.__version(file_path), "template": template}
+            entry_path = self.__path(file_path, incremental)
+            tmp_path = "{}.{}.tmp".format(entry_path, os.getpid())
+            with open(tmp_path, "wb") as fh:
+                pickle.dump(entry, fh, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, entry_path)
+        except OSError:
+            # The cache is only an optimization, e.g. the cache directory may be read only
+            pass
+
+    def clear(self):
+        """
+        Remove every cached template
+        """
+        for path, _ in self.__entries():
+            TemplateCache.__remove(path)
+
+    def evict(self):
+        """
+        Remove the entries that were not used for max_age_days
+
+        :return: number of entries evicted
+        """
+        now = time.time()
+        evicted = 0
+        for path, mtime in self.__entries():
+            if now - mtime > self._max_age:
+                TemplateCache.__remove(path)
+                evicted += 1
+        return evicted
+
+    def __path(self, file_path, incremental):
+        """
+
+        :param file_path: path of the template
+        :param incremental: whether the template is decoded incrementally
+        :return: path of the entry for the template
+        """
+        key = hashlib.sha256("{}\0{}".format(os.path.realpath(file_path), incremental).encode("utf-8")).hexdigest()
+        return os.path.join(self._directory, key + TEMPLATE_FILE_SUFFIX)
+
+    @staticmethod
+    def __version(file_path):
+        """
+
+        :param file_path: path of the template
+        :return: the modification time (ns) and size of the file
+        """
+        stat = os.stat(file_path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def __entries(self):
+        """
+        :return: (path, mtime) of every cached template
+        """
+        try:
+            names = os.listdir(self._directory)
+        except FileNotFoundError:
+            return []
+        entries = []
+        for name in names:
+            if not name.endswith(TEMPLATE_FILE_SUFFIX):
+                continue
+            path = os.path.join(self._directory, name)
+            try:
+                entries.append((path, os.path.getmtime(path)))
+            except OSError:
+                continue
+        return entries
+
+    @staticmethod
+    def __remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
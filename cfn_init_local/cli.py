@@ -1,11 +1,22 @@
 #!/usr/bin/env python3
 
+import sys
+from cfn_init_local.drivers.batch_driver import BatchDriver
 from cfn_init_local.drivers.run_driver import RunDriver
+from cfn_init_local.drivers.validate_driver import ValidateDriver
 
 
 def main():
     RunDriver().drive()
 
 
+def batch_main():
+    BatchDriver().drive()
+
+
+def validate_main():
+    sys.exit(1 if ValidateDriver().drive() else 0)
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,18 @@
+class EvaluationException(ValueError):
+    """Exception thrown when part of a template can not be evaluated"""
+
+    def __init__(self, msg, path=None):
+        super().__init__(msg)
+        self._msg = msg
+        self._path = path
+
+    @property
+    def path(self):
+        """
+
+        :return: json path of the node that could not be evaluated, if known
+        """
+        return self._path
+
+    def __str__(self):
+        return "{} (at {})".format(self._msg, self._path) if self._path else self._msg
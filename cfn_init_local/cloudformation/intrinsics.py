@@ -0,0 +1,311 @@
+import base64
+import re
+from functools import lru_cache
+from cfn_init_local.cloudformation.exceptions import EvaluationException
+
+NO_VALUE = "AWS::NoValue"
+DEFAULT_PSEUDO_PARAMETERS = {
+    "AWS::AccountId": "123456789012",
+    "AWS::NotificationARNs": [],
+    "AWS::Partition": "aws",
+    "AWS::Region": "us-east-1",
+    "AWS::URLSuffix": "amazonaws.com"
+}
+STACK_ID_FORMAT = "arn:{partition}:cloudformation:{region}:{account_id}:stack/{stack_name}/" \
+                  "00000000-0000-0000-0000-000000000000"
+# Values returned for Fn::GetAtt of resource attributes that are not passed in, since they only exist once deployed
+ATTRIBUTE_PLACEHOLDER_FORMAT = "{resource}.{attribute}"
+SUB_VARIABLE_PATTERN = re.compile(r"\$\{([^}]*)\}")
+SUB_CACHE_SIZE = 4096
+
+
+class _NoValue(object):
+    """Marker for AWS::NoValue, which removes the property or list item it is the value of"""
+
+    def __repr__(self):
+        return NO_VALUE
+
+
+_NO_VALUE = _NoValue()
+
+
+@lru_cache(maxsize=SUB_CACHE_SIZE)
+def compile_sub(template):
+    """
+    Split a Fn::Sub string into its literal text and variables. Compiled strings are cached, so strings
+    repeated across resources and templates are only parsed once.
+
+    :param template: the Fn::Sub string
+    :return: tuple of (is_variable, text) parts
+    """
+    parts = []
+    position = 0
+    for match in SUB_VARIABLE_PATTERN.finditer(template):
+        if match.start() > position:
+            parts.append((False, template[position:match.start()]))
+        name = match.group(1)
+        if name.startswith("!"):
+            # ${!Literal} is written out as ${Literal}
+            parts.append((False, "${" + name[1:] + "}"))
+        else:
+            parts.append((True, name.strip()))
+        position = match.end()
+    if position < len(template):
+        parts.append((False, template[position:]))
+    return tuple(parts)
+
+
+class IntrinsicEvaluator(object):
+    """
+    Resolves the intrinsic functions of a template (Ref, Fn::Sub, Fn::Join, Fn::GetAtt, Fn::FindInMap,
+    Fn::If, Fn::Select, Fn::Split, Fn::Base64 and conditions) the way CloudFormation would on deploy.
+
+    Conditions are evaluated at most once each and subtrees shared between resources (e.g. through YAML
+    anchors) are evaluated once, so evaluation is linear in the size of the template.
+    """
+
+    def __init__(self, template_body, stack_name, parameters=None, attributes=None):
+        """
+        :param template_body: the template (dict)
+        :param stack_name: name of the stack, for AWS::StackName and AWS::StackId
+        :param parameters: dict of parameter name to value. Pseudo parameters (e.g. AWS::Region) can be
+            overridden here too
+        :param attributes: dict of "LogicalId.Attribute" to the value of Fn::GetAtt for it
+        """
+        parameters = parameters or {}
+        self._template = template_body
+        self._attributes = attributes or {}
+        self._values = dict(DEFAULT_PSEUDO_PARAMETERS)
+        self._values["AWS::StackName"] = stack_name
+        self._values.update({name: value for name, value in parameters.items() if name.startswith("AWS::")})
+        self._values["AWS::StackId"] = parameters.get("AWS::StackId", STACK_ID_FORMAT.format(
+            partition=self._values["AWS::Partition"], region=self._values["AWS::Region"],
+            account_id=self._values["AWS::AccountId"], stack_name=stack_name))
+        self._values.update(self.__parameter_values(parameters))
+        self._resources = set(template_body.get("Resources", {}).keys())
+        self._conditions = {}
+        self._memo = {}
+
+    def __parameter_values(self, parameters):
+        """
+
+        :param parameters: dict of parameter name to value passed in
+        :return: dict of the name to value of every parameter that has a value
+        """
+        values = {}
+        for name, definition in self._template.get("Parameters", {}).items():
+            value = parameters.get(name, definition.get("Default"))
+            if value is None:
+                continue
+            if definition.get("Type", "").startswith("List<") or definition.get("Type") == "CommaDelimitedList":
+                value = value.split(",") if isinstance(value, str) else value
+            values[name] = value
+        return values
+
+    def evaluate(self, node, path="$"):
+        """
+        Resolve every intrinsic function in a node
+
+        :param node: part of the template
+        :param path: json path of the node, for errors
+        :return: the resolved node. None if it resolves to AWS::NoValue
+        """
+        value = self.__evaluate(node, path)
+        return None if value is _NO_VALUE else value
+
+    def condition(self, name):
+        """
+        Evaluate a condition of the template
+
+        :param name: name of the condition
+        :return: the boolean value of the condition
+        """
+        if name not in self._conditions:
+            definitions = self._template.get("Conditions", {})
+            if name not in definitions:
+                raise EvaluationException("Condition '{}' does not exist".format(name), "$.Conditions")
+            # Guards against conditions that reference each other in a cycle
+            self._conditions[name] = None
+            try:
+                self._conditions[name] = self.__evaluate_condition(definitions[name], "$.Conditions." + name)
+            except EvaluationException:
+                # Leaving the guard would report the next lookup of the condition as a cycle
+                del self._conditions[name]
+                raise
+        elif self._conditions[name] is None:
+            raise EvaluationException("Condition '{}' references itself".format(name), "$.Conditions." + name)
+        return self._conditions[name]
+
+    def __evaluate(self, node, path):
+        """
+
+        :param node: part of the template
+        :param path: json path of the node
+        :return: the resolved node, possibly _NO_VALUE
+        """
+        if not isinstance(node, (dict, list)):
+            return node
+        memoized = self._memo.get(id(node))
+        if memoized is not None and memoized[0] is node:
+            return memoized[1]
+        if isinstance(node, list):
+            value = [item for item in (self.__evaluate(item, "{}[{}]".format(path, index))
+                                       for index, item in enumerate(node)) if item is not _NO_VALUE]
+        elif len(node) == 1 and next(iter(node)) in self.__FUNCTIONS:
+            name, argument = next(iter(node.items()))
+            value = self.__FUNCTIONS[name](self, argument, "{}.{}".format(path, name))
+        else:
+            value = {}
+            for key, item in node.items():
+                item = self.__evaluate(item, "{}.{}".format(path, key))
+                if item is not _NO_VALUE:
+                    value[key] = item
+        # The node is kept alongside its value so its id can not be reused by another object
+        self._memo[id(node)] = (node, value)
+        return value
+
+    def __evaluate_condition(self, node, path):
+        """
+
+        :param node: a condition function or reference
+        :param path: json path of the node
+        :return: the boolean value
+        """
+        if isinstance(node, dict) and len(node) == 1 and "Condition" in node:
+            return self.condition(node["Condition"])
+        if isinstance(node, bool):
+            return node
+        if isinstance(node, str) and node.lower() in ("true", "false"):
+            return node.lower() == "true"
+        value = self.__evaluate(node, path)
+        if not isinstance(value, bool):
+            raise EvaluationException("Expected a condition but got {}".format(value), path)
+        return value
+
+    def __ref(self, argument, path):
+        if argument == NO_VALUE:
+            return _NO_VALUE
+        if argument in self._values:
+            return self._values[argument]
+        if argument in self._resources:
+            # The physical id of a resource only exists once deployed; its logical id stands in for it
+            return argument
+        raise EvaluationException("Ref to '{}' which is not a parameter, pseudo parameter or resource, or is a "
+                                  "parameter without a value".format(argument), path)
+
+    def __sub(self, argument, path):
+        if isinstance(argument, list):
+            if len(argument) != 2:
+                raise EvaluationException("Fn::Sub takes a string and a map of variables", path)
+            template, variables = argument[0], self.__evaluate(argument[1], path + "[1]")
+        else:
+            template, variables = argument, {}
+        if not isinstance(template, str):
+            raise EvaluationException("Fn::Sub takes a string", path)
+        output = []
+        for is_variable, text in compile_sub(template):
+            if not is_variable:
+                output.append(text)
+            elif text in variables:
+                output.append(str(variables[text]))
+            elif "." in text and text not in self._values:
+                output.append(str(self.__get_att(text, path)))
+            else:
+                output.append(str(self.__ref(text, path)))
+        return "".join(output)
+
+    def __join(self, argument, path):
+        if not isinstance(argument, list) or len(argument) != 2:
+            raise EvaluationException("Fn::Join takes a delimiter and a list of values", path)
+        values = self.__evaluate(argument[1], path + "[1]")
+        if not isinstance(values, list):
+            raise EvaluationException("Fn::Join takes a list of values", path)
+        return str(self.__evaluate(argument[0], path + "[0]")).join(str(value) for value in values)
+
+    def __get_att(self, argument, path):
+        argument = self.__evaluate(argument, path)
+        if isinstance(argument, str):
+            argument = argument.split(".", 1)
+        if not isinstance(argument, list) or len(argument) != 2:
+            raise EvaluationException("Fn::GetAtt takes a resource and an attribute", path)
+        resource, attribute = argument
+        if resource not in self._resources:
+            raise EvaluationException("Fn::GetAtt of resource '{}' which does not exist".format(resource), path)
+        key = "{}.{}".format(resource, attribute)
+        if key in self._attributes:
+            return self._attributes[key]
+        return ATTRIBUTE_PLACEHOLDER_FORMAT.format(resource=resource, attribute=attribute)
+
+    def __find_in_map(self, argument, path):
+        argument = self.__evaluate(argument, path)
+        if not isinstance(argument, list) or len(argument) != 3:
+            raise EvaluationException("Fn::FindInMap takes a map name, a top level key and a second level key",
+                                      path)
+        value = self._template.get("Mappings", {})
+        for key in argument:
+            if not isinstance(value, dict) or key not in value:
+                raise EvaluationException("Fn::FindInMap could not find {}".format(argument), path)
+            value = value[key]
+        return self.__evaluate(value, "$.Mappings")
+
+    def __if(self, argument, path):
+        if not isinstance(argument, list) or len(argument) != 3:
+            raise EvaluationException("Fn::If takes a condition, a value if true and a value if false", path)
+        if self.condition(argument[0]):
+            return self.__evaluate(argument[1], path + "[1]")
+        return self.__evaluate(argument[2], path + "[2]")
+
+    def __select(self, argument, path):
+        if not isinstance(argument, list) or len(argument) != 2:
+            raise EvaluationException("Fn::Select takes an index and a list of values", path)
+        index, values = self.__evaluate(argument[0], path + "[0]"), self.__evaluate(argument[1], path + "[1]")
+        try:
+            return values[int(index)]
+        except (IndexError, TypeError, ValueError):
+            raise EvaluationException("Fn::Select index {} is not in {}".format(index, values), path)
+
+    def __split(self, argument, path):
+        if not isinstance(argument, list) or len(argument) != 2:
+            raise EvaluationException("Fn::Split takes a delimiter and a string", path)
+        return str(self.__evaluate(argument[1], path + "[1]")).split(argument[0])
+
+    def __base64(self, argument, path):
+        return base64.b64encode(str(self.__evaluate(argument, path)).encode("utf-8")).decode("ascii")
+
+    def __equals(self, argument, path):
+        if not isinstance(argument, list) or len(argument) != 2:
+            raise EvaluationException("Fn::Equals takes two values", path)
+        first, second = self.__evaluate(argument[0], path + "[0]"), self.__evaluate(argument[1], path + "[1]")
+        if type(first) is not type(second):
+            # Parameters are strings even when they look like numbers
+            return str(first) == str(second)
+        return first == second
+
+    def __and(self, argument, path):
+        return all(self.__evaluate_condition(item, "{}[{}]".format(path, index))
+                   for index, item in enumerate(argument))
+
+    def __or(self, argument, path):
+        return any(self.__evaluate_condition(item, "{}[{}]".format(path, index))
+                   for index, item in enumerate(argument))
+
+    def __not(self, argument, path):
+        if not isinstance(argument, list) or len(argument) != 1:
+            raise EvaluationException("Fn::Not takes a single condition", path)
+        return not self.__evaluate_condition(argument[0], path + "[0]")
+
+    __FUNCTIONS = {
+        "Ref": __ref,
+        "Fn::Sub": __sub,
+        "Fn::Join": __join,
+        "Fn::GetAtt": __get_att,
+        "Fn::FindInMap": __find_in_map,
+        "Fn::If": __if,
+        "Fn::Select": __select,
+        "Fn::Split": __split,
+        "Fn::Base64": __base64,
+        "Fn::Equals": __equals,
+        "Fn::And": __and,
+        "Fn::Or": __or,
+        "Fn::Not": __not
+    }
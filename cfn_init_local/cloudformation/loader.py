@@ -0,0 +1,174 @@
+import os
+import re
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import Lock
+from cfn_init_local.cache.templates import ParsedTemplate, TemplateCache
+from cfn_init_local.cloudformation.models import Template, is_nested_stack, keep_resource
+from cfn_init_local.cloudformation.yaml_loader import YAML_ERRORS
+from cfn_init_local.utils.io_utils import IOUtils
+from cfn_init_local.utils.logging import LoggerBuilder
+
+LOGGER = LoggerBuilder.standard_console_logger(__file__)
+
+NESTED_STACK_NAME_FORMAT = "{parent}-{resource}"
+FILE_URL_PREFIX = "file://"
+URL_PATTERN = re.compile(r"^[a-zA-Z][a-zA-Z0-9+.-]*://")
+DEFAULT_MAX_WORKERS = 4
+# Errors raised loading a template (or one of its nested stacks) that can not be read or parsed. ImportError is
+# raised for YAML templates when PyYAML is not installed
+LOAD_ERRORS = (OSError, ValueError, ImportError) + YAML_ERRORS
+
+
+class TemplateLoader(object):
+    """
+    Loads a template along with the templates of its nested stacks (AWS::CloudFormation::Stack resources whose
+    TemplateURL is a local file, as before `aws cloudformation package`), recursively.
+
+    The nested stacks of each level of the hierarchy are parsed concurrently. Parsed bodies are cached by a hash of
+    their content, so a template used by several nested stacks is only parsed once; the stacks share the body.
+    With a TemplateCache, templates unchanged since they were last parsed are not parsed at all.
+    """
+
+    def __init__(self, incremental=False, max_workers=DEFAULT_MAX_WORKERS, template_cache=None):
+        """
+        :param incremental: decode json templates one resource at a time (see Template.from_file_path)
+        :param max_workers: max number of templates to parse at once
+        :param template_cache: TemplateCache to reuse templates parsed by previous runs from, if any
+        """
+        self._incremental = incremental
+        self._max_workers = max_workers
+        self._template_cache = template_cache
+        self._parsed = {}
+        self._lock = Lock()
+
+    def load(self, file_path, name):
+        """
+        Load a template and its nested stacks. Each nested stack is named "<parent stack>-<logical id>"
+
+        :param file_path: path of the root template
+        :param name: name of the root stack
+        :return: the root template, with its nested stacks added
+        :raises ValueError: if a template is a nested stack of itself
+        """
+        root = self.__parse(file_path, name)
+        ancestors = {root.name: (os.path.realpath(file_path),)}
+        level = [root]
+        with ThreadPoolExecutor(max_workers=max(1, self._max_workers)) as executor:
+            while len(level) > 0:
+                pending = []
+                for parent in level:
+                    for logical_id, path in TemplateLoader.get_nested_stack_paths(parent):
+                        real_path = os.path.realpath(path)
+                        if real_path in ancestors[parent.name]:
+                            raise ValueError("Nested stack '{}' of stack '{}' includes itself: {}".format(
+                                logical_id, parent.name, path))
+                        name = NESTED_STACK_NAME_FORMAT.format(parent=parent.name, resource=logical_id)
+                        ancestors[name] = ancestors[parent.name] + (real_path,)
+                        pending.append((parent, logical_id, executor.submit(self.__parse, path, name)))
+                level = []
+                for parent, logical_id, future in pending:
+                    nested = future.result()
+                    parent.add_nested_stack(logical_id, nested)
+                    level.append(nested)
+        return root
+
+    @staticmethod
+    def get_nested_stack_paths(template):
+        """
+        Get the local template files of the nested stacks of a template. Relative paths are relative to the
+        directory of the template
+
+        :param template: the template
+        :return: list of (logical id, path) tuples, in template order
+        """
+        directory = os.path.dirname(template.path) if template.path is not None else ""
+        paths = []
+        for logical_id, body in template.body.get("Resources", {}).items():
+            if not is_nested_stack(body):
+                continue
+            url = body.get("Properties", {}).get("TemplateURL")
+            if isinstance(url, str) and url.startswith(FILE_URL_PREFIX):
+                url = url[len(FILE_URL_PREFIX):]
+            if not isinstance(url, str) or URL_PATTERN.match(url):
+                LOGGER.info("Skipping nested stack '%s' of stack '%s'; its TemplateURL is not a local file",
+                            logical_id, template.name)
+                continue
+            paths.append((logical_id, os.path.join(directory, url)))
+        return paths
+
+    def __parse(self, file_path, name):
+        """
+        Read and parse a template, reusing the body of any template with the same content parsed before
+
+        :param file_path: path of the template
+        :param name: name of the stack
+        :return: the template
+        """
+        cache = self._template_cache
+        parsed = cache.get(file_path, self._incremental) if cache is not None else None
+        if parsed is not None:
+            # Stacks with the same content still share one body
+            with self._lock:
+                future = self._parsed.setdefault(parsed.digest, TemplateLoader.__completed(parsed))
+            parsed = future.result()
+        else:
+            text = IOUtils.read_file(file_path)
+            digest = TemplateCache.digest(text)
+            with self._lock:
+                future = self._parsed.get(digest)
+                owner = future is None
+                if owner:
+                    future = self._parsed[digest] = Future()
+            if owner:
+                try:
+                    future.set_result(self.__parse_text(file_path, text, digest))
+                except Exception as e:
+                    future.set_exception(e)
+            parsed = future.result()
+        return Template(name, parsed.body, file_path, parsed.cfn_init_index)
+
+    def __parse_text(self, file_path, text, digest):
+        """
+        Parse the content of a template, unless the TemplateCache has it under another modification time
+
+        :param file_path: path of the template
+        :param text: content of the template
+        :param digest: hash of the content
+        :return: the ParsedTemplate
+        """
+        cache = self._template_cache
+        parsed = cache.get(file_path, self._incremental, digest) if cache is not None else None
+        if parsed is None:
+            body = Template.parse(file_path, text, self._incremental)
+            parsed = ParsedTemplate(digest, body, Template(None, body).cfn_init_resource_names)
+            if cache is not None:
+                # Only what running cfn-init needs is cached, keeping entries small and fast to load
+                cache.put(file_path, parsed._replace(body=TemplateLoader.__prune(body)), self._incremental)
+        elif cache is not None:
+            cache.put(file_path, parsed, self._incremental)
+        return parsed
+
+    @staticmethod
+    def __prune(body):
+        """
+
+        :param body: body of a template
+        :return: copy of the body with the bodies of resources that neither use cfn-init nor are nested stacks
+            left empty, as when decoding incrementally
+        """
+        resources = body.get("Resources")
+        if not isinstance(resources, dict):
+            return body
+        return dict(body, Resources={name: resource if keep_resource(resource) else {}
+                                     for name, resource in resources.items()})
+
+    @staticmethod
+    def __completed(parsed):
+        """
+
+        :param parsed: a ParsedTemplate
+        :return: a completed Future of the ParsedTemplate
+        """
+        future = Future()
+        future.set_result(parsed)
+        return future
@@ -1,8 +1,18 @@
-import json
-import copy
+from cfn_init_local.cloudformation.exceptions import EvaluationException
+from cfn_init_local.cloudformation.intrinsics import IntrinsicEvaluator
+from cfn_init_local.cloudformation.scanner import TemplateScanner
+from cfn_init_local.cloudformation.yaml_loader import YamlTemplateLoader
+from cfn_init_local.utils.codec_utils import JsonCodec
 from cfn_init_local.utils.io_utils import IOUtils
 
 CLOUD_INIT_FIELD_NAME = "AWS::CloudFormation::Init"
+CONFIG_SETS_FIELD_NAME = "configSets"
+DEFAULT_CONFIG_SET = "default"
+DEFAULT_CONFIG = "config"
+CONFIG_SET_REFERENCE = "ConfigSet"
+NESTED_STACK_TYPE = "AWS::CloudFormation::Stack"
+# Pseudo parameters that belong to a single stack, so are not passed on to its nested stacks
+STACK_PSEUDO_PARAMETERS = ("AWS::StackName", "AWS::StackId")
 DESCRIBE_STACK_RESOURCE_RESPONSE = {
     "DescribeStackResourceResponse": {
         "DescribeStackResourceResult": {
@@ -24,19 +34,48 @@ DESCRIBE_STACK_RESOURCE_RESPONSE = {
 }
 
 
+def has_cfn_init(body):
+    """
+
+    :param body: body of a resource
+    :return: true if the resource has a cfn-init block
+    """
+    metadata = body.get("Metadata") if isinstance(body, dict) else None
+    return isinstance(metadata, dict) and bool(metadata.get(CLOUD_INIT_FIELD_NAME))
+
+
+def is_nested_stack(body):
+    """
+
+    :param body: body of a resource
+    :return: true if the resource is a nested stack
+    """
+    return isinstance(body, dict) and body.get("Type") == NESTED_STACK_TYPE
+
+
+def keep_resource(body):
+    """
+
+    :param body: body of a resource
+    :return: true if the resource is needed to run cfn-init: it uses cfn-init or is a nested stack
+    """
+    return has_cfn_init(body) or is_nested_stack(body)
+
+
 class Resource(object):
     """Class representing cloudformation resource
     (https://docs.aws.amazon.com/AWSCloudFormation/latest/UserGuide/resources-section-structure.html)"""
 
+    # Templates can have thousands of resources, so instances are kept as small as possible
+    __slots__ = ("_name", "_body", "_cfn_init", "_response")
+
     def __init__(self, name, body):
         self._name = name
         self._body = body
         data = self._body.get("Metadata", {}).get(CLOUD_INIT_FIELD_NAME, None)
         self._cfn_init = data and {CLOUD_INIT_FIELD_NAME: data}
-        response = copy.deepcopy(DESCRIBE_STACK_RESOURCE_RESPONSE)
-        response["DescribeStackResourceResponse"]["DescribeStackResourceResult"]["StackResourceDetail"]["Metadata"] = \
-            json.dumps(self._cfn_init)
-        self._response = self._cfn_init and json.dumps(response)
+        # Serialized on first use; most resources never need it
+        self._response = None
 
     def __str__(self):
         return self._name
@@ -61,16 +100,118 @@ class Resource(object):
 
     @property
     def describe_stack_resource_response(self):
+        """
+        Get the response the CloudFormation server gives cfn-init for this resource
+
+        :return: the DescribeStackResource response (json string) or None if the resource does not use cfn-init
+        """
+        if self._response is None and self._cfn_init:
+            result = DESCRIBE_STACK_RESOURCE_RESPONSE["DescribeStackResourceResponse"]["DescribeStackResourceResult"]
+            # Only the detail is copied; the rest of the template response is shared and never modified
+            detail = dict(result["StackResourceDetail"], Metadata=JsonCodec.dumps(self._cfn_init))
+            self._response = JsonCodec.dumps(
+                {"DescribeStackResourceResponse": {"DescribeStackResourceResult": {"StackResourceDetail": detail}}})
         return self._response
 
+    @property
+    def config_set_names(self):
+        """
+        Get the names of the configSets of the cfn-init block, in template order. A block without configSets
+        has the "default" configSet running its single "config"
+
+        :return: list of configSet names
+        """
+        init = self._cfn_init[CLOUD_INIT_FIELD_NAME] if self._cfn_init else {}
+        config_sets = init.get(CONFIG_SETS_FIELD_NAME)
+        if isinstance(config_sets, dict):
+            return list(config_sets.keys())
+        return [DEFAULT_CONFIG_SET] if config_sets is None and DEFAULT_CONFIG in init else []
+
+    def get_config_names(self, config_set=DEFAULT_CONFIG_SET):
+        """
+        Get the names of the configs cfn-init runs, in order, for a configSet. References to other configSets
+        ({"ConfigSet": name}) are expanded in place. A template without configSets runs its single "config" as
+        the default configSet.
+
+        :param config_set: name of the configSet
+        :return: list of config names
+        :raises ValueError: if the configSet, or one it references, does not exist or if configSets reference
+            each other in a cycle
+        """
+        init = self._cfn_init[CLOUD_INIT_FIELD_NAME] if self._cfn_init else {}
+        config_sets = init.get(CONFIG_SETS_FIELD_NAME)
+        if config_sets is None:
+            if config_set == DEFAULT_CONFIG_SET and DEFAULT_CONFIG in init:
+                return [DEFAULT_CONFIG]
+            raise ValueError("Resource '{}' has no configSet '{}'".format(self._name, config_set))
+        return self.__expand_config_set(config_sets, config_set, ())
+
+    def __expand_config_set(self, config_sets, config_set, chain):
+        """
+
+        :param config_sets: the configSets section
+        :param config_set: name of the configSet to expand
+        :param chain: names of the configSets referencing this one, outermost first
+        :return: list of config names
+        :raises ValueError: if the configSet does not exist, has an invalid entry or references itself
+        """
+        if config_set in chain:
+            raise ValueError("ConfigSet '{}' of resource '{}' references itself: {}".format(
+                config_set, self._name, " -> ".join(chain + (config_set,))))
+        if config_set not in config_sets:
+            raise ValueError("Resource '{}' has no configSet '{}'".format(self._name, config_set))
+        entries = config_sets[config_set]
+        config_names = []
+        for entry in [entries] if isinstance(entries, str) else entries:
+            if isinstance(entry, str):
+                config_names.append(entry)
+            elif isinstance(entry, dict) and list(entry.keys()) == [CONFIG_SET_REFERENCE]:
+                config_names += self.__expand_config_set(config_sets, entry[CONFIG_SET_REFERENCE],
+                                                         chain + (config_set,))
+            else:
+                raise ValueError("Invalid entry {} in configSet '{}' of resource '{}'".format(
+                    entry, config_set, self._name))
+        return config_names
+
+    def get_config(self, name):
+        """
+        Get a config from the cfn-init block
+
+        :param name: name of the config
+        :return: the config or None if it does not exist
+        """
+        return self._cfn_init[CLOUD_INIT_FIELD_NAME].get(name) if self._cfn_init else None
+
+    def with_config_sets(self, config_sets):
+        """
+        Create a copy of this resource with extra configSets added to its cfn-init block
+
+        :param config_sets: dict of configSet name to list of config names
+        :return: the new resource
+        """
+        init = dict(self._cfn_init[CLOUD_INIT_FIELD_NAME])
+        merged_config_sets = dict(init.get(CONFIG_SETS_FIELD_NAME, {}))
+        merged_config_sets.update(config_sets)
+        init[CONFIG_SETS_FIELD_NAME] = merged_config_sets
+        metadata = dict(self._body.get("Metadata", {}))
+        metadata[CLOUD_INIT_FIELD_NAME] = init
+        body = dict(self._body)
+        body["Metadata"] = metadata
+        return Resource(self._name, body)
+
 
 class Template(object):
     """Class representing cloudformation template
     (https://aws.amazon.com/cloudformation/aws-cloudformation-templates/)"""
 
-    def __init__(self, name, body):
+    __slots__ = ("_name", "_body", "_cfn_init_index", "_path", "_nested_stacks")
+
+    def __init__(self, name, body, path=None, cfn_init_index=None):
         self._name = name
         self._body = body
+        self._cfn_init_index = cfn_init_index
+        self._path = path
+        self._nested_stacks = {}
 
     @property
     def name(self):
@@ -90,25 +231,147 @@ class Template(object):
         """
         return self._body
 
+    @property
+    def path(self):
+        """
+        Get the file the template was read from
+
+        :return: path of the template or None
+        """
+        return self._path
+
+    @property
+    def nested_stacks(self):
+        """
+        Get the templates of the nested stacks of this template that have been loaded
+
+        :return: dict of the logical id of the nested stack resource to its template
+        """
+        return self._nested_stacks
+
+    def add_nested_stack(self, logical_id, template):
+        """
+        Add the template of a nested stack of this template
+
+        :param logical_id: logical id of the AWS::CloudFormation::Stack resource
+        :param template: template of the nested stack
+        """
+        self._nested_stacks[logical_id] = template
+
+    def get_nested_stack_parameters(self, logical_id, parameters, evaluator):
+        """
+        Get the parameters a nested stack is created with: the pseudo parameters of this stack, other than its
+        name and id, and the evaluated Parameters property of the nested stack resource
+
+        :param logical_id: logical id of the AWS::CloudFormation::Stack resource
+        :param parameters: dict of parameter name to value this stack was evaluated with
+        :param evaluator: IntrinsicEvaluator of this stack
+        :return: dict of parameter name to value, or None if the condition of the nested stack is false
+        """
+        body = self._body["Resources"][logical_id]
+        if "Condition" in body and not evaluator.condition(body["Condition"]):
+            return None
+        nested_parameters = {name: value for name, value in parameters.items()
+                             if name.startswith("AWS::") and name not in STACK_PSEUDO_PARAMETERS}
+        values = evaluator.evaluate(body.get("Properties", {}).get("Parameters", {}),
+                                    "$.Resources.{}.Properties.Parameters".format(logical_id))
+        nested_parameters.update(values or {})
+        return nested_parameters
+
     @staticmethod
-    def from_file_path(file_path, name):
+    def from_file_path(file_path, name, incremental=False):
         """
-        Create a template object from a specified file path
+        Create a template object from a specified json or YAML file path
 
         :param file_path: file path to read from
         :param name: name of the template
+        :param incremental: decode a json template one resource at a time, keeping only the bodies of resources
+            that use cfn-init or are nested stacks. Lowers peak memory for very large templates. YAML templates
+            are always loaded whole
         :return: template
         """
-        return Template(name, IOUtils.read_json(file_path))
+        return Template(name, Template.parse(file_path, IOUtils.read_file(file_path), incremental), file_path)
+
+    @staticmethod
+    def parse(file_path, text, incremental=False):
+        """
+        Parse the content of a json or YAML template
+
+        :param file_path: path the template was read from
+        :param text: content of the template
+        :param incremental: decode a json template one resource at a time, keeping only the bodies of resources
+            that use cfn-init or are nested stacks
+        :return: body of the template
+        """
+        if YamlTemplateLoader.is_yaml(file_path, text):
+            return YamlTemplateLoader.loads(text)
+        if incremental:
+            return TemplateScanner(keep_resource).scan(text)
+        return JsonCodec.loads(text)
+
+    @property
+    def cfn_init_resource_names(self):
+        """
+        Logical ids of the resources using cfn-init, found in a single pass over the resources the first time
+        they are needed
+
+        :return: list of logical ids, in template order
+        """
+        if self._cfn_init_index is None:
+            self._cfn_init_index = [name for name, body in self._body.get('Resources', {}).items()
+                                    if has_cfn_init(body)]
+        return self._cfn_init_index
+
+    def evaluator(self, parameters=None, attributes=None):
+        """
+        Create an evaluator for the intrinsic functions of this template
+
+        :param parameters: dict of parameter (or pseudo parameter) name to value
+        :param attributes: dict of "LogicalId.Attribute" to the value of Fn::GetAtt for it
+        :return: the IntrinsicEvaluator
+        """
+        return IntrinsicEvaluator(self._body, self._name, parameters, attributes)
+
+    @staticmethod
+    def read_parameters(file_path):
+        """
+        Read parameter values from a file, either a json object of name to value or a list in the format
+        taken by the AWS CLI ([{"ParameterKey": ..., "ParameterValue": ...}])
+
+        :param file_path: file path to read from
+        :return: dict of parameter name to value
+        """
+        parameters = IOUtils.read_json(file_path)
+        if isinstance(parameters, list):
+            return {parameter["ParameterKey"]: parameter["ParameterValue"] for parameter in parameters}
+        return parameters
 
-    def get_resources_using_cfn_init(self):
+    def get_resources_using_cfn_init(self, evaluator=None, on_error=None):
         """
         Get resource objects representing all the resources in a stack that use CfnInit
 
+        :param evaluator: IntrinsicEvaluator to resolve the metadata of the resources with. Resources whose
+            condition is false are left out. Metadata is used as is when not specified
+        :param on_error: function taking the name of a resource and the EvaluationException raised evaluating it.
+            When specified, it is called for every resource that can not be evaluated, which then keeps its
+            metadata as written. Otherwise the exception is raised
         :return: list of resource objects using cfn init
         """
         resources = []
-        for resource_name, resource_body in self._body.get('Resources', {}).items():
+        bodies = self._body.get('Resources', {})
+        for resource_name in self.cfn_init_resource_names:
+            resource_body = bodies[resource_name]
+            if evaluator is not None:
+                try:
+                    if "Condition" in resource_body and not evaluator.condition(resource_body["Condition"]):
+                        continue
+                    metadata = evaluator.evaluate(resource_body["Metadata"], "$.Resources.{}.Metadata".format(
+                        resource_name))
+                    resource_body = dict(resource_body, Metadata=metadata)
+                except EvaluationException as e:
+                    if on_error is None:
+                        raise
+                    on_error(resource_name, e)
             cfn_resource = Resource(resource_name, resource_body)
             if cfn_resource.cfn_init is not None:
                 resources.append(cfn_resource)
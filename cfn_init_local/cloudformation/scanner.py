@@ -0,0 +1,89 @@
+import json
+import re
+
+WHITESPACE = re.compile(r"[ \t\n\r]*")
+RESOURCES_SECTION = "Resources"
+
+
+class TemplateScanner(object):
+    """
+    Decodes a json template one resource at a time rather than with a single json.loads, so only the
+    resources that are kept are ever held in memory together.
+    """
+
+    def __init__(self, keep_resource):
+        """
+        :param keep_resource: function taking a resource's body and returning whether to keep it. The names of
+            resources that are not kept are still recorded, with empty bodies, so they can be referenced
+        """
+        self._keep_resource = keep_resource
+        self._decoder = json.JSONDecoder()
+
+    def scan(self, text):
+        """
+        Decode a template
+
+        :param text: the template's json
+        :return: the template (dict)
+        :raises ValueError: if the template is not a valid json object
+        """
+        template, index = self.__scan_object(text, WHITESPACE.match(text, 0).end(), self.__scan_section)
+        if WHITESPACE.match(text, index).end() != len(text):
+            raise ValueError("Extra data after template at char {}".format(index))
+        return template
+
+    def __scan_section(self, text, key, index):
+        """
+
+        :param text: the template's json
+        :param key: name of a top level section of the template
+        :param index: index of the section's value
+        :return: tuple of the section's value and the index after it
+        """
+        if key == RESOURCES_SECTION:
+            return self.__scan_object(text, index, self.__scan_resource)
+        return self._decoder.raw_decode(text, index)
+
+    def __scan_resource(self, text, key, index):
+        """
+
+        :param text: the template's json
+        :param key: name of a resource
+        :param index: index of the resource's body
+        :return: tuple of the resource's body (or an empty body if not kept) and the index after it
+        """
+        body, index = self._decoder.raw_decode(text, index)
+        return (body if self._keep_resource(body) else {}), index
+
+    def __scan_object(self, text, index, scan_value):
+        """
+        Decode an object member by member
+
+        :param text: the json
+        :param index: index of the object's opening brace
+        :param scan_value: function taking the text, a member's key and the index of its value, returning a
+            tuple of the value and the index after it
+        :return: tuple of the object (dict) and the index after it
+        """
+        if text[index:index + 1] != "{":
+            raise ValueError("Expected an object at char {}".format(index))
+        result = {}
+        index = WHITESPACE.match(text, index + 1).end()
+        if text[index:index + 1] == "}":
+            return result, index + 1
+        while True:
+            key, index = self._decoder.raw_decode(text, index)
+            if not isinstance(key, str):
+                raise ValueError("Expected a property name at char {}".format(index))
+            index = WHITESPACE.match(text, index).end()
+            if text[index:index + 1] != ":":
+                raise ValueError("Expected ':' at char {}".format(index))
+            index = WHITESPACE.match(text, index + 1).end()
+            result[key], index = scan_value(text, key, index)
+            index = WHITESPACE.match(text, index).end()
+            delimiter = text[index:index + 1]
+            index = WHITESPACE.match(text, index + 1).end()
+            if delimiter == "}":
+                return result, index
+            if delimiter != ",":
+                raise ValueError("Expected ',' or '}}' at char {}".format(index))
@@ -0,0 +1,504 @@
+import re
+from cfn_init_local.cloudformation.models import CLOUD_INIT_FIELD_NAME, CONFIG_SETS_FIELD_NAME, CONFIG_SET_REFERENCE, \
+    DEFAULT_CONFIG
+
+CONFIG_KEYS = ("packages", "groups", "users", "sources", "files", "commands", "services")
+PACKAGE_MANAGERS = ("apt", "msi", "python", "rpm", "rubygems", "yum", "zypper")
+SERVICE_MANAGERS = ("sysvinit", "systemd", "windows")
+GROUP_KEYS = ("gid",)
+USER_KEYS = ("groups", "uid", "homeDir")
+FILE_KEYS = ("content", "source", "encoding", "group", "owner", "mode", "authentication", "context")
+FILE_ENCODINGS = ("plain", "base64")
+COMMAND_KEYS = ("command", "env", "cwd", "test", "ignoreErrors", "waitAfterCompletion")
+SERVICE_KEYS = ("ensureRunning", "enabled", "files", "sources", "packages", "commands")
+BOOLEAN_STRINGS = ("true", "false")
+# Six octal digits, e.g. "000644"; cfn-init also accepts fewer
+MODE_PATTERN = re.compile(r"^[0-7]{1,6}$")
+INIT_PATH_FORMAT = "$.Resources.{resource}.Metadata." + CLOUD_INIT_FIELD_NAME
+
+
+class ValidationError(object):
+    """A problem with an AWS::CloudFormation::Init block found without running cfn-init"""
+
+    def __init__(self, msg, path):
+        self._msg = msg
+        self._path = path
+
+    @property
+    def message(self):
+        """
+
+        :return: description of the problem
+        """
+        return self._msg
+
+    @property
+    def path(self):
+        """
+
+        :return: json path of the node with the problem
+        """
+        return self._path
+
+    def __str__(self):
+        return "{} (at {})".format(self._msg, self._path)
+
+
+class InitValidator(object):
+    """
+    Checks AWS::CloudFormation::Init blocks against the structure cfn-init reads them with: the keys and value
+    types of every config section, package and service managers, configSet references and the files, commands,
+    sources and packages services refer to. Every problem is reported in one pass.
+
+    Values that are still intrinsic functions (when the template is not evaluated) are not type checked.
+    """
+
+    @staticmethod
+    def validate(resource):
+        """
+        Validate the cfn-init block of a resource
+
+        :param resource: the Resource
+        :return: list of ValidationErrors, empty if the block is valid
+        """
+        errors = []
+        init = (resource.cfn_init or {}).get(CLOUD_INIT_FIELD_NAME)
+        InitValidator.__validate_init(init, INIT_PATH_FORMAT.format(resource=resource.name), errors)
+        return errors
+
+    @staticmethod
+    def __validate_init(init, path, errors):
+        """
+
+        :param init: the AWS::CloudFormation::Init block
+        :param path: json path of the block
+        :param errors: list to add ValidationErrors to
+        """
+        if not InitValidator.__check_type(init, dict, "an object", path, errors):
+            return
+        configs = {name: config for name, config in init.items() if name != CONFIG_SETS_FIELD_NAME}
+        for name, config in configs.items():
+            InitValidator.__validate_config(config, "{}.{}".format(path, name), errors)
+        if CONFIG_SETS_FIELD_NAME in init:
+            InitValidator.__validate_config_sets(init[CONFIG_SETS_FIELD_NAME], configs,
+                                                 "{}.{}".format(path, CONFIG_SETS_FIELD_NAME), errors)
+        elif DEFAULT_CONFIG not in configs:
+            errors.append(ValidationError("No configSets and no '{}' config, so cfn-init has nothing to run"
+                                          .format(DEFAULT_CONFIG), path))
+        InitValidator.__validate_service_references(configs, path, errors)
+
+    @staticmethod
+    def __validate_config_sets(config_sets, configs, path, errors):
+        """
+
+        :param config_sets: the configSets section
+        :param configs: dict of config name to config
+        :param path: json path of the section
+        :param errors: list to add ValidationErrors to
+        """
+        if not InitValidator.__check_type(config_sets, dict, "an object", path, errors):
+            return
+        for name, entries in config_sets.items():
+            entries_path = "{}.{}".format(path, name)
+            entries = [entries] if isinstance(entries, str) else entries
+            if not InitValidator.__check_type(entries, list, "a list of configs and configSet references",
+                                              entries_path, errors):
+                continue
+            for index, entry in enumerate(entries):
+                entry_path = "{}[{}]".format(entries_path, index)
+                if isinstance(entry, str):
+                    if entry not in configs:
+                        errors.append(ValidationError("ConfigSet '{}' refers to config '{}' which does not exist"
+                                                      .format(name, entry), entry_path))
+                elif InitValidator.__is_intrinsic(entry):
+                    continue
+                elif isinstance(entry, dict) and list(entry.keys()) == [CONFIG_SET_REFERENCE]:
+                    if entry[CONFIG_SET_REFERENCE] not in config_sets:
+                        errors.append(ValidationError("ConfigSet '{}' refers to configSet '{}' which does not exist"
+                                                      .format(name, entry[CONFIG_SET_REFERENCE]), entry_path))
+                else:
+                    errors.append(ValidationError("Expected a config name or {{\"ConfigSet\": name}} but got {}"
+                                                  .format(entry), entry_path))
+        reported = set()
+        for name in config_sets:
+            cycle = InitValidator.__find_cycle(config_sets, name, ())
+            if cycle is not None and frozenset(cycle) not in reported:
+                reported.add(frozenset(cycle))
+                errors.append(ValidationError("ConfigSets reference each other in a cycle: {}".format(
+                    " -> ".join(cycle + (cycle[0],))), "{}.{}".format(path, cycle[0])))
+
+    @staticmethod
+    def __find_cycle(config_sets, name, chain):
+        """
+
+        :param config_sets: the configSets section
+        :param name: name of a configSet
+        :param chain: names of the configSets referencing it, outermost first
+        :return: tuple of the names of the configSets in the first cycle reachable from the configSet, starting
+            with the one it re-enters, or None if there is none
+        """
+        if name in chain:
+            return chain[chain.index(name):]
+        entries = config_sets.get(name)
+        for entry in entries if isinstance(entries, list) else []:
+            if isinstance(entry, dict) and isinstance(entry.get(CONFIG_SET_REFERENCE), str):
+                cycle = InitValidator.__find_cycle(config_sets, entry[CONFIG_SET_REFERENCE], chain + (name,))
+                if cycle is not None:
+                    return cycle
+        return None
+
+    @staticmethod
+    def __validate_config(config, path, errors):
+        """
+
+        :param config: a config
+        :param path: json path of the config
+        :param errors: list to add ValidationErrors to
+        """
+        if not InitValidator.__check_type(config, dict, "an object", path, errors):
+            return
+        InitValidator.__check_keys(config, CONFIG_KEYS, path, errors)
+        for key, validate in (("packages", InitValidator.__validate_packages),
+                              ("groups", InitValidator.__validate_groups),
+                              ("users", InitValidator.__validate_users),
+                              ("sources", InitValidator.__validate_sources),
+                              ("files", InitValidator.__validate_files),
+                              ("commands", InitValidator.__validate_commands),
+                              ("services", InitValidator.__validate_services)):
+            if key in config:
+                section_path = "{}.{}".format(path, key)
+                if InitValidator.__check_type(config[key], dict, "an object", section_path, errors):
+                    validate(config[key], section_path, errors)
+
+    @staticmethod
+    def __validate_packages(packages, path, errors):
+        """
+
+        :param packages: the packages section of a config
+        :param path: json path of the section
+        :param errors: list to add ValidationErrors to
+        """
+        for manager, names in InitValidator.__entries(packages, path, "package manager", PACKAGE_MANAGERS, errors):
+            if not InitValidator.__check_type(names, dict, "an object of package name to versions",
+                                              "{}.{}".format(path, manager), errors):
+                continue
+            for name, versions in names.items():
+                versions_path = "{}.{}.{}".format(path, manager, name)
+                if isinstance(versions, list):
+                    for index, version in enumerate(versions):
+                        InitValidator.__check_type(version, str, "a version string",
+                                                   "{}[{}]".format(versions_path, index), errors)
+                else:
+                    InitValidator.__check_type(versions, str, "a version string or list of versions",
+                                               versions_path, errors)
+
+    @staticmethod
+    def __validate_groups(groups, path, errors):
+        """
+
+        :param groups: the groups section of a config
+        :param path: json path of the section
+        :param errors: list to add ValidationErrors to
+        """
+        for name, group in groups.items():
+            group_path = "{}.{}".format(path, name)
+            if InitValidator.__check_type(group, dict, "an object", group_path, errors):
+                InitValidator.__check_keys(group, GROUP_KEYS, group_path, errors)
+                InitValidator.__check_id(group, "gid", group_path, errors)
+
+    @staticmethod
+    def __validate_users(users, path, errors):
+        """
+
+        :param users: the users section of a config
+        :param path: json path of the section
+        :param errors: list to add ValidationErrors to
+        """
+        for name, user in users.items():
+            user_path = "{}.{}".format(path, name)
+            if not InitValidator.__check_type(user, dict, "an object", user_path, errors):
+                continue
+            InitValidator.__check_keys(user, USER_KEYS, user_path, errors)
+            InitValidator.__check_id(user, "uid", user_path, errors)
+            InitValidator.__check_string_list(user, "groups", user_path, errors)
+            InitValidator.__check_string(user, "homeDir", user_path, errors)
+
+    @staticmethod
+    def __validate_sources(sources, path, errors):
+        """
+
+        :param sources: the sources section of a config
+        :param path: json path of the section
+        :param errors: list to add ValidationErrors to
+        """
+        for directory, url in sources.items():
+            InitValidator.__check_type(url, str, "a url", "{}.{}".format(path, directory), errors)
+
+    @staticmethod
+    def __validate_files(files, path, errors):
+        """
+
+        :param files: the files section of a config
+        :param path: json path of the section
+        :param errors: list to add ValidationErrors to
+        """
+        for name, file in files.items():
+            file_path = "{}.{}".format(path, name)
+            if not InitValidator.__check_type(file, dict, "an object", file_path, errors):
+                continue
+            InitValidator.__check_keys(file, FILE_KEYS, file_path, errors)
+            if "content" in file and "source" in file:
+                errors.append(ValidationError("Only one of 'content' and 'source' can be specified", file_path))
+            if "content" in file and not isinstance(file["content"], (str, dict, list)):
+                errors.append(ValidationError("Expected a string or json but got {}".format(file["content"]),
+                                              file_path + ".content"))
+            for key in ("source", "group", "owner", "authentication"):
+                InitValidator.__check_string(file, key, file_path, errors)
+            if InitValidator.__check_string(file, "encoding", file_path, errors):
+                InitValidator.__check_choice(file["encoding"], FILE_ENCODINGS, file_path + ".encoding", errors)
+            if "context" in file:
+                InitValidator.__check_type(file["context"], dict, "an object", file_path + ".context", errors)
+            if "mode" in file:
+                mode = file["mode"]
+                if isinstance(mode, int) and not isinstance(mode, bool):
+                    # e.g. an unquoted 0644 in YAML, which is read as a decimal or octal number
+                    errors.append(ValidationError("Expected the mode as a quoted string of octal digits (e.g. "
+                                                  "\"000644\") but got the number {}".format(mode),
+                                                  file_path + ".mode"))
+                elif InitValidator.__check_string(file, "mode", file_path, errors) and not MODE_PATTERN.match(mode):
+                    errors.append(ValidationError("Expected up to six octal digits (e.g. \"000644\") but got '{}'"
+                                                  .format(mode), file_path + ".mode"))
+
+    @staticmethod
+    def __validate_commands(commands, path, errors):
+        """
+
+        :param commands: the commands section of a config
+        :param path: json path of the section
+        :param errors: list to add ValidationErrors to
+        """
+        for name, command in commands.items():
+            command_path = "{}.{}".format(path, name)
+            if not InitValidator.__check_type(command, dict, "an object", command_path, errors):
+                continue
+            InitValidator.__check_keys(command, COMMAND_KEYS, command_path, errors)
+            if "command" not in command:
+                errors.append(ValidationError("Missing 'command'", command_path))
+            elif not isinstance(command["command"], list):
+                InitValidator.__check_type(command["command"], str, "a string or list of arguments",
+                                           command_path + ".command", errors)
+            if "env" in command and InitValidator.__check_type(command["env"], dict, "an object",
+                                                               command_path + ".env", errors):
+                for variable, value in command["env"].items():
+                    InitValidator.__check_type(value, str, "a string", "{}.env.{}".format(command_path, variable),
+                                               errors)
+            for key in ("cwd", "test"):
+                InitValidator.__check_string(command, key, command_path, errors)
+            InitValidator.__check_boolean(command, "ignoreErrors", command_path, errors)
+
+    @staticmethod
+    def __validate_services(services, path, errors):
+        """
+
+        :param services: the services section of a config
+        :param path: json path of the section
+        :param errors: list to add ValidationErrors to
+        """
+        for manager, entries in InitValidator.__entries(services, path, "service manager", SERVICE_MANAGERS, errors):
+            if not InitValidator.__check_type(entries, dict, "an object of service name to settings",
+                                              "{}.{}".format(path, manager), errors):
+                continue
+            for name, service in entries.items():
+                service_path = "{}.{}.{}".format(path, manager, name)
+                if not InitValidator.__check_type(service, dict, "an object", service_path, errors):
+                    continue
+                InitValidator.__check_keys(service, SERVICE_KEYS, service_path, errors)
+                for key in ("ensureRunning", "enabled"):
+                    InitValidator.__check_boolean(service, key, service_path, errors)
+                for key in ("files", "sources", "commands"):
+                    InitValidator.__check_string_list(service, key, service_path, errors)
+                if "packages" in service and InitValidator.__check_type(
+                        service["packages"], dict, "an object of package manager to package names",
+                        service_path + ".packages", errors):
+                    for package_manager, names in service["packages"].items():
+                        InitValidator.__check_type(names, list, "a list of package names",
+                                                   "{}.packages.{}".format(service_path, package_manager), errors)
+
+    @staticmethod
+    def __validate_service_references(configs, path, errors):
+        """
+        Check that what services restart on changes to (files, sources, commands and packages) is defined by a
+        config of the block
+
+        :param configs: dict of config name to config
+        :param path: json path of the block
+        :param errors: list to add ValidationErrors to
+        """
+        defined = {"files": set(), "sources": set(), "commands": set()}
+        packages = {}
+        services = []
+        for name, config in configs.items():
+            if not isinstance(config, dict):
+                continue
+            for key, keys in defined.items():
+                if isinstance(config.get(key), dict):
+                    keys.update(config[key].keys())
+            for manager, names in InitValidator.__items(config.get("packages")):
+                packages.setdefault(manager, set()).update(names.keys() if isinstance(names, dict) else [])
+            for manager, entries in InitValidator.__items(config.get("services")):
+                for service, settings in InitValidator.__items(entries):
+                    services.append(("{}.{}.services.{}.{}".format(path, name, manager, service), settings))
+        for service_path, settings in services:
+            if not isinstance(settings, dict):
+                continue
+            for key, keys in defined.items():
+                for index, reference in enumerate(settings.get(key) if isinstance(settings.get(key), list) else []):
+                    if isinstance(reference, str) and reference not in keys:
+                        errors.append(ValidationError("Service refers to {} '{}' which no config defines".format(
+                            key[:-1], reference), "{}.{}[{}]".format(service_path, key, index)))
+            for manager, names in InitValidator.__items(settings.get("packages")):
+                for index, package in enumerate(names if isinstance(names, list) else []):
+                    if package not in packages.get(manager, ()):
+                        errors.append(ValidationError("Service refers to {} package '{}' which no config defines"
+                                                      .format(manager, package),
+                                                      "{}.packages.{}[{}]".format(service_path, manager, index)))
+
+    @staticmethod
+    def __entries(section, path, kind, choices, errors):
+        """
+
+        :param section: a section keyed by manager (packages or services)
+        :param path: json path of the section
+        :param kind: what the keys are, for errors
+        :param choices: the supported managers
+        :param errors: list to add ValidationErrors to
+        :return: list of the (manager, value) items of the section with a supported manager
+        """
+        items = []
+        for manager, value in section.items():
+            if manager in choices:
+                items.append((manager, value))
+            else:
+                errors.append(ValidationError("Unknown {} '{}'; expected one of: {}".format(
+                    kind, manager, ", ".join(choices)), "{}.{}".format(path, manager)))
+        return items
+
+    @staticmethod
+    def __items(value):
+        """
+
+        :param value: any node
+        :return: the items of the node if it is an object, otherwise none
+        """
+        return value.items() if isinstance(value, dict) else []
+
+    @staticmethod
+    def __check_keys(node, allowed, path, errors):
+        """
+
+        :param node: an object
+        :param allowed: the keys the object can have
+        :param path: json path of the object
+        :param errors: list to add a ValidationError to for every other key
+        """
+        for key in node:
+            if key not in allowed:
+                errors.append(ValidationError("Unknown key '{}'; expected one of: {}".format(key, ", ".join(allowed)),
+                                              "{}.{}".format(path, key)))
+
+    @staticmethod
+    def __check_choice(value, choices, path, errors):
+        """
+
+        :param value: the value to check
+        :param choices: the values allowed
+        :param path: json path of the value
+        :param errors: list to add a ValidationError to if the value is not allowed
+        """
+        if not InitValidator.__is_intrinsic(value) and value not in choices:
+            errors.append(ValidationError("Expected one of: {} but got '{}'".format(", ".join(choices), value), path))
+
+    @staticmethod
+    def __check_string(node, key, path, errors):
+        """
+
+        :param node: an object
+        :param key: key of the object whose value, if any, should be a string
+        :param path: json path of the object
+        :param errors: list to add a ValidationError to
+        :return: true if the object has the key and its value is a string
+        """
+        return key in node and InitValidator.__check_type(node[key], str, "a string", "{}.{}".format(path, key),
+                                                          errors)
+
+    @staticmethod
+    def __check_string_list(node, key, path, errors):
+        """
+
+        :param node: an object
+        :param key: key of the object whose value, if any, should be a list of strings
+        :param path: json path of the object
+        :param errors: list to add ValidationErrors to
+        """
+        if key in node and InitValidator.__check_type(node[key], list, "a list of strings",
+                                                      "{}.{}".format(path, key), errors):
+            for index, value in enumerate(node[key]):
+                InitValidator.__check_type(value, str, "a string", "{}.{}[{}]".format(path, key, index), errors)
+
+    @staticmethod
+    def __check_id(node, key, path, errors):
+        """
+
+        :param node: an object
+        :param key: key of the object whose value, if any, should be a uid or gid
+        :param path: json path of the object
+        :param errors: list to add a ValidationError to
+        """
+        if key in node and (isinstance(node[key], bool) or not isinstance(node[key], (str, int))) \
+                and not InitValidator.__is_intrinsic(node[key]):
+            errors.append(ValidationError("Expected a numeric id but got {}".format(node[key]),
+                                          "{}.{}".format(path, key)))
+
+    @staticmethod
+    def __check_boolean(node, key, path, errors):
+        """
+
+        :param node: an object
+        :param key: key of the object whose value, if any, should be a boolean (or "true"/"false")
+        :param path: json path of the object
+        :param errors: list to add a ValidationError to
+        """
+        if key not in node or isinstance(node[key], bool) or InitValidator.__is_intrinsic(node[key]):
+            return
+        if not isinstance(node[key], str) or node[key].lower() not in BOOLEAN_STRINGS:
+            errors.append(ValidationError("Expected true or false but got {}".format(node[key]),
+                                          "{}.{}".format(path, key)))
+
+    @staticmethod
+    def __check_type(value, expected_type, description, path, errors):
+        """
+
+        :param value: the value to check
+        :param expected_type: the type the value should have
+        :param description: description of the type, for errors
+        :param path: json path of the value
+        :param errors: list to add a ValidationError to if the value has another type
+        :return: true if the value has the type
+        """
+        if isinstance(value, expected_type) and not (expected_type is dict and InitValidator.__is_intrinsic(value)):
+            return True
+        if not InitValidator.__is_intrinsic(value):
+            errors.append(ValidationError("Expected {} but got {}".format(description, value), path))
+        return False
+
+    @staticmethod
+    def __is_intrinsic(value):
+        """
+
+        :param value: any node
+        :return: true if the node is an unevaluated intrinsic function (e.g. {"Fn::Sub": ...})
+        """
+        if not isinstance(value, dict) or len(value) != 1:
+            return False
+        key = next(iter(value))
+        return key == "Ref" or key.startswith("Fn::")
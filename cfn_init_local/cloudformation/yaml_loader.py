@@ -0,0 +1,121 @@
+try:
+    import yaml
+except ImportError:  # optional, installed with the "yaml" extra
+    yaml = None
+
+YAML_EXTENSIONS = (".yaml", ".yml")
+# Errors raised for templates that are not valid YAML
+YAML_ERRORS = (yaml.YAMLError,) if yaml is not None else ()
+TIMESTAMP_TAG = "tag:yaml.org,2002:timestamp"
+# Short form tags that map to "Fn::<Name>"
+FUNCTION_TAGS = ("And", "Base64", "Cidr", "Equals", "FindInMap", "GetAZs", "If", "ImportValue", "Join", "Not", "Or",
+                 "Select", "Split", "Sub", "Transform")
+
+
+class YamlTemplateLoader(object):
+    """
+    Loads YAML CloudFormation templates, including the short form of intrinsic functions (!Ref, !Sub, !GetAtt...),
+    into the same structure as their json equivalent. Uses libyaml's C loader when PyYAML was built with it.
+    """
+
+    __loader = None
+
+    @staticmethod
+    def is_yaml(file_path, text):
+        """
+        Whether a template is YAML, going by its extension and otherwise by its content (json templates are
+        objects, so start with "{")
+
+        :param file_path: path of the template
+        :param text: content of the template
+        :return: True if the template should be loaded as YAML
+        """
+        return file_path.lower().endswith(YAML_EXTENSIONS) or not text.lstrip().startswith("{")
+
+    @staticmethod
+    def loads(text):
+        """
+        Load a YAML template
+
+        :param text: content of the template
+        :return: the template body
+        :raises ImportError: if PyYAML is not installed
+        :raises yaml.YAMLError: if the template is not valid YAML. The message includes the line and column
+        """
+        loader = YamlTemplateLoader.loader()
+        return yaml.load(text, Loader=loader)
+
+    @staticmethod
+    def loader():
+        """
+        Get the YAML loader class for templates, creating it on first use
+
+        :return: loader class
+        :raises ImportError: if PyYAML is not installed
+        """
+        if YamlTemplateLoader.__loader is None:
+            if yaml is None:
+                raise ImportError("PyYAML is required to load YAML templates: pip install cfn-init-local[yaml]")
+            YamlTemplateLoader.__loader = YamlTemplateLoader.__create_loader()
+        return YamlTemplateLoader.__loader
+
+    @staticmethod
+    def __create_loader():
+        """
+        Create a safe loader class that constructs the short form tags and, like CloudFormation, leaves dates
+        such as AWSTemplateFormatVersion as strings
+
+        :return: loader class
+        """
+        base = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+        loader = type("CfnYamlLoader", (base,), {})
+        loader.yaml_implicit_resolvers = {
+            first: [(tag, regexp) for tag, regexp in resolvers if tag != TIMESTAMP_TAG]
+            for first, resolvers in base.yaml_implicit_resolvers.items()
+        }
+        for name in FUNCTION_TAGS:
+            loader.add_constructor("!" + name, YamlTemplateLoader.__function_constructor("Fn::" + name))
+        loader.add_constructor("!Ref", YamlTemplateLoader.__function_constructor("Ref"))
+        loader.add_constructor("!Condition", YamlTemplateLoader.__function_constructor("Condition"))
+        loader.add_constructor("!GetAtt", YamlTemplateLoader.__construct_get_att)
+        return loader
+
+    @staticmethod
+    def __function_constructor(key):
+        """
+        Create a constructor turning a tagged node into {key: value}
+
+        :param key: key of the long form, e.g. "Fn::Sub"
+        :return: constructor function
+        """
+        return lambda loader, node: {key: YamlTemplateLoader.__construct_node(loader, node)}
+
+    @staticmethod
+    def __construct_get_att(loader, node):
+        """
+        Construct !GetAtt, whose scalar form is "LogicalId.Attribute". Attribute names can contain dots
+        (e.g. Endpoint.Address) so only the first dot separates them
+
+        :param loader: YAML loader
+        :param node: tagged node
+        :return: {"Fn::GetAtt": [logical id, attribute]}
+        """
+        value = YamlTemplateLoader.__construct_node(loader, node)
+        if isinstance(value, str):
+            value = value.split(".", 1)
+        return {"Fn::GetAtt": value}
+
+    @staticmethod
+    def __construct_node(loader, node):
+        """
+        Construct a node of any kind
+
+        :param loader: YAML loader
+        :param node: node to construct
+        :return: the string, list or dict of the node
+        """
+        if isinstance(node, yaml.ScalarNode):
+            return loader.construct_scalar(node)
+        if isinstance(node, yaml.SequenceNode):
+            return loader.construct_sequence(node, deep=True)
+        return loader.construct_mapping(node, deep=True)
@@ -1,14 +1,31 @@
+import io
+import tarfile
+import time
 import traceback as traceback_helper
+from concurrent.futures import ThreadPoolExecutor
 from cfn_init_local.docker.exceptions import DockerException
 
 RESUME_CONTAINER_CMD_FORMAT = "docker start {container_id} && docker exec -it {container_id} bash"
+DEFAULT_MAX_CONCURRENT_REQUESTS = 8
 
 
 class BasePod(object):
     """"""
 
-    def __init__(self, containers=[]):
+    def __init__(self, containers=[], stop_timeout=None, remove=False,
+                 max_concurrent_requests=DEFAULT_MAX_CONCURRENT_REQUESTS):
+        """
+        :param containers: containers in the pod
+        :param stop_timeout: seconds to wait for each container to stop before killing it on teardown.
+            0 kills immediately, None uses the docker default
+        :param remove: whether to remove containers on teardown. Failed containers are always kept for inspection
+        :param max_concurrent_requests: max number of containers being torn down against the daemon at once
+        """
         self._containers = containers
+        self._stop_timeout = stop_timeout
+        self._remove = remove
+        self._max_concurrent_requests = max_concurrent_requests
+        self._teardown_duration = None
 
     @property
     def containers(self):
@@ -26,12 +43,81 @@ class BasePod(object):
         """
         self._containers.append(container)
 
+    def discard_container(self, container):
+        """
+        Remove a container from the pod and tear it down right away
+
+        :param container: the container
+        """
+        self._containers.remove(container)
+        self.__teardown_container(container, self._remove and not container.failed)
+
     def __enter__(self):
         return self
 
+    @property
+    def teardown_duration(self):
+        """
+        How long the last teardown of the pod took
+
+        :return: duration in seconds or None if the pod has not been torn down
+        """
+        return self._teardown_duration
+
+    def retained_containers(self):
+        """
+        Containers that are kept around after teardown
+
+        :return: list of containers that will not be (or were not) removed on teardown
+        """
+        if not self._remove:
+            return list(self._containers)
+        return [container for container in self._containers if container.failed]
+
+    def stop(self):
+        """
+        Stop all the containers in the pod in parallel
+        """
+        self.__for_each_container(lambda container: container.stop(self._stop_timeout))
+
+    def teardown(self):
+        """
+        Stop all the containers in the pod and remove the ones that are not retained
+        """
+        start = time.monotonic()
+        retained = self.retained_containers()
+        self.__for_each_container(
+            lambda container: self.__teardown_container(container, container not in retained))
+        self._teardown_duration = time.monotonic() - start
+
+    def __teardown_container(self, container, remove):
+        """
+
+        :param container: container to stop
+        :param remove: whether to also remove the container
+        """
+        start = time.monotonic()
+        container.stop(self._stop_timeout)
+        if remove:
+            container.remove()
+        container.set_teardown_duration(time.monotonic() - start)
+
+    def __for_each_container(self, func):
+        """
+        Apply a function to every container concurrently and wait for all of them to complete
+
+        :param func: function taking a container
+        """
+        if len(self._containers) == 0:
+            return
+        with ThreadPoolExecutor(max_workers=max(1, min(self._max_concurrent_requests, len(self._containers)))) \
+                as executor:
+            futures = [executor.submit(func, container) for container in self._containers]
+        for future in futures:
+            future.result()
+
     def __exit__(self, exception_type, exception_value, traceback):
-        for container in self._containers:
-            container.stop()
+        self.teardown()
         if traceback is not None:
             traceback_helper.print_tb(traceback)
 
@@ -39,10 +125,25 @@ class BasePod(object):
 class BaseContainer(object):
     """"""
 
-    def __init__(self, image, run_cmd, container=None):
+    def __init__(self, image, run_cmd, container=None, files=None, volumes=None):
+        """
+        :param image: image to run the container from
+        :param run_cmd: command the container runs
+        :param container: the underlying docker container, if already started
+        :param files: dict of absolute path to the contents (bytes) of files to deliver into the container
+            before it is started
+        :param volumes: dict of host path (or volume name) to {"bind": path in the container, "mode": "ro" or
+            "rw"} to mount into the container
+        """
         self._image = image
         self._run_cmd = run_cmd
         self._container = container
+        self._files = files or {}
+        self._volumes = volumes or {}
+        self._failed = False
+        self._started_at = None
+        self._create_duration = None
+        self._teardown_duration = None
 
     def __str__(self):
         return "Container(id={})".format(self.id)
@@ -63,6 +164,27 @@ class BaseContainer(object):
         """
         return self._image
 
+    @property
+    def failed(self):
+        """
+        Whether the work run on this container failed
+
+        :return: true if marked as failed
+        """
+        return self._failed
+
+    def mark_failed(self):
+        """
+        Mark the container as failed so it is kept around for inspection
+        """
+        self._failed = True
+
+    def clear_failed(self):
+        """
+        Clear the failed mark once later work run on this container passes, so it is removed with its pod again
+        """
+        self._failed = False
+
     @property
     def run_cmd(self):
         """
@@ -71,13 +193,68 @@ class BaseContainer(object):
         """
         return self._run_cmd
 
-    def set_container(self, container):
+    @property
+    def files(self):
+        """
+        Files to deliver into the container before it is started
+
+        :return: dict of absolute path to contents (bytes)
+        """
+        return self._files
+
+    @property
+    def volumes(self):
+        """
+        Host paths and volumes to mount into the container
+
+        :return: dict of host path (or volume name) to {"bind", "mode"}
+        """
+        return self._volumes
+
+    def set_container(self, container, create_duration=None):
         """
         I dont love setters either
         :param container:
+        :param create_duration: seconds it took the daemon to create and start the container, if known
         :return:
         """
         self._container = container
+        self._started_at = time.time()
+        self._create_duration = create_duration
+
+    @property
+    def create_duration(self):
+        """
+        How long it took to create and start the underlying docker container
+
+        :return: duration in seconds or None if not known
+        """
+        return self._create_duration
+
+    def set_teardown_duration(self, duration):
+        """
+
+        :param duration: seconds it took to stop (and remove) the container
+        """
+        self._teardown_duration = duration
+
+    @property
+    def teardown_duration(self):
+        """
+        How long it took to stop (and remove) the container
+
+        :return: duration in seconds or None if not torn down
+        """
+        return self._teardown_duration
+
+    @property
+    def started_at(self):
+        """
+        When the underlying docker container was set, i.e. started
+
+        :return: seconds since epoch or None if never started
+        """
+        return self._started_at
 
     @property
     def resume_statement(self):
@@ -101,10 +278,105 @@ class BaseContainer(object):
             raise DockerException(exit_code, output.decode("utf-8"))
         return output.decode("utf-8")  # this assumes defaults for stream, socker, demux params to exec_run
 
-    def stop(self):
+    def execute_stream(self, cmd, output):
         """
+        Execute a command on the docker container, passing its output to a sink as it is produced rather
+        than buffering all of it until the command exits
 
-        :return:
+        :param cmd: command to execute
+        :param output: sink with a write(bytes) method and a text property, e.g. a StreamedOutput
+        :return: the sink's text if the command succeeds
+        :raises DockerException: with the sink's text if the command exits with a non-zero code
         """
-        if self._container is not None:
+        if self._container is None:
+            raise ValueError("Cannot call run on a container object that has not been started")
+        api = self._container.client.api
+        exec_id = api.exec_create(self._container.id, cmd)["Id"]
+        for chunk in api.exec_start(exec_id, stream=True):
+            output.write(chunk)
+        exit_code = api.exec_inspect(exec_id)["ExitCode"]
+        if exit_code != 0:
+            raise DockerException(exit_code, output.text)
+        return output.text
+
+    def get_archive(self, path):
+        """
+        Stream a path out of the container
+
+        :param path: absolute path of a file or directory in the container
+        :return: iterator over the chunks (bytes) of an uncompressed tar archive of the path
+        """
+        if self._container is None:
+            raise ValueError("Cannot get an archive from a container object that has not been started")
+        stream, _ = self._container.get_archive(path)
+        return stream
+
+    def put_file(self, path, data):
+        """
+        Write a file into the container, replacing it if it exists
+
+        :param path: absolute path of the file in the container
+        :param data: contents of the file (bytes)
+        """
+        self.put_files({path: data})
+
+    def put_files(self, files):
+        """
+        Write several files into the container in a single request, replacing any that exist
+
+        :param files: dict of absolute path to contents (bytes)
+        """
+        if self._container is None:
+            raise ValueError("Cannot put files in a container object that has not been started")
+        self._container.put_archive("/", BaseContainer.create_archive(files))
+
+    @staticmethod
+    def create_archive(files):
+        """
+        Create a tar archive to extract at the root of a container's filesystem. Parent directories of
+        the files are created as needed on extraction.
+
+        :param files: dict of absolute path to contents (bytes)
+        :return: the archive (bytes)
+        """
+        archive = io.BytesIO()
+        mtime = time.time()
+        with tarfile.open(fileobj=archive, mode="w") as tar:
+            for path, data in files.items():
+                info = tarfile.TarInfo(path.lstrip("/"))
+                info.size = len(data)
+                info.mtime = mtime
+                tar.addfile(info, io.BytesIO(data))
+        return archive.getvalue()
+
+    def commit(self, repository, tag):
+        """
+        Snapshot the container's filesystem into an image
+
+        :param repository: repository of the image
+        :param tag: tag of the image
+        :return: the docker image
+        """
+        if self._container is None:
+            raise ValueError("Cannot commit a container object that has not been started")
+        return self._container.commit(repository=repository, tag=tag)
+
+    def stop(self, timeout=None):
+        """
+        Stop the container
+
+        :param timeout: seconds to wait before killing the container. 0 kills immediately, None uses the docker default
+        """
+        if self._container is None:
+            return
+        if timeout is None:
             self._container.stop()
+        else:
+            self._container.stop(timeout=timeout)
+
+    def remove(self):
+        """
+        Remove the container. It must be stopped first
+        """
+        if self._container is not None:
+            self._container.remove()
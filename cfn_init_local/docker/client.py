@@ -1,6 +1,9 @@
+import time
 import docker
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_EXCEPTION
+from threading import Event
 from cfn_init_local import ROOT
-from cfn_init_local.docker.base import BasePod
+from cfn_init_local.docker.base import BasePod, BaseContainer, DEFAULT_MAX_CONCURRENT_REQUESTS
 from cfn_init_local.docker.exceptions import ImageNotFoundException
 
 
@@ -10,35 +13,148 @@ class DockerClient(object):
     def __init__(self, docker_client=None):
         self._client = docker_client or docker.from_env()
 
-    def start_container(self, container, detach=True, cap_add=("NET_ADMIN",), tty=True):
+    def validate_image(self, image):
         """
+        Ensure an image exists in the local docker repo
+
+        :param image: name of the image
+        :raises ImageNotFoundException: if the image does not exist
+        """
+        if len(self._client.images.list(filters={"reference": image})) != 1:
+            raise ImageNotFoundException("Did not find image with name '{}' in local docker repo".format(image))
+
+    def get_image_id(self, image):
+        """
+        Resolve an image name to its id (content digest)
+
+        :param image: name of the image
+        :return: id of the image
+        :raises ImageNotFoundException: if the image does not exist
+        """
+        try:
+            return self._client.images.get(image).id
+        except docker.errors.ImageNotFound:
+            raise ImageNotFoundException("Did not find image with name '{}' in local docker repo".format(image))
+
+    def image_exists(self, image):
+        """
+
+        :param image: name of the image
+        :return: true if the image exists in the local docker repo
+        """
+        return len(self._client.images.list(filters={"reference": image})) > 0
+
+    def remove_images(self, repository):
+        """
+        Remove every image in a repository
+
+        :param repository: the repository
+        :return: number of images removed
+        """
+        images = self._client.images.list(name=repository)
+        for image in images:
+            self._client.images.remove(image.id, force=True)
+        return len(images)
+
+    def volume_sizes(self, prefix):
+        """
+        Get the disk usage of volumes
+
+        :param prefix: prefix of the names of the volumes
+        :return: dict of volume name to size in bytes, None if the daemon has not computed it
+        """
+        sizes = {}
+        for volume in self._client.df().get("Volumes") or []:
+            if volume["Name"].startswith(prefix):
+                size = (volume.get("UsageData") or {}).get("Size", -1)
+                sizes[volume["Name"]] = size if size >= 0 else None
+        return sizes
+
+    def remove_volumes(self, prefix):
+        """
+        Remove every volume whose name starts with a prefix
+
+        :param prefix: the prefix
+        :return: number of volumes removed
+        """
+        # The name filter matches anywhere in the name
+        volumes = [volume for volume in self._client.volumes.list(filters={"name": prefix})
+                   if volume.name.startswith(prefix)]
+        for volume in volumes:
+            volume.remove(force=True)
+        return len(volumes)
+
+    def start_container(self, container, detach=True, cap_add=("NET_ADMIN",), tty=True, validate_image=True):
+        """
+        Create the container, deliver its files into it and start it
 
         :param container:
         :param detach:
         :param cap_add:
         :param tty:
+        :param validate_image: whether to check the container's image exists before running it
         :return:
         """
         # Add this to debug: ports={"80/tcp":"5000", "5001/tcp":"5001"}
-        if len(self._client.images.list(filters={"reference": container.image})) != 1:
-            raise ImageNotFoundException("Did not find image with name '{}' in local docker repo".format(container.image))
+        if validate_image:
+            self.validate_image(container.image)
         volumes = {ROOT + '/http/server.py': {'bind': '/var/cfn-init-local/server.py', 'mode': 'ro'}}
-        docker_container = self._client.containers.run(
+        volumes.update(container.volumes)
+        start = time.monotonic()
+        docker_container = self._client.containers.create(
             container.image,
             container.run_cmd,
             detach=detach,
             cap_add=cap_add,
             tty=tty,
             volumes=volumes)
-        container.set_container(docker_container)
+        # Files are delivered between create and start so they exist before the container's command runs
+        try:
+            if len(container.files) > 0:
+                docker_container.put_archive("/", BaseContainer.create_archive(container.files))
+            docker_container.start()
+        except Exception:
+            docker_container.remove(force=True)
+            raise
+        container.set_container(docker_container, time.monotonic() - start)
 
-    def create_pod(self, containers):
+    def create_pod(self, containers, max_concurrent_requests=DEFAULT_MAX_CONCURRENT_REQUESTS, stop_timeout=None,
+                   remove=False):
         """
+        Start all the containers and wrap them in a pod. Each distinct image is validated once and then
+        containers are started concurrently. If any container fails to start, the containers that have not
+        started yet are not started, the containers that did start are stopped and removed and the failure
+        is raised.
 
-        :param containers:
-        :return:
+        :param containers: containers to start
+        :param max_concurrent_requests: max number of containers being started against the daemon at once
+        :param stop_timeout: see BasePod
+        :param remove: see BasePod
+        :return: the pod
         """
-        pod = BasePod(containers)
-        for container in pod.containers:
-            self.start_container(container)
+        for image in sorted({container.image for container in containers}):
+            self.validate_image(image)
+        pod = BasePod(containers, stop_timeout, remove, max_concurrent_requests)
+        failed = Event()
+
+        def start(container):
+            # Workers can pick up the next container before the pending starts are cancelled
+            if failed.is_set():
+                return
+            try:
+                self.start_container(container, validate_image=False)
+            except Exception:
+                failed.set()
+                raise
+
+        with ThreadPoolExecutor(max_workers=max(1, max_concurrent_requests)) as executor:
+            futures = [executor.submit(start, container) for container in pod.containers]
+            wait(futures, return_when=FIRST_EXCEPTION)
+            for future in futures:
+                future.cancel()
+        errors = [future.exception() for future in futures if not future.cancelled() and future.exception()]
+        if len(errors) > 0:
+            # Containers that never started have nothing to stop or remove
+            BasePod(pod.containers, stop_timeout, True, max_concurrent_requests).teardown()
+            raise errors[0]
         return pod
@@ -7,10 +7,42 @@ class DockerException(Exception):
         self._code = code
         self._msg = msg
 
+    @property
+    def code(self):
+        """
+
+        :return: exit code of the failed command
+        """
+        return self._code
+
+    @property
+    def output(self):
+        """
+
+        :return: output of the failed command
+        """
+        return self._msg
+
     def __str__(self):
         return "Exit Code: {}; Message: {}".format(self._code, self._msg)
 
 
+class CommandTimeoutException(DockerException):
+    """Exception thrown when a command run in a container is killed for exceeding its timeout"""
+
+    def __init__(self, code, msg, timeout):
+        super().__init__(code, msg)
+        self._timeout = timeout
+
+    def __str__(self):
+        return "Timed out after {} seconds; Exit Code: {}; Message: {}".format(self._timeout, self._code, self._msg)
+
+
 class ImageNotFoundException(Exception):
     """"""
     pass
+
+
+class ContainerNotReadyException(Exception):
+    """"""
+    pass
@@ -1,49 +1,183 @@
 
+import os
+import shlex
+from cfn_init_local.cache.packages import PACKAGE_CACHE_MOUNT
 from cfn_init_local.docker.base import BaseContainer
+from cfn_init_local.docker.exceptions import ContainerNotReadyException, DockerException, CommandTimeoutException
+from cfn_init_local.utils.io_utils import IOUtils
 
-START_SERVER_CMD_FORMAT = "/usr/bin/env python3 /var/cfn-init-local/server.py" \
-                          " --metadata '{metadata}'" \
-                          " --cfn-resource '{resource}'" \
-                          " --container-mode"
+READY_MARKER_PATH = "/var/cfn-init-local/ready"
+# The payloads the mock servers serve are delivered as files rather than arguments, so their size is not
+# limited by ARG_MAX and their contents never need shell quoting
+METADATA_FILE_PATH = "/var/cfn-init-local/metadata.json"
+CFN_RESOURCE_FILE_PATH = "/var/cfn-init-local/cfn-resource.json"
+START_SERVER_CMD = "/usr/bin/env python3 /var/cfn-init-local/server.py" \
+                   " --container-mode" \
+                   " --ready-file " + READY_MARKER_PATH + \
+                   " --metadata-file " + METADATA_FILE_PATH + \
+                   " --cfn-resource-file " + CFN_RESOURCE_FILE_PATH
+ARTIFACT_MIRROR_ARG_FORMAT = " --artifact-mirror {mirror}"
+IMDS_V2_ONLY_ARG = " --imds-v2-only"
+# Local copies of mirrored artifacts are mounted read only under this directory, one mount per URL prefix
+ARTIFACT_MIRROR_MOUNT_FORMAT = "/var/cfn-init-local/mirrors/{index}"
+HTTPS_URL_PREFIX = "https://"
+HTTP_URL_PREFIX = "http://"
+READY_POLL_INTERVAL = 0.1
+# Polls for the ready marker within a single exec so waiting costs one daemon round trip
+WAIT_FOR_READY_CMD_FORMAT = "/bin/sh -c 'i=0; while [ ! -f {marker} ]; do" \
+                            " i=$((i+1)); [ $i -gt {max_polls} ] && exit 1; sleep {interval}; done; cat {marker}'"
+DEFAULT_READY_TIMEOUT = 30
 CFN_INIT_MOCK_SERVER_URL = "http://127.0.0.1:5001"
 CFN_INIT_CMD_FORMAT = "/opt/aws/bin/cfn-init -v --stack {stack} --resource {resource} --url {url}"
+CONFIG_SETS_ARG_FORMAT = " --configsets {config_sets}"
+# cfn-init is sent SIGTERM once the timeout passes and SIGKILL if it is still running this many seconds later
+TIMEOUT_KILL_AFTER = 10
+TIMEOUT_CMD_FORMAT = "timeout -k " + str(TIMEOUT_KILL_AFTER) + " {timeout} {cmd}"
+# Exit codes of timeout when the command was sent SIGTERM and SIGKILL respectively
+TIMEOUT_EXIT_CODES = (124, 137)
+DEFAULT_ARTIFACT_PATHS = ("/var/log/cfn-init.log", "/var/log/cfn-init-cmd.log")
+ARTIFACTS_STAGING_DIR = "/var/cfn-init-local/artifacts"
+# Copies every path that exists into the staging directory (keeping its full path) so they can be fetched at once
+STAGE_ARTIFACTS_SCRIPT_FORMAT = "rm -rf {dir} && mkdir -p {dir} && for path in {paths}; do" \
+                                " [ -e \"$path\" ] && cp -a --parents \"$path\" {dir}; done; true"
 
 
 class CFNInitLocalContainer(BaseContainer):
     """Specialized version of a BaseContainer with logic specifically for cfn-init-local"""
 
-    def __init__(self, image, run_cmd, container=None, resource=None, stack=None):
-        super().__init__(image, run_cmd, container)
+    def __init__(self, image, run_cmd, container=None, resource=None, stack=None, files=None, volumes=None,
+                 artifact_mirrors=None):
+        super().__init__(image, run_cmd, container, files, volumes)
         self._resource = resource
         self._stack = stack
+        self._artifact_mirrors = artifact_mirrors or {}
+        self._time_to_ready = None
 
     def __str__(self):
         container_id = self._container.id if self._container else None
         return "Container(id={}, stack={}, resource={})".format(container_id, self._stack, self._resource)
 
     @staticmethod
-    def create(image, metadata, resource, stack):
+    def create(image, metadata, resource, stack, artifact_mirrors=None, package_cache_volume=None, imds_v2_only=False):
         """
         Helper method for creating a standard cfn-init-local container.
-        Uses a formatted version of START_SERVER_CMD_FORMAT as the run_cmd
+        Uses START_SERVER_CMD as the run_cmd and delivers the payloads it serves as files
 
         :param image: image to use for the container
-        :param metadata: the EC2 metadata for this container (dict)
+        :param metadata: the EC2 metadata for this container (json string)
         :param resource: the resource this container is mocking
         :param stack: the stack the resource belongs to
+        :param artifact_mirrors: dict of URL prefix to a local directory or file the mock servers serve for the
+            URLs starting with it, instead of cfn-init downloading them
+        :param package_cache_volume: name of the volume of shared packages to mount (see PackageCache), if any
+        :param imds_v2_only: have the mock EC2 metadata server reject requests without an IMDSv2 session token
         :return: a container
         """
-        run_cmd = START_SERVER_CMD_FORMAT.format(metadata=metadata, resource=resource.describe_stack_resource_response)
-        return CFNInitLocalContainer(image, run_cmd, None, resource, stack)
+        artifact_mirrors = artifact_mirrors or {}
+        run_cmd = START_SERVER_CMD + (IMDS_V2_ONLY_ARG if imds_v2_only else "")
+        volumes = {}
+        if package_cache_volume is not None:
+            volumes[package_cache_volume] = {"bind": PACKAGE_CACHE_MOUNT, "mode": "rw"}
+        for index, (prefix, path) in enumerate(artifact_mirrors.items()):
+            mount = ARTIFACT_MIRROR_MOUNT_FORMAT.format(index=index)
+            volumes[os.path.abspath(path)] = {"bind": mount, "mode": "ro"}
+            run_cmd += ARTIFACT_MIRROR_ARG_FORMAT.format(mirror=shlex.quote("{}={}".format(prefix, mount)))
+        files = CFNInitLocalContainer.__payload_files(metadata, resource, artifact_mirrors)
+        return CFNInitLocalContainer(image, run_cmd, None, resource, stack, files, volumes, artifact_mirrors)
 
-    def run_cfn_init(self):
+    @staticmethod
+    def __payload_files(metadata, resource, artifact_mirrors):
+        """
+
+        :param metadata: the EC2 metadata (json string)
+        :param resource: the resource
+        :param artifact_mirrors: dict of mirrored URL prefix to local path
+        :return: dict of the path of each file the mock servers serve to its contents
+        """
+        response = resource.describe_stack_resource_response
+        for prefix in artifact_mirrors:
+            # The mirror can not terminate TLS, so cfn-init is pointed at it over plain http
+            if prefix.startswith(HTTPS_URL_PREFIX):
+                response = response.replace(prefix, HTTP_URL_PREFIX + prefix[len(HTTPS_URL_PREFIX):])
+        return {
+            METADATA_FILE_PATH: metadata.encode("utf-8"),
+            CFN_RESOURCE_FILE_PATH: response.encode("utf-8")
+        }
+
+    def run_cfn_init(self, config_sets=None, output=None, timeout=None):
         """
         Wrapper method to execute the cfn-init command within the container
 
+        :param config_sets: list of configSets to run. cfn-init runs its default when not specified
+        :param output: sink to stream the output to as it is produced (see BaseContainer.execute_stream).
+            The output is buffered until cfn-init exits when not specified
+        :param timeout: seconds after which cfn-init is killed. Runs without a limit when not specified
         :return: the execution result
+        :raises CommandTimeoutException: if cfn-init is killed for exceeding the timeout
+        """
+        cmd = CFN_INIT_CMD_FORMAT.format(stack=self._stack.name, resource=self._resource.name,
+                                         url=CFN_INIT_MOCK_SERVER_URL)
+        if config_sets:
+            cmd += CONFIG_SETS_ARG_FORMAT.format(config_sets=",".join(config_sets))
+        if timeout is not None:
+            cmd = TIMEOUT_CMD_FORMAT.format(timeout=timeout, cmd=cmd)
+        try:
+            return self.execute(cmd) if output is None else self.execute_stream(cmd, output)
+        except DockerException as e:
+            if timeout is not None and e.code in TIMEOUT_EXIT_CODES:
+                raise CommandTimeoutException(e.code, e.output, timeout)
+            raise
+
+    def update(self, metadata, resource):
+        """
+        Change the EC2 metadata and resource served by the running container's mock servers
+
+        :param metadata: the new EC2 metadata (json string)
+        :param resource: the new resource. Must have the same name as the current one
+        """
+        self.put_files(CFNInitLocalContainer.__payload_files(metadata, resource, self._artifact_mirrors))
+        self._resource = resource
+
+    def collect_artifacts(self, paths, destination):
+        """
+        Copy files and directories out of the container into a gzipped tar on the host, using a single
+        archive fetch. Paths that do not exist are left out.
+
+        :param paths: absolute paths in the container
+        :param destination: path of the bundle (.tar.gz) to write on the host
+        :return: number of (uncompressed) bytes written
+        """
+        script = STAGE_ARTIFACTS_SCRIPT_FORMAT.format(
+            dir=ARTIFACTS_STAGING_DIR, paths=" ".join(shlex.quote(path) for path in paths))
+        self.execute(["/bin/sh", "-c", script])
+        return IOUtils.write_stream(self.get_archive(ARTIFACTS_STAGING_DIR), destination, compress=True)
+
+    def wait_until_ready(self, timeout=DEFAULT_READY_TIMEOUT):
+        """
+        Block until the mock servers in the container are serving
+
+        :param timeout: max seconds to wait
+        :return: seconds it took from the container starting to the servers being ready
+        :raises ContainerNotReadyException: if the servers are not ready within the timeout
+        """
+        cmd = WAIT_FOR_READY_CMD_FORMAT.format(
+            marker=READY_MARKER_PATH, max_polls=int(timeout / READY_POLL_INTERVAL), interval=READY_POLL_INTERVAL)
+        try:
+            ready_at = float(self.execute(cmd).strip())
+        except DockerException as e:
+            raise ContainerNotReadyException(
+                "Mock servers in {} were not ready within {} seconds: {}".format(self, timeout, e))
+        self._time_to_ready = max(0.0, ready_at - self.started_at) if self.started_at is not None else None
+        return self._time_to_ready
+
+    @property
+    def time_to_ready(self):
+        """
+        Seconds it took from the container starting to the mock servers being ready
+
+        :return: the time to ready or None if not known
         """
-        return self.execute(
-            CFN_INIT_CMD_FORMAT.format(stack=self._stack.name, resource=self._resource.name, url=CFN_INIT_MOCK_SERVER_URL))
+        return self._time_to_ready
 
     @property
     def stack(self):
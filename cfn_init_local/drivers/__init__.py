@@ -1,4 +1,5 @@
 import argparse
+import json
 from inspect import Signature, Parameter
 
 
@@ -8,11 +9,11 @@ class BaseDriver(object):
     def drive(self):
         """
 
-        :return:
+        :return: what execute returns
         """
         parser = self.create_parser("Placeholder description")
         args = vars(parser.parse_args())
-        self.execute(**args)
+        return self.execute(**args)
 
     def execute(self, *args, **kwargs):
         """
@@ -53,5 +54,10 @@ class BaseDriver(object):
                 arg_options = {
                     "required": True
                 }
+            if parameter_type is list:
+                arg_options.pop("type", None)
+                arg_options["nargs"] = "+" if arg_options.get("required") else "*"
+            elif parameter_type is dict:
+                arg_options["type"] = json.loads
             parser.add_argument('--{}'.format(parameter.name.replace("_", "-")), **arg_options)
         return parser
@@ -0,0 +1,277 @@
+import glob
+import os
+from cfn_init_local.cache.checkpoints import CheckpointStore
+from cfn_init_local.cache.packages import PackageCache, DEFAULT_MAX_SIZE_MB
+from cfn_init_local.cache.results import ResultCache, DEFAULT_CACHE_DIR
+from cfn_init_local.cache.templates import TemplateCache
+from cfn_init_local.docker.resources import DEFAULT_READY_TIMEOUT
+from cfn_init_local.drivers.run_driver import RunDriver, RunSettings, DEFAULT_STOP_TIMEOUT, LOGGER
+from cfn_init_local.report.models import ResourceReport, RunReport, PASSED, FAILED, CACHED, NOT_RUN
+from cfn_init_local.utils.io_utils import IOUtils
+
+TEMPLATE_EXTENSIONS = (".json", ".template", ".yaml", ".yml")
+DEFAULT_BATCH_PARALLELISM = 4
+
+
+class BatchEntry(object):
+    """A template to run as part of a batch along with the image and EC2 metadata to run it with"""
+
+    def __init__(self, path, name, image, metadata_paths, parameters=None):
+        """
+        :param path: path of the template
+        :param name: name of the stack, None to name it after the template file (see BatchDriver)
+        :param image: image to run the template in
+        :param metadata_paths: dict of resource name to EC2 metadata path
+        :param parameters: dict of template parameter name to value
+        """
+        self.path = path
+        self.name = name
+        self.image = image
+        self.metadata_paths = metadata_paths
+        self.parameters = parameters or {}
+
+    def __str__(self):
+        return "{} ({})".format(self.name, self.path)
+
+
+class BatchDriver(RunDriver):
+    """Runs cfn-init for many templates at once through a single docker client and worker pool"""
+
+    def execute(self, templates: list = [], manifest: str = None, image: str = None, metadata_paths: dict = {},
+                verbose: bool = False, parallelism: int = DEFAULT_BATCH_PARALLELISM,
+                stop_timeout: int = DEFAULT_STOP_TIMEOUT, remove_containers: bool = False,
+                ready_timeout: int = DEFAULT_READY_TIMEOUT, no_cache: bool = False, cache_dir: str = DEFAULT_CACHE_DIR,
+                dedupe: bool = False, checkpoint: bool = False, report_json: str = None, report_junit: str = None,
+                stream_output: bool = False, log_dir: str = None, exec_timeout: int = None, fail_fast: bool = False,
+                artifacts_dir: str = None, artifact_paths: list = [], parameters: dict = {},
+                parameters_file: str = None, no_evaluate: bool = False, incremental_scan: bool = False,
+                no_template_cache: bool = False, no_validate: bool = False, config_sets: list = [],
+                all_config_sets: bool = False, artifact_mirrors: dict = {}, package_cache: bool = False,
+                package_cache_family: str = None, package_cache_max_mb: int = DEFAULT_MAX_SIZE_MB,
+                imds_v2_only: bool = False):
+        """
+        Run cfn-init for every resource of every template. All (template, resource) pairs share one pod and are
+        scheduled on one pool, so parallelism is a global limit for the whole batch.
+
+        :param templates: template files, directories of templates or glob patterns
+        :param manifest: json file of the form
+            {"templates": [{"path", "name", "image", "metadata_paths", "parameters"}]}.
+            Relative paths are relative to the manifest. Entries without an image or metadata paths use the
+            ones passed here. An entry's parameters take precedence over the ones passed here
+        :param image: image to run templates in
+        :param metadata_paths: dict of resource name to EC2 metadata path
+        :param verbose:
+        :param parallelism: max number of containers being started or running cfn-init at the same time. A
+            container is started for every resource of every template up front and kept running until the batch
+            completes, so the host must be able to run that many containers at once
+        :param stop_timeout: seconds to wait for containers to stop before killing them. 0 kills immediately
+        :param remove_containers: remove containers once done, keeping only those whose cfn-init failed
+        :param ready_timeout: seconds to wait for the mock servers in each container to be ready
+        :param no_cache: run every resource even if it has a cached passing result
+        :param cache_dir: directory to keep cached results in
+        :param dedupe: run cfn-init once for resources with identical cfn-init blocks and EC2 metadata
+        :param checkpoint: snapshot containers after each config and start later runs from the deepest snapshot
+        :param report_json: file to write a json report of every resource's outcome and phase timings to
+        :param report_junit: file to write a JUnit XML report with a testsuite per template to
+        :param stream_output: log cfn-init's output live, each line prefixed with its stack and resource
+        :param log_dir: directory to write each resource's cfn-init output to, as <stack>/<resource>.log
+        :param exec_timeout: seconds after which a run of cfn-init is killed and fails
+        :param fail_fast: once any resource fails, skip the resources of every template that have not started
+            running cfn-init yet
+        :param artifacts_dir: directory to collect the cfn-init logs (and artifact_paths) of each resource's
+            container into, as <stack>/<resource>.tar.gz
+        :param artifact_paths: paths to collect from each container in addition to the cfn-init logs
+        :param parameters: dict of template parameter (or pseudo parameter, e.g. AWS::Region) name to value,
+            for every template
+        :param parameters_file: json file of parameter values for every template. Values in parameters take
+            precedence
+        :param no_evaluate: serve the metadata as written instead of resolving its intrinsic functions
+        :param incremental_scan: decode templates one resource at a time, keeping only resources using
+            cfn-init in memory
+        :param no_template_cache: parse templates even if they have not changed since a previous run
+        :param no_validate: run resources even if their cfn-init block is invalid
+        :param config_sets: configSets to run for each resource that has them, each in a container of its own,
+            instead of cfn-init's default
+        :param all_config_sets: run every configSet of each resource, each in a container of its own
+        :param artifact_mirrors: dict of URL prefix to a local directory or file to serve for the URLs starting with
+            it from within each container, instead of downloading them
+        :param package_cache: share the packages yum, dnf, apt and pip download between every container of every
+            template, through a docker volume per image family
+        :param package_cache_family: name of the package cache to use for every image. Each image has its own when
+            not specified
+        :param package_cache_max_mb: least recently used packages are removed from a package cache past this size
+        :param imds_v2_only: have the mock EC2 metadata server reject requests without an IMDSv2 session token
+        :return:
+        """
+        if verbose:
+            LOGGER.setLevel("debug")
+        RunDriver._check_config_sets(config_sets, all_config_sets)
+        artifact_mirrors = RunDriver._artifact_mirrors(artifact_mirrors)
+
+        entries = BatchDriver.__expand_templates(templates, image, metadata_paths)
+        if manifest is not None:
+            entries += BatchDriver.__read_manifest(manifest, image, metadata_paths)
+        if len(entries) == 0:
+            raise ValueError("No templates found. Specify --templates and/or --manifest")
+        BatchDriver.__name_entries(entries)
+        missing_image = [str(entry) for entry in entries if entry.image is None]
+        if len(missing_image) > 0:
+            raise ValueError("No image specified for templates: {}".format(", ".join(missing_image)))
+
+        result_cache = ResultCache(cache_dir)
+        template_cache = None if no_template_cache else TemplateCache(cache_dir)
+        checkpoint_store = CheckpointStore(self._client) if checkpoint else None
+        packages = PackageCache(self._client, package_cache_family, package_cache_max_mb) if package_cache else None
+        image_ids = {image: self._client.get_image_id(image) for image in sorted({entry.image for entry in entries})}
+
+        parameters = RunDriver._parameters(parameters, parameters_file)
+
+        LOGGER.info("Starting CfnInitLocal for %d templates...", len(entries))
+        report = RunReport()
+        jobs, stacks = [], {}
+        for entry in entries:
+            entry_parameters = None if no_evaluate else dict(parameters, **entry.parameters)
+            try:
+                plans = RunDriver._plan(entry.path, entry.name, entry.metadata_paths, dedupe, entry_parameters,
+                                        incremental_scan, template_cache)
+            except Exception as e:
+                LOGGER.error("Could not load template %s: %s", entry, e)
+                # Reported under the template's file name, which can not clash with a resource's logical id
+                report.add(ResourceReport(entry.name, os.path.basename(entry.path), FAILED,
+                                          error="Could not load template: {}".format(e)))
+                continue
+            settings = RunSettings(entry.image, image_ids[entry.image], ready_timeout, result_cache, no_cache,
+                                   dedupe, checkpoint_store, exec_timeout, stream_output, log_dir, entry_parameters,
+                                   incremental_scan, template_cache, not no_validate, config_sets, all_config_sets,
+                                   artifact_mirrors, packages, imds_v2_only)
+            stacks[entry] = {stack.name for stack, _ in plans}
+            jobs += RunDriver._schedule(plans, settings, report)
+
+        pod = self._create_pod(jobs, max_concurrent_requests=parallelism, stop_timeout=stop_timeout,
+                               remove=remove_containers)
+        with pod:
+            runs = RunDriver._run_jobs(jobs, parallelism, fail_fast)
+            if artifacts_dir is not None:
+                RunDriver._collect_artifacts(list(zip(jobs, runs)), pod.containers, artifacts_dir, artifact_paths,
+                                             parallelism)
+            RunDriver._output_container_resume_statements(pod.retained_containers())
+            LOGGER.info("Stopping containers")
+        LOGGER.info("Stopped containers in %.2f seconds", pod.teardown_duration)
+        result_cache.evict()
+        if template_cache is not None:
+            template_cache.evict()
+        if packages is not None:
+            RunDriver._log_package_cache_sizes(packages)
+        RunDriver._report_runs(report, zip(jobs, runs))
+        BatchDriver.__log_summary(entries, stacks, report)
+        RunDriver._write_report(report, report_json, report_junit)
+        LOGGER.info("Completed CfnInitLocal")
+
+    @staticmethod
+    def __expand_templates(templates, image, metadata_paths):
+        """
+        Turn template files, directories and glob patterns into batch entries
+
+        :param templates: template files, directories of templates or glob patterns
+        :param image: image to run the templates in
+        :param metadata_paths: dict of resource name to EC2 metadata path
+        :return: list of BatchEntries
+        """
+        paths = []
+        for template in templates:
+            if os.path.isdir(template):
+                matches = [os.path.join(template, name) for name in os.listdir(template)
+                           if name.endswith(TEMPLATE_EXTENSIONS)]
+            else:
+                matches = glob.glob(template)
+            if len(matches) == 0:
+                LOGGER.warning("No templates found matching '%s'", template)
+            paths += sorted(match for match in matches if os.path.isfile(match) and match not in paths)
+        return [BatchEntry(path, None, image, metadata_paths) for path in paths]
+
+    @staticmethod
+    def __read_manifest(manifest, image, metadata_paths):
+        """
+        Read batch entries from a manifest
+
+        :param manifest: path of the manifest
+        :param image: image for entries that do not specify one
+        :param metadata_paths: metadata paths for entries that do not specify any
+        :return: list of BatchEntries
+        """
+        root = os.path.dirname(os.path.abspath(manifest))
+        entries = []
+        for item in IOUtils.read_json(manifest).get("templates", []):
+            path = os.path.join(root, item["path"])
+            entry_metadata_paths = {resource: os.path.join(root, metadata_path)
+                                    for resource, metadata_path in item.get("metadata_paths", {}).items()}
+            entries.append(BatchEntry(path, item.get("name"), item.get("image", image), entry_metadata_paths or metadata_paths,
+                                      item.get("parameters")))
+        return entries
+
+    @staticmethod
+    def __name_entries(entries):
+        """
+        Name the entries without a name after their template file. Templates in different directories sharing a
+        file name are named after their path relative to the directory they have in common instead, e.g.
+        a/template.yaml and b/template.yaml become stacks a-template and b-template, so their reports, logs and
+        artifacts are kept apart
+
+        :param entries: every BatchEntry
+        :raises ValueError: if entries still share a name
+        """
+        unnamed = {}
+        for entry in entries:
+            if entry.name is None:
+                unnamed.setdefault(BatchDriver.__template_name(entry.path), []).append(entry)
+        for name, group in unnamed.items():
+            paths = {os.path.abspath(entry.path) for entry in group}
+            root = os.path.commonpath([os.path.dirname(path) for path in paths]) if len(paths) > 1 else None
+            for entry in group:
+                if root is None:
+                    entry.name = name
+                else:
+                    relative = os.path.relpath(os.path.splitext(os.path.abspath(entry.path))[0], root)
+                    entry.name = relative.replace(os.sep, "-")
+        names = {}
+        for entry in entries:
+            names.setdefault(entry.name, []).append(entry.path)
+        shared = ["'{}' ({})".format(name, ", ".join(paths)) for name, paths in names.items() if len(paths) > 1]
+        if len(shared) > 0:
+            raise ValueError("Templates must have distinct names; give them one in the manifest. Shared names: "
+                             "{}".format("; ".join(shared)))
+
+    @staticmethod
+    def __template_name(path):
+        """
+
+        :param path: path of a template
+        :return: name of the template derived from its file name
+        """
+        return os.path.splitext(os.path.basename(path))[0]
+
+    @staticmethod
+    def __log_summary(entries, stacks, report):
+        """
+        Log how many resources of each template passed, failed, were cached and were not run
+
+        :param entries: every BatchEntry
+        :param stacks: dict of BatchEntry to the names of its stacks (the template and its nested stacks), for
+            entries whose template could be loaded
+        :param report: the RunReport of every resource
+        """
+        lines = []
+        total_failed = 0
+        for entry in entries:
+            if entry not in stacks:
+                lines.append("{}: could not be loaded".format(entry))
+                continue
+            counts = {status: 0 for status in (PASSED, FAILED, CACHED, NOT_RUN)}
+            for resource in report.resources:
+                if resource.stack in stacks[entry]:
+                    counts[resource.status] += 1
+            total_failed += counts[FAILED]
+            lines.append("{}: {} passed, {} failed, {} cached, {} not run".format(
+                entry, counts[PASSED], counts[FAILED], counts[CACHED], counts[NOT_RUN]))
+        LOGGER.info("Batch summary (%d templates, %d failed resources):\n%s", len(entries), total_failed,
+                    "\n".join(lines))
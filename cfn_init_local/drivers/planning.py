@@ -0,0 +1,96 @@
+from cfn_init_local.utils.hash_utils import HashUtils
+
+
+class ResourceGroup(object):
+    """
+    Resources whose cfn-init block and EC2 metadata are identical. cfn-init only has to be run
+    for the representative (first) member and its result holds for every member.
+    """
+
+    def __init__(self, key, resource, metadata):
+        self._key = key
+        self._members = [resource]
+        self._metadata = metadata
+
+    def __str__(self):
+        return str(self.representative)
+
+    @property
+    def key(self):
+        """
+        Hash of the normalized cfn-init block and EC2 metadata shared by every member
+
+        :return: the key
+        """
+        return self._key
+
+    @property
+    def representative(self):
+        """
+        The resource cfn-init is run for on behalf of the group
+
+        :return: the resource
+        """
+        return self._members[0]
+
+    @property
+    def members(self):
+        """
+        Every resource in the group, representative first
+
+        :return: list of resources
+        """
+        return self._members
+
+    @property
+    def duplicates(self):
+        """
+        Members of the group other than the representative
+
+        :return: list of resources
+        """
+        return self._members[1:]
+
+    @property
+    def metadata(self):
+        """
+        The EC2 metadata shared by every member
+
+        :return: the EC2 metadata json string
+        """
+        return self._metadata
+
+    def add_member(self, resource):
+        """
+
+        :param resource: resource to add to the group
+        """
+        self._members.append(resource)
+
+
+class ExecutionPlanner(object):
+    """Decides which resources need a container of their own"""
+
+    def __init__(self, metadata_factory):
+        self._metadata_factory = metadata_factory
+
+    def plan(self, resources, dedupe=False):
+        """
+        Group resources. Without dedupe every resource is in a group of its own.
+
+        :param resources: resources using cfn-init
+        :param dedupe: whether to group resources with identical cfn-init blocks and EC2 metadata
+        :return: list of ResourceGroups in the order their representatives appear in resources
+        """
+        groups = []
+        groups_by_key = {}
+        for resource in resources:
+            metadata = self._metadata_factory.get_metadata(resource)
+            key = HashUtils.stable_hash(resource.cfn_init, metadata)
+            if dedupe and key in groups_by_key:
+                groups_by_key[key].add_member(resource)
+                continue
+            group = ResourceGroup(key, resource, metadata)
+            groups_by_key.setdefault(key, group)
+            groups.append(group)
+        return groups
@@ -1,13 +1,222 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event
+from cfn_init_local.cache.checkpoints import CheckpointStore
+from cfn_init_local.cache.packages import PackageCache, BYTES_PER_MB, DEFAULT_MAX_SIZE_MB
+from cfn_init_local.cache.results import ResultCache, DEFAULT_CACHE_DIR, DEFAULT_MAX_AGE_DAYS, DEFAULT_MAX_ENTRIES, \
+    DEFAULT_MAX_RESULTS_SIZE_MB
+from cfn_init_local.cache.templates import TemplateCache
+from cfn_init_local.cloudformation.loader import TemplateLoader, LOAD_ERRORS
 from cfn_init_local.cloudformation.models import Template
+from cfn_init_local.cloudformation.validation import InitValidator
 from cfn_init_local.docker.client import DockerClient
-from cfn_init_local.docker.resources import CFNInitLocalContainer
+from cfn_init_local.docker.exceptions import DockerException
+from cfn_init_local.docker.resources import CFNInitLocalContainer, DEFAULT_READY_TIMEOUT, DEFAULT_ARTIFACT_PATHS
 from cfn_init_local.drivers import BaseDriver
+from cfn_init_local.drivers.planning import ExecutionPlanner
+from cfn_init_local.report.models import CommandResult, ResourceReport, RunReport, PASSED, FAILED, CACHED, NOT_RUN, \
+    CONFIG_SET_NAME_FORMAT, PHASE_CREATE, PHASE_READY, PHASE_FIRST_RUN, PHASE_SECOND_RUN, PHASE_TEARDOWN
+from cfn_init_local.report.writers import JsonReportWriter, JUnitReportWriter
 from cfn_init_local.utils.data_utils import MetadataPathFactory
 from cfn_init_local.utils.logging import LoggerBuilder
+from cfn_init_local.utils.output_utils import StreamedOutput
+from cfn_init_local.utils.watch_utils import FileWatcher
 
 LOGGER = LoggerBuilder.standard_console_logger(__file__)
 
 DEFAULT_CFN_INIT_LOCAL_IMAGE_TAG = "cfn-init-local"
+DEFAULT_STOP_TIMEOUT = 10
+DEFAULT_WATCH_INTERVAL = 0.25
+LOG_FILE_FORMAT = "{resource}.log"
+ARTIFACT_BUNDLE_FORMAT = "{resource}.tar.gz"
+
+
+class CfnInitRun(object):
+    """Outcome of running cfn-init (and its idempotency check) within a single container"""
+
+    def __init__(self, container):
+        self._container = container
+        self.ready_error = None
+        self.package_cache_error = None
+        self.first_run_error = None
+        self.second_run_error = None
+        self.second_run_attempted = False
+        self.skipped = False
+        self.artifacts = None
+        self.ready_duration = None
+        self.first_run = None
+        self.second_run = None
+
+    @property
+    def container(self):
+        """
+        The container cfn-init was run in
+
+        :return: the container
+        """
+        return self._container
+
+    @property
+    def passed(self):
+        """
+        Whether both runs of cfn-init passed
+
+        :return: true if both runs passed
+        """
+        return self.second_run_attempted and self.ready_error is None and self.first_run_error is None \
+            and self.second_run_error is None
+
+
+class RunSettings(object):
+    """Settings shared by every cfn-init run of a template"""
+
+    def __init__(self, image, image_id, ready_timeout, result_cache, no_cache, dedupe, checkpoint_store=None,
+                 exec_timeout=None, stream_output=False, log_dir=None, parameters=None, incremental_scan=False,
+                 template_cache=None, validate=False, config_sets=None, all_config_sets=False, artifact_mirrors=None,
+                 package_cache=None, imds_v2_only=False):
+        self.image = image
+        self.image_id = image_id
+        self.ready_timeout = ready_timeout
+        self.result_cache = result_cache
+        self.no_cache = no_cache
+        self.dedupe = dedupe
+        self.checkpoint_store = checkpoint_store
+        self.exec_timeout = exec_timeout
+        self.stream_output = stream_output
+        self.log_dir = log_dir
+        self.parameters = parameters
+        self.incremental_scan = incremental_scan
+        self.template_cache = template_cache
+        self.validate = validate
+        self.config_sets = config_sets
+        self.all_config_sets = all_config_sets
+        self.artifact_mirrors = artifact_mirrors or {}
+        self.package_cache = package_cache
+        self.imds_v2_only = imds_v2_only
+
+    def config_sets_of(self, resource):
+        """
+
+        :param resource: a resource
+        :return: list of the configSets to run for the resource, each in a container of its own. [None] runs
+            cfn-init's default in a single container
+        """
+        if self.all_config_sets:
+            return resource.config_set_names
+        if self.config_sets:
+            names = resource.config_set_names
+            return [config_set for config_set in self.config_sets if config_set in names]
+        return [None]
+
+    def cache_key(self, group, config_set=None):
+        """
+
+        :param group: a ResourceGroup
+        :param config_set: the configSet run, if not cfn-init's default
+        :return: the result cache key of the group
+        """
+        # A pass with a mirror or without IMDSv2 being required says nothing about a run without or with them
+        settings = {}
+        if self.imds_v2_only:
+            settings["imds_v2_only"] = True
+        if self.artifact_mirrors:
+            settings["artifact_mirrors"] = self.artifact_mirrors
+        return ResultCache.key(group.representative.cfn_init, group.metadata, self.image_id, config_set, settings)
+
+    def checkpoint_plan(self, group, config_set=None):
+        """
+
+        :param group: a ResourceGroup
+        :param config_set: the configSet run, if not cfn-init's default
+        :return: the CheckpointPlan of the group or None when not checkpointing
+        """
+        if self.checkpoint_store is None:
+            return None
+        if config_set is not None:
+            return self.checkpoint_store.plan(group.representative, group.metadata, self.image, self.image_id,
+                                              config_set)
+        return self.checkpoint_store.plan(group.representative, group.metadata, self.image, self.image_id)
+
+    def open_output(self, stack, name, append=False):
+        """
+        Open a sink to stream a run of cfn-init for a resource to
+
+        :param stack: the stack the resource belongs to
+        :param name: name of the run (see CfnInitJob.name)
+        :param append: whether to append to the run's log file rather than replace it
+        :return: the StreamedOutput or None when neither streaming output nor writing log files
+        """
+        if not self.stream_output and self.log_dir is None:
+            return None
+        on_line = None
+        if self.stream_output:
+            on_line = lambda line: LOGGER.info("[%s/%s] %s", stack.name, name, line)
+        log_path = None
+        if self.log_dir is not None:
+            log_path = os.path.join(self.log_dir, stack.name, LOG_FILE_FORMAT.format(resource=name))
+        return StreamedOutput(on_line, log_path, append)
+
+
+class CfnInitJob(object):
+    """Running cfn-init for a ResourceGroup of a stack, or one configSet of it, in a container of its own"""
+
+    def __init__(self, stack, group, settings, config_set=None):
+        self.stack = stack
+        self.group = group
+        self.settings = settings
+        self.config_set = config_set
+        self.plan = settings.checkpoint_plan(group, config_set)
+        self.container = None
+
+    def __str__(self):
+        if self.config_set is None:
+            return str(self.group)
+        return CONFIG_SET_NAME_FORMAT.format(resource=self.group, config_set=self.config_set)
+
+    @property
+    def name(self):
+        """
+
+        :return: name of the group's representative, followed by the configSet in brackets if one is run
+        """
+        resource = self.group.representative.name
+        if self.config_set is None:
+            return resource
+        return CONFIG_SET_NAME_FORMAT.format(resource=resource, config_set=self.config_set)
+
+    @property
+    def config_sets(self):
+        """
+
+        :return: configSets to pass to cfn-init, or None to run its default
+        """
+        if self.plan is not None:
+            return self.plan.config_sets
+        return [self.config_set] if self.config_set is not None else None
+
+    def create_container(self):
+        """
+        Create (but do not start) the container for the job
+
+        :return: the container
+        """
+        plan = self.plan
+        if plan is not None and len(plan.restored_steps) > 0:
+            LOGGER.info("Resuming resource '%s' from the checkpoint taken after config '%s' (%d of %d configs)",
+                        self.group.representative, plan.restored_steps[-1].config_name, len(plan.restored_steps),
+                        len(plan.steps))
+        self.container = CFNInitLocalContainer.create(
+            image=plan.start_image if plan else self.settings.image,
+            metadata=self.group.metadata,
+            resource=plan.resource if plan else self.group.representative,
+            stack=self.stack,
+            artifact_mirrors=self.settings.artifact_mirrors,
+            package_cache_volume=self.settings.package_cache.volume(self.settings.image)
+            if self.settings.package_cache is not None else None,
+            imds_v2_only=self.settings.imds_v2_only
+        )
+        return self.container
 
 
 class RunDriver(BaseDriver):
@@ -16,8 +225,22 @@ class RunDriver(BaseDriver):
     def __init__(self, docker_client=None):
         self._client = docker_client or DockerClient()
 
-    def execute(self, template_name: str, template_body: str,image: str, metadata_paths: dict = {},
-                verbose: bool = False):
+    def execute(self, template_name: str, template_body: str, image: str, metadata_paths: dict = {},
+                verbose: bool = False, parallelism: int = 1, stop_timeout: int = DEFAULT_STOP_TIMEOUT,
+                remove_containers: bool = False, ready_timeout: int = DEFAULT_READY_TIMEOUT, no_cache: bool = False,
+                clear_cache: bool = False, cache_dir: str = DEFAULT_CACHE_DIR,
+                cache_max_age_days: int = DEFAULT_MAX_AGE_DAYS, cache_max_entries: int = DEFAULT_MAX_ENTRIES,
+                cache_max_mb: int = DEFAULT_MAX_RESULTS_SIZE_MB, dedupe: bool = False, checkpoint: bool = False,
+                clear_checkpoints: bool = False, watch: bool = False, watch_interval: float = DEFAULT_WATCH_INTERVAL,
+                reuse_containers: bool = False, report_json: str = None, report_junit: str = None,
+                stream_output: bool = False, log_dir: str = None,
+                exec_timeout: int = None, fail_fast: bool = False, artifacts_dir: str = None,
+                artifact_paths: list = [], parameters: dict = {}, parameters_file: str = None,
+                no_evaluate: bool = False, incremental_scan: bool = False, no_template_cache: bool = False,
+                no_validate: bool = False, config_sets: list = [], all_config_sets: bool = False,
+                artifact_mirrors: dict = {}, package_cache: bool = False, package_cache_family: str = None,
+                package_cache_max_mb: int = DEFAULT_MAX_SIZE_MB, clear_package_cache: bool = False,
+                imds_v2_only: bool = False):
         """
 
 
@@ -26,65 +249,643 @@ class RunDriver(BaseDriver):
         :param image:
         :param metadata_paths:
         :param verbose:
+        :param parallelism: max number of containers to run cfn-init in at the same time
+        :param stop_timeout: seconds to wait for containers to stop before killing them. 0 kills immediately
+        :param remove_containers: remove containers once done, keeping only those whose cfn-init failed
+        :param ready_timeout: seconds to wait for the mock servers in each container to be ready
+        :param no_cache: run every resource even if it has a cached passing result
+        :param clear_cache: remove every cached result before running
+        :param cache_dir: directory to keep cached results in
+        :param cache_max_age_days: cached results older than this are evicted
+        :param cache_max_entries: max number of cached results kept
+        :param cache_max_mb: max total size of the cached results kept
+        :param dedupe: run cfn-init once for resources with identical cfn-init blocks and EC2 metadata
+        :param checkpoint: snapshot containers after each config and start later runs from the deepest snapshot
+        :param clear_checkpoints: remove every checkpoint image before running
+        :param watch: keep running and re-run cfn-init for resources whose cfn-init or metadata change
+        :param watch_interval: seconds between checks for changes when watching
+        :param reuse_containers: when watching, re-run cfn-init in a resource's existing container instead of a
+            fresh one
+        :param report_json: file to write a json report of every resource's outcome and phase timings to
+        :param report_junit: file to write a JUnit XML report of every resource's outcome to
+        :param stream_output: log cfn-init's output live, each line prefixed with its stack and resource
+        :param log_dir: directory to write each resource's cfn-init output to, as <stack>/<resource>.log
+        :param exec_timeout: seconds after which a run of cfn-init is killed and fails
+        :param fail_fast: once any resource fails, skip the resources that have not started running cfn-init yet
+        :param artifacts_dir: directory to collect the cfn-init logs (and artifact_paths) of each resource's
+            container into, as <stack>/<resource>.tar.gz
+        :param artifact_paths: paths to collect from each container in addition to the cfn-init logs
+        :param parameters: dict of template parameter (or pseudo parameter, e.g. AWS::Region) name to value
+        :param parameters_file: json file of parameter values. Values in parameters take precedence
+        :param no_evaluate: serve the metadata as written instead of resolving its intrinsic functions
+        :param incremental_scan: decode the template one resource at a time, keeping only resources using
+            cfn-init in memory. Lowers peak memory for templates with thousands of resources
+        :param no_template_cache: parse templates even if they have not changed since a previous run
+        :param no_validate: run resources even if their cfn-init block is invalid
+        :param config_sets: configSets to run for each resource that has them, each in a container of its own,
+            instead of cfn-init's default. Reported as <resource>[<configSet>]
+        :param all_config_sets: run every configSet of each resource, each in a container of its own
+        :param artifact_mirrors: dict of URL prefix to a local directory or file to serve for the URLs starting with
+            it (sources and files with a source) from within each container, instead of downloading them
+        :param package_cache: share the packages yum, dnf, apt and pip download between every container, through
+            a docker volume per image family
+        :param package_cache_family: name of the package cache to use for every image, e.g. to share one between
+            images built from the same base image. Each image has its own when not specified
+        :param package_cache_max_mb: least recently used packages are removed from a package cache past this size
+        :param clear_package_cache: remove every package cache volume before running
+        :param imds_v2_only: have the mock EC2 metadata server reject requests without an IMDSv2 session token, as
+            on instances that require IMDSv2
         :return:
         """
         if verbose:
             LOGGER.setLevel("debug")
+        RunDriver._check_config_sets(config_sets, all_config_sets)
+        artifact_mirrors = RunDriver._artifact_mirrors(artifact_mirrors)
 
-        stack = Template.from_file_path(template_body, template_name)
-        metadata_factory = MetadataPathFactory(metadata_paths)
+        result_cache = ResultCache(cache_dir, cache_max_age_days, cache_max_entries, cache_max_mb)
+        template_cache = None if no_template_cache else TemplateCache(cache_dir, cache_max_age_days)
+        if clear_cache:
+            LOGGER.info("Clearing cached results")
+            result_cache.clear()
+            TemplateCache(cache_dir).clear()
+        checkpoint_store = CheckpointStore(self._client)
+        if clear_checkpoints:
+            LOGGER.info("Removed %d checkpoint images", checkpoint_store.clear())
+        packages = PackageCache(self._client, package_cache_family, package_cache_max_mb)
+        if clear_package_cache:
+            LOGGER.info("Removed %d package cache volumes", packages.clear())
 
         LOGGER.info("Starting CfnInitLocal...")
-        with self.__create_pod(stack, image, metadata_factory) as pod:
-            for container in pod.containers:
-                # Run 1
-                LOGGER.debug("Created container for resource '%s' with id '%s'. Running cfn-init", container.resource,
-                             container.id)
+        report = RunReport()
+        parameters = None if no_evaluate else RunDriver._parameters(parameters, parameters_file)
+        try:
+            plans = RunDriver._plan(template_body, template_name, metadata_paths, dedupe, parameters,
+                                    incremental_scan, template_cache)
+        except LOAD_ERRORS as e:
+            LOGGER.error("Could not load template '%s': %s", template_body, e)
+            report.add(ResourceReport(template_name, os.path.basename(template_body), FAILED,
+                                      error="Could not load template: {}".format(e)))
+            RunDriver._write_report(report, report_json, report_junit)
+            return
+        settings = RunSettings(image, self._client.get_image_id(image), ready_timeout, result_cache, no_cache, dedupe,
+                               checkpoint_store if checkpoint else None, exec_timeout, stream_output, log_dir,
+                               parameters, incremental_scan, template_cache, not no_validate, config_sets,
+                               all_config_sets, artifact_mirrors, packages if package_cache else None, imds_v2_only)
+        fingerprints = RunDriver.__fingerprints(plans)
+        jobs = RunDriver._schedule(plans, settings, report)
+
+        pod = self._create_pod(jobs, stop_timeout=stop_timeout, remove=remove_containers)
+        outcomes = []
+        with pod:
+            outcomes += zip(jobs, RunDriver._run_jobs(jobs, parallelism, fail_fast))
+            if watch:
+                watched_paths = list(dict.fromkeys([stack.path for stack, _ in plans] + list(metadata_paths.values())))
+                self.__watch(pod, jobs, fingerprints, template_body, template_name, metadata_paths, watched_paths,
+                             settings, parallelism, watch_interval, reuse_containers, outcomes, report)
+            if artifacts_dir is not None:
+                RunDriver._collect_artifacts(outcomes, pod.containers, artifacts_dir, artifact_paths, parallelism)
+
+            # Output helper message
+            RunDriver._output_container_resume_statements(pod.retained_containers())
+            LOGGER.info("Stopping containers")
+        LOGGER.info("Stopped containers in %.2f seconds", pod.teardown_duration)
+        result_cache.evict()
+        if template_cache is not None:
+            template_cache.evict()
+        if package_cache:
+            RunDriver._log_package_cache_sizes(packages)
+        RunDriver._report_runs(report, outcomes)
+        RunDriver._write_report(report, report_json, report_junit)
+        LOGGER.info("Completed CfnInitLocal")
+
+    @staticmethod
+    def _parameters(parameters, parameters_file):
+        """
+
+        :param parameters: dict of parameter name to value
+        :param parameters_file: json file of parameter values, if any
+        :return: dict of parameter name to value, those in parameters taking precedence
+        """
+        merged = Template.read_parameters(parameters_file) if parameters_file is not None else {}
+        merged.update(parameters)
+        return merged
+
+    @staticmethod
+    def _check_config_sets(config_sets, all_config_sets):
+        """
+
+        :param config_sets: configSets to run
+        :param all_config_sets: whether to run every configSet
+        :raises ValueError: if both are specified
+        """
+        if config_sets and all_config_sets:
+            raise ValueError("Specify either --config-sets or --all-config-sets, not both")
+
+    @staticmethod
+    def _artifact_mirrors(artifact_mirrors):
+        """
+
+        :param artifact_mirrors: dict of URL prefix to local path
+        :return: dict of URL prefix to absolute local path
+        :raises ValueError: if a local path does not exist
+        """
+        missing = [path for path in artifact_mirrors.values() if not os.path.exists(path)]
+        if len(missing) > 0:
+            raise ValueError("Artifact mirror paths do not exist: {}".format(", ".join(missing)))
+        return {prefix: os.path.abspath(path) for prefix, path in artifact_mirrors.items()}
+
+    @staticmethod
+    def _plan(template_body, template_name, metadata_paths, dedupe, parameters=None, incremental_scan=False,
+              template_cache=None):
+        """
+        Load the template and its nested stacks and group the resources in each stack using cfn-init
+
+        :param template_body: path of the template
+        :param template_name: name of the template
+        :param metadata_paths: dict of resource name to EC2 metadata path
+        :param dedupe: whether to group identical resources
+        :param parameters: dict of parameter name to value to evaluate the template with. The template is
+            not evaluated when None
+        :param incremental_scan: whether to decode the template one resource at a time
+        :param template_cache: TemplateCache to reuse parsed templates from, if any
+        :return: list of tuples of a stack and its ResourceGroups, parents before their nested stacks
+        """
+        root = TemplateLoader(incremental_scan, template_cache=template_cache).load(template_body, template_name)
+        planner = ExecutionPlanner(MetadataPathFactory(metadata_paths))
+        plans = []
+        for stack, evaluator in RunDriver._stacks(root, parameters):
+            def on_error(resource_name, error, stack_name=stack.name):
+                LOGGER.warning("Serving the metadata of resource '%s' of stack '%s' as written; it could not be "
+                               "evaluated: %s", resource_name, stack_name, error)
+            plans.append((stack, planner.plan(stack.get_resources_using_cfn_init(evaluator, on_error), dedupe)))
+        return plans
+
+    @staticmethod
+    def _stacks(stack, parameters):
+        """
+
+        :param stack: the template of a stack
+        :param parameters: dict of parameter name to value to evaluate the stack with, or None to not evaluate it
+        :return: list of tuples of the stack and each of its nested stacks with their IntrinsicEvaluator (None when
+            not evaluating). Nested stacks whose condition is false are left out
+        """
+        evaluator = stack.evaluator(parameters) if parameters is not None else None
+        stacks = [(stack, evaluator)]
+        for logical_id, nested in stack.nested_stacks.items():
+            nested_parameters = None
+            if evaluator is not None:
+                nested_parameters = stack.get_nested_stack_parameters(logical_id, parameters, evaluator)
+                if nested_parameters is None:
+                    continue
+            stacks += RunDriver._stacks(nested, nested_parameters)
+        return stacks
+
+    @staticmethod
+    def __fingerprints(plans):
+        """
+
+        :param plans: list of tuples of a stack and its ResourceGroups
+        :return: dict of the (stack name, resource name) of every resource in the groups to the key of its group
+        """
+        return {(stack.name, resource.name): group.key
+                for stack, groups in plans for group in groups for resource in group.members}
+
+    @staticmethod
+    def _schedule(plans, settings, report):
+        """
+        Create a job for every group (and configSet to run) that is valid (when validating) and has no cached
+        passing result, recording the others in the report
+
+        :param plans: list of tuples of a stack and its ResourceGroups
+        :param settings: the RunSettings
+        :param report: the RunReport
+        :return: list of CfnInitJobs
+        """
+        jobs = []
+        for stack, groups in plans:
+            if settings.validate:
+                groups = RunDriver._remove_invalid_groups(stack, groups, report)
+            for group in groups:
+                for config_set in RunDriver._config_sets(stack, group, settings, report):
+                    if RunDriver._is_cached(group, config_set, settings):
+                        RunDriver._report_cached(report, stack, group, config_set)
+                    else:
+                        jobs.append(CfnInitJob(stack, group, settings, config_set))
+        return jobs
+
+    @staticmethod
+    def _config_sets(stack, group, settings, report):
+        """
+        Get the configSets to run for a group, recording its resources as not run if there are none
+
+        :param stack: the stack the group belongs to
+        :param group: the ResourceGroup
+        :param settings: the RunSettings
+        :param report: the RunReport
+        :return: list of configSets, [None] to run cfn-init's default
+        """
+        config_sets = settings.config_sets_of(group.representative)
+        if len(config_sets) == 0:
+            for resource in group.members:
+                LOGGER.warning("Skipping resource '%s' of stack '%s'; it has none of the configSets to run",
+                               resource, stack.name)
+                identical_to = group.representative.name if resource is not group.representative else None
+                report.add(ResourceReport(stack.name, resource.name, NOT_RUN, identical_to=identical_to,
+                                          error="None of the configSets to run"))
+        return config_sets
+
+    @staticmethod
+    def _remove_invalid_groups(stack, groups, report):
+        """
+        Filter out the groups whose cfn-init block is invalid, logging every problem and recording their
+        resources as failed, so no container is started for them
+
+        :param stack: the stack the groups belong to
+        :param groups: the ResourceGroups
+        :param report: the RunReport
+        :return: the valid groups
+        """
+        valid = []
+        for group in groups:
+            errors = InitValidator.validate(group.representative)
+            if len(errors) == 0:
+                valid.append(group)
+                continue
+            for resource in group.members:
+                LOGGER.error("Skipping resource '%s' of stack '%s'; its cfn-init block is invalid:\n%s", resource,
+                             stack.name, "\n".join(str(error) for error in errors))
+                identical_to = group.representative.name if resource is not group.representative else None
+                report.add(ResourceReport(stack.name, resource.name, FAILED, identical_to=identical_to,
+                                          error="Invalid cfn-init block: " + "; ".join(str(e) for e in errors)))
+        return valid
+
+    @staticmethod
+    def _is_cached(group, config_set, settings):
+        """
+        Whether a group already has a cached passing result, logging its resources as skipped if it does
+
+        :param group: the ResourceGroup
+        :param config_set: the configSet to run, if not cfn-init's default
+        :param settings: the RunSettings
+        :return: true if the group does not need to be run
+        """
+        if settings.no_cache or settings.result_cache.get(settings.cache_key(group, config_set)) is None:
+            return False
+        for resource in group.members:
+            LOGGER.info("Skipping resource '%s'%s; cfn-init passed for identical inputs in a previous run (cached)",
+                        resource, "" if config_set is None else " configSet '{}'".format(config_set))
+        return True
+
+    def _create_pod(self, jobs, **kwargs):
+        """
+        Create and start a container for every job
+
+        :param jobs: the CfnInitJobs
+        :param kwargs: passed through to DockerClient.create_pod
+        :return: the pod
+        """
+        return self._client.create_pod([job.create_container() for job in jobs], **kwargs)
+
+    @staticmethod
+    def _run_jobs(jobs, parallelism, fail_fast=False):
+        """
+        Run cfn-init for each job in its started container, log the outcomes and record passing results
+
+        :param jobs: the CfnInitJobs
+        :param parallelism: max number of jobs to run at once
+        :param fail_fast: whether to skip jobs that have not started once any job fails
+        :return: list of the CfnInitRun of each job
+        """
+        # Each container runs both of its passes on a worker, but results are reported in job order
+        # so output is stable regardless of which container finishes first
+        runs = []
+        failed = Event() if fail_fast else None
+        with ThreadPoolExecutor(max_workers=max(1, parallelism)) as executor:
+            futures = [executor.submit(RunDriver.__run_cfn_init, job, failed) for job in jobs]
+            for job, future in zip(jobs, futures):
+                run = future.result()
+                if run.passed:
+                    job.settings.result_cache.put(job.settings.cache_key(job.group, job.config_set), job.stack.name,
+                                                  job.group.representative.name)
+                elif not run.skipped:
+                    run.container.mark_failed()
+                RunDriver.__log_run(job, run)
+                RunDriver.__log_duplicates(job.group, run)
+                runs.append(run)
+        return runs
+
+    def __watch(self, pod, jobs, fingerprints, template_body, template_name, metadata_paths, watched_paths, settings,
+                parallelism, interval, reuse, outcomes, report):
+        """
+        Re-run cfn-init for resources whose cfn-init block or EC2 metadata change until interrupted
+
+        :param pod: the pod containers are added to
+        :param jobs: the CfnInitJobs of the last run
+        :param fingerprints: dict of (stack name, resource name) to the key of the resource's group in the last run
+        :param template_body: path of the template
+        :param template_name: name of the template
+        :param metadata_paths: dict of resource name to EC2 metadata path
+        :param watched_paths: the template files (including those of nested stacks) and metadata files to watch
+        :param settings: the RunSettings
+        :param parallelism: max number of jobs to run at once
+        :param interval: seconds between checks for changes
+        :param reuse: whether to re-run cfn-init in existing containers rather than fresh ones
+        :param outcomes: list to append a tuple of each job run and its CfnInitRun to
+        :param report: the RunReport to record resources skipped as cached in
+        """
+        watcher = FileWatcher(watched_paths, interval)
+        containers = {(job.stack.name, job.group.representative.name, job.config_set): job.container for job in jobs}
+        LOGGER.info("Watching %s for changes. Press Ctrl+C to stop", ", ".join(watched_paths))
+        try:
+            while True:
+                LOGGER.debug("Detected changes to %s", ", ".join(watcher.wait()))
                 try:
-                    container.run_cfn_init()
+                    plans = RunDriver._plan(template_body, template_name, metadata_paths, settings.dedupe,
+                                            settings.parameters, settings.incremental_scan, settings.template_cache)
                 except Exception as e:
-                    LOGGER.error("Recieved exception trying to call cfn-init for resource '%s'", container.resource)
-                    LOGGER.error(e)
+                    LOGGER.error("Could not load template '%s': %s", template_body, e)
+                    continue
+                changed = [(stack, [group for group in groups
+                                    if fingerprints.get((stack.name, group.representative.name)) != group.key])
+                           for stack, groups in plans]
+                fingerprints = RunDriver.__fingerprints(plans)
+                changed_jobs = RunDriver._schedule(changed, settings, report)
+                if len(changed_jobs) == 0:
+                    LOGGER.info("No resources with changes to run")
                     continue
-                LOGGER.info("First run of cfn-init passed for resource '%s'", container.resource)
 
-                # Run 2
-                LOGGER.debug("Executing second run of cfn-int on container '%s' for an idempotency check", container.id)
+                LOGGER.info("Re-running cfn-init for resources: %s", ", ".join(str(job) for job in changed_jobs))
+                for job in changed_jobs:
+                    key = (job.stack.name, job.group.representative.name, job.config_set)
+                    existing = containers.get(key)
+                    if reuse and existing is not None:
+                        existing.update(job.group.metadata, job.group.representative)
+                        job.plan, job.container = None, existing
+                    else:
+                        self._client.start_container(job.create_container())
+                        pod.add_container(job.container)
+                        if existing is not None:
+                            pod.discard_container(existing)
+                    containers[key] = job.container
+                runs = RunDriver._run_jobs(changed_jobs, parallelism)
+                for run in runs:
+                    if run.passed:
+                        # A reused container may have been marked failed by an earlier run
+                        run.container.clear_failed()
+                outcomes += zip(changed_jobs, runs)
+        except KeyboardInterrupt:
+            LOGGER.info("Stopped watching")
+
+    @staticmethod
+    def __run_cfn_init(job, failed=None):
+        """
+        Wait for the job's mock servers, run cfn-init in its container and then run it a second time as an
+        idempotency check. Safe to call from a worker thread; nothing is logged here other than streamed output.
+
+        :param job: the CfnInitJob
+        :param failed: event to skip the job if set and to set if the job fails, when failing fast
+        :return: the CfnInitRun recording the outcome of both runs
+        """
+        run = RunDriver.__run_job_passes(job, failed)
+        if failed is not None and not run.passed and not run.skipped:
+            failed.set()
+        return run
+
+    @staticmethod
+    def __run_job_passes(job, failed):
+        """
+
+        :param job: the CfnInitJob
+        :param failed: event to skip the job if set, when failing fast
+        :return: the CfnInitRun recording the outcome of both runs
+        """
+        container, settings, plan = job.container, job.settings, job.plan
+        run = CfnInitRun(container)
+        if failed is not None and failed.is_set():
+            run.skipped = True
+            return run
+        start = time.monotonic()
+        try:
+            container.wait_until_ready(settings.ready_timeout)
+        except Exception as e:
+            run.ready_error = e
+            return run
+        finally:
+            run.ready_duration = time.monotonic() - start
+
+        if settings.package_cache is not None:
+            try:
+                PackageCache.seed(container)
+            except Exception as e:
+                # Only an optimization; the packages are downloaded instead
+                run.package_cache_error = e
+        output = settings.open_output(job.stack, job.name)
+        kwargs = dict(output=output, timeout=settings.exec_timeout)
+        if plan is not None:
+            run.first_run = RunDriver.__run_command(lambda: CheckpointStore.run(container, plan, **kwargs), output)
+        elif job.config_set is not None:
+            run.first_run = RunDriver.__run_command(lambda: container.run_cfn_init(job.config_sets, **kwargs), output)
+        else:
+            run.first_run = RunDriver.__run_command(lambda: container.run_cfn_init(**kwargs), output)
+        run.first_run_error = run.first_run.exception
+        if run.first_run_error is not None:
+            return run
+        if settings.package_cache is not None and run.package_cache_error is None:
+            try:
+                settings.package_cache.publish(container)
+            except Exception as e:
+                run.package_cache_error = e
+
+        run.second_run_attempted = True
+        output = settings.open_output(job.stack, job.name, append=True)
+        kwargs = dict(output=output, timeout=settings.exec_timeout)
+        run.second_run = RunDriver.__run_command(lambda: container.run_cfn_init(job.config_sets, **kwargs), output)
+        run.second_run_error = run.second_run.exception
+        return run
+
+    @staticmethod
+    def __run_command(func, output=None):
+        """
+        Run a command in a container, timing it and capturing its output
+
+        :param func: function running the command and returning its output
+        :param output: the StreamedOutput the command streams to, if any. It is closed once the command exits
+        :return: the CommandResult. Its exception is the exception raised, if any
+        """
+        start = time.monotonic()
+        try:
+            result = func()
+        except DockerException as e:
+            return CommandResult(e.code, e.output, time.monotonic() - start, str(e), e)
+        except Exception as e:
+            return CommandResult(None, str(e), time.monotonic() - start, str(e), e)
+        finally:
+            if output is not None:
+                output.close()
+        return CommandResult(0, output.text if output is not None else result, time.monotonic() - start)
+
+    @staticmethod
+    def _collect_artifacts(outcomes, containers, artifacts_dir, paths, parallelism):
+        """
+        Collect the cfn-init logs and any other paths from the container of every run concurrently, each
+        into a bundle of its own
+
+        :param outcomes: list of tuples of each CfnInitJob run and its CfnInitRun
+        :param containers: containers that are still around to collect from
+        :param artifacts_dir: directory to write the bundles to
+        :param paths: paths to collect in addition to the cfn-init logs
+        :param parallelism: max number of containers to collect from at once
+        """
+        paths = list(DEFAULT_ARTIFACT_PATHS) + [path for path in paths if path not in DEFAULT_ARTIFACT_PATHS]
+        runs = [(job, run) for job, run in outcomes if not run.skipped and run.container in containers]
+        if len(runs) == 0:
+            return
+        LOGGER.info("Collecting artifacts from %d containers into %s", len(runs), artifacts_dir)
+        with ThreadPoolExecutor(max_workers=max(1, parallelism)) as executor:
+            futures = []
+            for job, run in runs:
+                destination = os.path.join(artifacts_dir, job.stack.name,
+                                           ARTIFACT_BUNDLE_FORMAT.format(resource=job.name))
+                futures.append((destination, executor.submit(run.container.collect_artifacts, paths, destination)))
+            for (job, run), (destination, future) in zip(runs, futures):
                 try:
-                    container.run_cfn_init()
+                    future.result()
                 except Exception as e:
-                    LOGGER.error("Recieved exception trying to call cfn-init a second time for resource '%s'",
-                                 container.resource)
-                    LOGGER.error(e)
-                LOGGER.info("Second run of cfn-init passed for resource '%s'", container.resource)
+                    LOGGER.warning("Could not collect artifacts for resource '%s': %s", job.name, e)
+                    continue
+                run.artifacts = destination
+                LOGGER.debug("Collected artifacts for resource '%s' into %s", job.name, destination)
 
-            # Output helper message
-            RunDriver.__output_container_resume_statements(pod.containers)
-            LOGGER.info("Stopping containers")
-        LOGGER.info("Completed CfnInitLocal")
+    @staticmethod
+    def __log_run(job, run):
+        """
+        Log the outcome of a CfnInitRun
 
-    def __create_pod(self, stack, image, metadata_factory):
+        :param job: the CfnInitJob that was run
+        :param run: the run to log
         """
+        container, name = run.container, job.name
+        if run.skipped:
+            LOGGER.warning("Skipped resource '%s' after an earlier failure (fail fast)", name)
+            return
+        LOGGER.debug("Created container for resource '%s' with id '%s'", name, container.id)
+        if run.ready_error is not None:
+            LOGGER.error("Mock servers never became ready for resource '%s'", name)
+            LOGGER.error(run.ready_error)
+            return
+        LOGGER.debug("Mock servers for resource '%s' ready after %s seconds. Ran cfn-init", name,
+                     container.time_to_ready)
+        if run.package_cache_error is not None:
+            LOGGER.warning("Could not share packages through the package cache for resource '%s': %s", name,
+                           run.package_cache_error)
+        if run.first_run_error is not None:
+            LOGGER.error("Recieved exception trying to call cfn-init for resource '%s'", name)
+            LOGGER.error(run.first_run_error)
+            return
+        LOGGER.info("First run of cfn-init passed for resource '%s'", name)
 
-        :param stack:
-        :param image:
-        :param metadata_factory:
-        :return:
+        LOGGER.debug("Executed second run of cfn-int on container '%s' for an idempotency check", container.id)
+        if run.second_run_error is not None:
+            LOGGER.error("Recieved exception trying to call cfn-init a second time for resource '%s'", name)
+            LOGGER.error(run.second_run_error)
+            return
+        LOGGER.info("Second run of cfn-init passed for resource '%s'", name)
+
+    @staticmethod
+    def __log_duplicates(group, run):
+        """
+        Log the outcome of a run for every resource that shared it without a container of its own
+
+        :param group: the ResourceGroup that was run
+        :param run: the run of the group's representative
+        """
+        for resource in group.duplicates:
+            if run.skipped:
+                LOGGER.warning("Skipped resource '%s' (identical to resource '%s')", resource, group.representative)
+            elif run.passed:
+                LOGGER.info("cfn-init passed for resource '%s' (identical to resource '%s')", resource,
+                            group.representative)
+            else:
+                LOGGER.error("cfn-init failed for resource '%s' (identical to resource '%s')", resource,
+                             group.representative)
+
+    @staticmethod
+    def _report_cached(report, stack, group, config_set=None):
+        """
+        Record every resource of a group that was skipped due to a cached passing result
+
+        :param report: the RunReport
+        :param stack: the stack the group belongs to
+        :param group: the cached ResourceGroup
+        :param config_set: the configSet that was skipped, if not cfn-init's default
+        """
+        for resource in group.members:
+            report.add(ResourceReport(stack.name, resource.name, CACHED, config_set=config_set))
+
+    @staticmethod
+    def _report_runs(report, outcomes):
+        """
+        Record the outcome of every resource that was run. Resources deduplicated into a group share the
+        outcome and timings of the group's representative. Must be called once the containers are torn down
+        so teardown timings are known.
+
+        :param report: the RunReport
+        :param outcomes: list of tuples of each CfnInitJob run and its CfnInitRun
+        """
+        for job, run in outcomes:
+            container = run.container
+            timings = {
+                PHASE_CREATE: container.create_duration,
+                PHASE_READY: run.ready_duration,
+                PHASE_FIRST_RUN: run.first_run.duration if run.first_run else None,
+                PHASE_SECOND_RUN: run.second_run.duration if run.second_run else None,
+                PHASE_TEARDOWN: container.teardown_duration
+            }
+            error = "Mock servers never became ready: {}".format(run.ready_error) if run.ready_error else None
+            status = PASSED if run.passed else FAILED
+            if run.skipped:
+                status, error = NOT_RUN, "Skipped after an earlier failure (fail fast)"
+            for resource in job.group.members:
+                identical_to = job.group.representative.name if resource is not job.group.representative else None
+                report.add(ResourceReport(job.stack.name, resource.name, status, container.id, identical_to,
+                                          run.first_run, run.second_run, timings, error, run.artifacts,
+                                          job.config_set))
+
+    @staticmethod
+    def _log_package_cache_sizes(package_cache):
+        """
+        Log the size of every package cache volume
+
+        :param package_cache: the PackageCache
+        """
+        try:
+            sizes = package_cache.sizes()
+        except Exception as e:
+            LOGGER.warning("Could not get the size of the package caches: %s", e)
+            return
+        for volume, size in sorted(sizes.items()):
+            LOGGER.info("Package cache '%s': %s", volume,
+                        "{:.1f} MB".format(size / BYTES_PER_MB) if size is not None else "size unknown")
+
+    @staticmethod
+    def _write_report(report, json_path=None, junit_path=None):
+        """
+        Complete the report and write it in each requested format
+
+        :param report: the RunReport
+        :param json_path: file to write the json report to, if any
+        :param junit_path: file to write the JUnit XML report to, if any
         """
-        containers = []
-        for resource in stack.get_resources_using_cfn_init():
-            containers.append(
-                CFNInitLocalContainer.create(
-                    image=image,
-                    metadata=metadata_factory.get_metadata(resource),
-                    resource=resource,
-                    stack=stack
-                )
-            )
-        return self._client.create_pod(containers)
+        report.complete()
+        if json_path is not None:
+            JsonReportWriter.write(report, json_path)
+            LOGGER.info("Wrote json report to %s", json_path)
+        if junit_path is not None:
+            JUnitReportWriter.write(report, junit_path)
+            LOGGER.info("Wrote JUnit report to %s", junit_path)
 
     @staticmethod
-    def __output_container_resume_statements(containers):
+    def _output_container_resume_statements(containers):
         """
 
         :param containers:
@@ -0,0 +1,54 @@
+from cfn_init_local.cloudformation.loader import TemplateLoader, LOAD_ERRORS
+from cfn_init_local.cloudformation.validation import InitValidator
+from cfn_init_local.drivers import BaseDriver
+from cfn_init_local.drivers.run_driver import RunDriver
+from cfn_init_local.utils.logging import LoggerBuilder
+
+LOGGER = LoggerBuilder.standard_console_logger(__file__)
+
+
+class ValidateDriver(BaseDriver):
+    """Checks the cfn-init blocks of a template (and its nested stacks) without Docker"""
+
+    def execute(self, template_name: str, template_body: str, verbose: bool = False, parameters: dict = {},
+                parameters_file: str = None, no_evaluate: bool = False):
+        """
+        Validate every cfn-init block and log each problem found along with its json path
+
+        :param template_name: name of the template
+        :param template_body: path of the template
+        :param verbose:
+        :param parameters: dict of template parameter (or pseudo parameter) name to value
+        :param parameters_file: json file of parameter values. Values in parameters take precedence
+        :param no_evaluate: validate the metadata as written instead of resolving its intrinsic functions first
+        :return: number of problems found
+        """
+        if verbose:
+            LOGGER.setLevel("debug")
+
+        parameters = None if no_evaluate else RunDriver._parameters(parameters, parameters_file)
+        try:
+            stacks = RunDriver._stacks(TemplateLoader().load(template_body, template_name), parameters)
+        except LOAD_ERRORS as e:
+            LOGGER.error("Could not load template '%s': %s", template_body, e)
+            return 1
+
+        problems = resources = 0
+        for stack, evaluator in stacks:
+            try:
+                stack_resources = stack.get_resources_using_cfn_init(evaluator)
+            except ValueError as e:
+                LOGGER.error("Could not evaluate stack '%s': %s", stack.name, e)
+                problems += 1
+                continue
+            for resource in stack_resources:
+                resources += 1
+                errors = InitValidator.validate(resource)
+                for error in errors:
+                    LOGGER.error("[%s/%s] %s", stack.name, resource.name, error)
+                problems += len(errors)
+        if problems == 0:
+            LOGGER.info("The cfn-init blocks of %d resources are valid", resources)
+        else:
+            LOGGER.error("Found %d problems in the cfn-init blocks of %d resources", problems, resources)
+        return problems
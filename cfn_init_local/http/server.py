@@ -3,15 +3,48 @@
 Self contained module for serving both EC2 Metadata and CloudFormation resource Metadata.
 """
 import argparse
-import json
+import base64
+import ipaddress
+import os
+import re
 import signal
 import subprocess
 import sys
+import tarfile
+import time
 from functools import partial
 from http.server import BaseHTTPRequestHandler, HTTPServer
-from threading import Thread, Condition
+from socketserver import ThreadingMixIn
+from threading import Thread, Condition, Lock
+from urllib.parse import unquote, urlsplit
+
+try:
+    from orjson import loads as json_loads
+except ImportError:  # this module runs with whatever python the image has, so only the standard library is required
+    from json import loads as json_loads
 
 SET_METADATA_ROUTE_CMD = "iptables -t nat -A OUTPUT -d 169.254.169.254 -j DNAT --to-destination 127.0.0.1"
+ARTIFACT_PORT = 5002
+# Mirrored host names resolve to this loopback address, which is routed to the artifact server
+ARTIFACT_MIRROR_ADDRESS = "127.0.0.2"
+SET_ARTIFACT_ROUTE_CMD_FORMAT = "iptables -t nat -A OUTPUT -p tcp -d {address} --dport {port} -j DNAT" \
+                                " --to-destination 127.0.0.1:" + str(ARTIFACT_PORT)
+HOSTS_FILE = "/etc/hosts"
+DEFAULT_PORTS = {"http": 80, "https": 443}
+RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+# Idle persistent connections are closed after this long so they do not hold a thread forever
+KEEP_ALIVE_TIMEOUT_SECONDS = 60
+NOT_FOUND_BODY = b"Not Found"
+# IMDSv2: clients PUT to the token path for a session token, then send it with every request
+# See: https://docs.aws.amazon.com/AWSEC2/latest/UserGuide/configuring-instance-metadata-service.html
+TOKEN_PATH = "/latest/api/token"
+TOKEN_HEADER = "X-aws-ec2-metadata-token"
+TOKEN_TTL_HEADER = "X-aws-ec2-metadata-token-ttl-seconds"
+MIN_TOKEN_TTL_SECONDS = 1
+MAX_TOKEN_TTL_SECONDS = 21600
+TOKEN_BYTES = 42
+# Expired tokens are only purged once the table grows past this many, so issuing a token stays cheap
+TOKEN_PURGE_THRESHOLD = 1024
 
 
 class NotFoundException(Exception):
@@ -20,10 +53,59 @@ class NotFoundException(Exception):
 
 
 class DataProducer:
-    """Class to assist in parsing a User Data formatted dict"""
+    """
+    Class to assist in parsing a User Data formatted dict.
+
+    The dict is flattened once into an index of every path that can be requested to the encoded response for it,
+    so requests are served with a single lookup instead of walking the dict and encoding the result each time.
+    """
 
     def __init__(self, data):
         self._data = data
+        self._index = {}
+        self._leaves = {}
+        self.__index("", data)
+
+    def __index(self, path, data):
+        """
+        Add the response for a path and everything under it to the index
+
+        :param path: the path (without leading or trailing "/")
+        :param data: the dict or string at the path
+        """
+        if isinstance(data, str):
+            self._index[path] = self._leaves[path] = data.encode()
+            return
+        self._index[path] = "\n".join(data.keys()).encode()
+        prefix = path + "/" if path != "" else ""
+        for key, value in data.items():
+            # A page matches its key or, failing that, its key with a trailing "/". Keys with any other "/" can
+            # never be matched, as paths are split on "/"
+            page = key[:-1] if key.endswith("/") else key
+            if "/" in page or value is None or (page != key and data.get(page) is not None):
+                continue
+            if isinstance(value, (dict, str)):
+                self.__index(prefix + page, value)
+
+    def get_bytes(self, path):
+        """
+        Get the encoded data for the specified input path (see get_data)
+
+        :param path: path to query
+        :return: the data for that path (bytes)
+        """
+        path = path.strip("/")
+        data = self._index.get(path)
+        if data is not None:
+            return data
+        # A string short-circuits the rest of the path, so the deepest string the path goes through is served
+        end = path.rfind("/")
+        while end != -1:
+            data = self._leaves.get(path[:end])
+            if data is not None:
+                return data
+            end = path.rfind("/", 0, end)
+        raise NotFoundException()
 
     def get_data(self, path):
         """
@@ -41,59 +123,298 @@ class DataProducer:
         :param path: path to query
         :return: string data for that path
         """
-        path = path.strip("/")
-        data = self._data
-        if path != '':
-            for page in path.split('/'):
-                page_data = data.get(page, None)
-                page_data = page_data if page_data is not None else data.get(page + "/", None)
-                if page_data is None:
-                    raise NotFoundException()
-                data = page_data
-                if isinstance(data, str):
-                    return data
-        return "\n".join(data.keys())  # always a dict here
+        return self.get_bytes(path).decode()
+
+
+class TokenTable(object):
+    """
+    In memory table of the IMDSv2 session tokens issued, each valid until its TTL passes
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self._tokens = {}
+        self._clock = clock
+        self._lock = Lock()
+
+    def issue(self, ttl):
+        """
+        Issue a new token
+
+        :param ttl: seconds the token is valid for
+        :return: the token
+        """
+        # Not the secrets module, as it is only available from python 3.6
+        token = base64.urlsafe_b64encode(os.urandom(TOKEN_BYTES)).rstrip(b"=").decode()
+        now = self._clock()
+        with self._lock:
+            if len(self._tokens) >= TOKEN_PURGE_THRESHOLD:
+                self._tokens = {key: expiry for key, expiry in self._tokens.items() if expiry > now}
+            self._tokens[token] = now + ttl
+        return token
+
+    def is_valid(self, token):
+        """
+
+        :param token: a token sent by a client
+        :return: true if the token was issued and has not expired
+        """
+        expiry = self._tokens.get(token)
+        return expiry is not None and expiry > self._clock()
+
+    @staticmethod
+    def parse_ttl(value):
+        """
+
+        :param value: value of the TTL header of a token request, if any
+        :return: the TTL in seconds, or None if it is missing or not between the min and max TTL
+        """
+        try:
+            ttl = int(value)
+        except (TypeError, ValueError):
+            return None
+        return ttl if MIN_TOKEN_TTL_SECONDS <= ttl <= MAX_TOKEN_TTL_SECONDS else None
 
 
-class MetadataServer(BaseHTTPRequestHandler):
+class ArtifactSource(object):
+    """
+    A local directory or file standing in for everything under a URL prefix. A file is served for the prefix
+    itself and, if it is an uncompressed tar archive, its members are served for the paths under the prefix
+    """
+
+    def __init__(self, path):
+        self._path = os.path.realpath(path)
+        self._members = {}
+        if os.path.isfile(self._path) and tarfile.is_tarfile(self._path):
+            # Members are served straight out of the archive, so only uncompressed archives can be indexed.
+            # Compressed archives (e.g. .tar.gz sources) are only served whole
+            try:
+                with tarfile.open(self._path, "r:") as tar:
+                    self._members = {ArtifactSource.__member_path(member.name): (member.offset_data, member.size)
+                                     for member in tar.getmembers() if member.isfile()}
+            except tarfile.ReadError:
+                self._members = {}
+
+    @staticmethod
+    def __member_path(name):
+        """
+
+        :param name: name of a tar archive member
+        :return: the name without a leading "./" or "/"
+        """
+        return name[2:] if name.startswith("./") else name.lstrip("/")
+
+    def resolve(self, relative_path):
+        """
+        Find the bytes served for a path under the prefix
+
+        :param relative_path: path relative to the prefix (without a leading "/")
+        :return: tuple of the file to read, the offset to start at and the number of bytes
+        :raises NotFoundException: if nothing is served for the path
+        """
+        if os.path.isdir(self._path):
+            path = os.path.realpath(os.path.join(self._path, relative_path))
+            # Never serve anything outside the directory, e.g. for paths containing ".."
+            if os.path.commonpath([self._path, path]) != self._path or not os.path.isfile(path):
+                raise NotFoundException()
+            return path, 0, os.path.getsize(path)
+        if relative_path == "" and os.path.isfile(self._path):
+            return self._path, 0, os.path.getsize(self._path)
+        if relative_path in self._members:
+            offset, size = self._members[relative_path]
+            return self._path, offset, size
+        raise NotFoundException()
+
+
+class ArtifactStore(object):
+    """
+    Maps URL prefixes (e.g. https://my-bucket.s3.amazonaws.com/releases/) to ArtifactSources. The scheme is
+    ignored when matching, so https URLs rewritten to http are served too, and the longest matching prefix wins
+    """
+
+    def __init__(self, mirrors):
+        """
+        :param mirrors: dict of URL prefix to the local directory or file to serve for it
+        """
+        self._sources = sorted([(ArtifactStore.normalize(prefix), ArtifactSource(path))
+                                for prefix, path in mirrors.items()], key=lambda source: len(source[0]), reverse=True)
+
+    @staticmethod
+    def normalize(url):
+        """
+        Normalize a URL for matching
+
+        :param url: absolute URL
+        :return: "<host>[:<port>]/<path>" with default ports dropped, the path decoded and the query removed
+        """
+        parts = urlsplit(url)
+        host = parts.hostname or ""
+        if parts.port is not None and parts.port != DEFAULT_PORTS.get(parts.scheme):
+            host = "{}:{}".format(host, parts.port)
+        return host + unquote(parts.path or "/")
+
+    def resolve(self, url):
+        """
+        Find the bytes served for a URL
+
+        :param url: absolute URL
+        :return: tuple of the file to read, the offset to start at and the number of bytes
+        :raises NotFoundException: if no prefix matches or its source has nothing for the URL
+        """
+        normalized = ArtifactStore.normalize(url)
+        for prefix, source in self._sources:
+            if normalized.startswith(prefix):
+                return source.resolve(normalized[len(prefix):].lstrip("/"))
+        raise NotFoundException()
+
+
+class ReloadableData(object):
+    """
+    Data that is re-read from a file whenever the file changes, so what is served can be replaced
+    while the server is running. Falls back to the initial data while the file does not exist.
+    """
+
+    def __init__(self, data, path=None, parse=None):
+        self._data = data
+        self._path = path
+        self._parse = parse or (lambda text: text)
+        self._version = None
+        self._lock = Lock()
+
+    def get(self):
+        """
+        Get the current data
+
+        :return: the data parsed from the file if it exists, otherwise the initial data
+        """
+        if self._path is None:
+            return self._data
+        try:
+            stat = os.stat(self._path)
+        except FileNotFoundError:
+            return self._data
+        # Files replaced within the same second can share an mtime, so the inode and size are compared too
+        version = (stat.st_mtime_ns, stat.st_ino, stat.st_size)
+        if version != self._version:
+            with self._lock:
+                if version != self._version:
+                    # The payloads are written as utf-8, which need not be the locale's encoding in the image
+                    with open(self._path, encoding="utf-8") as fh:
+                        self._data = self._parse(fh.read())
+                    self._version = version
+        return self._data
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    """
+    HTTPServer handling each connection in a thread of its own. Defined here as http.server only has it from
+    python 3.7 and this module runs with whatever python the image has
+    """
+    daemon_threads = True
+
+
+class PersistentRequestHandler(BaseHTTPRequestHandler):
+    """
+    Request handler speaking HTTP/1.1, so clients can send any number of requests over one connection.
+    Every response must therefore have a Content-Length.
+    """
+    protocol_version = "HTTP/1.1"
+    timeout = KEEP_ALIVE_TIMEOUT_SECONDS
+
+    def send_content(self, code, content_type, body, send_body=True):
+        """
+        Send a complete response
+
+        :param code: HTTP status code
+        :param content_type: value of the Content-Type header
+        :param body: the content (bytes)
+        :param send_body: whether to send the content or only the headers
+        """
+        self.send_response(code)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def send_not_found(self, send_body=True):
+        """
+        Send a 404 response. Unlike send_error, the connection is kept open, as clients probe for paths that
+        may not exist
+
+        :param send_body: whether to send the content or only the headers
+        """
+        self.send_content(404, "text/plain", NOT_FOUND_BODY, send_body)
+
+
+class MetadataServer(PersistentRequestHandler):
     """
     A mock EC2 metadata server.
     See: https://docs.aws.amazon.com/AWSEC2/latest/UserGuide/ec2-instance-metadata.html
+
+    Supports both IMDSv1 and IMDSv2 session tokens. Tokens that are sent must be valid, and with
+    imds_v2_only every request must send one, as on instances that require IMDSv2.
     """
 
-    def __init__(self, metadata, *args, **kwargs):
-        self._producer = DataProducer(metadata)
+    def __init__(self, producer, tokens, imds_v2_only, *args, **kwargs):
+        self._producer = producer
+        self._tokens = tokens
+        self._imds_v2_only = imds_v2_only
         super().__init__(*args, **kwargs)
 
+    def do_PUT(self):
+        """
+        Respond to HTTP PUT request, issuing IMDSv2 session tokens
+        """
+        # The body is ignored, but must be read so the next request on the connection can be parsed
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if urlsplit(self.path).path.rstrip("/") != TOKEN_PATH:
+            self.send_not_found()
+            return
+        ttl = TokenTable.parse_ttl(self.headers.get(TOKEN_TTL_HEADER))
+        if ttl is None:
+            self.send_content(400, "text/plain", b"Bad Request")
+            return
+        token = self._tokens.issue(ttl).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain")
+        self.send_header("Content-Length", str(len(token)))
+        self.send_header(TOKEN_TTL_HEADER, str(ttl))
+        self.end_headers()
+        self.wfile.write(token)
+
     def do_GET(self):
         """
         Respond to HTTP GET request
         """
+        token = self.headers.get(TOKEN_HEADER)
+        if (token is None and self._imds_v2_only) or (token is not None and not self._tokens.is_valid(token)):
+            self.send_content(401, "text/plain", b"Unauthorized")
+            return
         try:
-            data = self._producer.get_data(self.path)
+            data = self._producer.get().get_bytes(self.path)
         except NotFoundException:
-            self.send_error(404)
+            self.send_not_found()
             return
-        self.send_response(200)
-        self.send_header('Content-type', 'text/plain')
-        self.end_headers()
-        self.wfile.write(data.encode())
+        self.send_content(200, "text/plain", data)
 
     @staticmethod
-    def create_server(data, port=5000):
+    def create_server(data, port=5000, path=None, imds_v2_only=False):
         """
         Create a MetadataServer serving the specified data on a specified port
 
         :param data: data to server
         :param port: port to serve on
-        :return: HTTPServer that serves the metadata
+        :param path: json file to serve instead of data whenever it exists
+        :param imds_v2_only: reject requests without an IMDSv2 session token
+        :return: ThreadingHTTPServer that serves the metadata
         """
         server_address = ('', port)  # ('169.254.169.254', port)
-        handler = partial(MetadataServer, data)
-        return HTTPServer(server_address, handler)
+        producer = ReloadableData(DataProducer(data), path, lambda text: DataProducer(json_loads(text)))
+        handler = partial(MetadataServer, producer, TokenTable(), imds_v2_only)
+        return ThreadingHTTPServer(server_address, handler)
 
 
-class CloudFormationServer(BaseHTTPRequestHandler):
+class CloudFormationServer(PersistentRequestHandler):
     """
     Simple HTTP server responding to CloudFormation GetStackResource requests.
     GetStackResource requests are formatted like:
@@ -129,23 +450,111 @@ class CloudFormationServer(BaseHTTPRequestHandler):
         """
         Respond to HTTP GET request
         """
-        self.send_response(200)
-        self.send_header('Content-type', 'application/json')
-        self.end_headers()
-        self.wfile.write(self._data.encode())
+        self.send_content(200, "application/json", self._data.get())
 
     @staticmethod
-    def create_server(data, port=5001):
+    def create_server(data, port=5001, path=None):
         """
         Create a CloudFormationServer serving the specified data on a specified port.
 
         :param data: data to serve
         :param port: port to bind to
-        :return: the HTTPServer object serving the CloudFormation content
+        :param path: file to serve instead of data whenever it exists
+        :return: the ThreadingHTTPServer object serving the CloudFormation content
         """
         server_address = ('', port)  # ('169.254.169.254', port)
-        handler = partial(CloudFormationServer, data)
-        return HTTPServer(server_address, handler)
+        handler = partial(CloudFormationServer, ReloadableData(data.encode(), path, str.encode))
+        return ThreadingHTTPServer(server_address, handler)
+
+
+class ArtifactServer(PersistentRequestHandler):
+    """
+    Serves local copies of the artifacts cfn-init downloads (sources and files with a source URL) so they are
+    fetched at local disk speed without network access. Supports HEAD and single byte range requests, and the
+    bytes are sent with sendfile where the platform supports it.
+    """
+
+    def __init__(self, store, *args, **kwargs):
+        self._store = store
+        super().__init__(*args, **kwargs)
+
+    def do_GET(self):
+        """
+        Respond to HTTP GET request
+        """
+        self.__serve(True)
+
+    def do_HEAD(self):
+        """
+        Respond to HTTP HEAD request
+        """
+        self.__serve(False)
+
+    def __serve(self, send_body):
+        """
+
+        :param send_body: whether to send the content or only the headers
+        """
+        # Requests routed here by host name have a relative path; requests sent as to a proxy have the full URL
+        url = self.path if "://" in self.path else "http://{}{}".format(self.headers.get("Host", ""), self.path)
+        try:
+            path, offset, size = self._store.resolve(url)
+        except NotFoundException:
+            self.send_not_found(send_body)
+            return
+        byte_range = ArtifactServer.parse_range(self.headers.get("Range"), size)
+        if byte_range is False:
+            self.send_response(416)
+            self.send_header("Content-Range", "bytes */{}".format(size))
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        start, end = byte_range if byte_range is not None else (0, size - 1)
+        self.send_response(206 if byte_range is not None else 200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.send_header("Accept-Ranges", "bytes")
+        if byte_range is not None:
+            self.send_header("Content-Range", "bytes {}-{}/{}".format(start, end, size))
+        self.end_headers()
+        if send_body and end >= start:
+            with open(path, "rb") as fh:
+                # Uses os.sendfile when available, so the bytes never pass through python
+                self.connection.sendfile(fh, offset + start, end - start + 1)
+
+    @staticmethod
+    def parse_range(header, size):
+        """
+        Parse a Range header. Only a single range is supported; other headers are ignored as allowed by RFC 7233
+
+        :param header: value of the Range header, if any
+        :param size: size of the content
+        :return: tuple of the first and last byte to send, None to send everything or False if the range can
+            not be satisfied
+        """
+        match = RANGE_PATTERN.match(header.strip()) if header else None
+        if match is None or match.group(1) == match.group(2) == "":
+            return None
+        if match.group(1) == "":
+            length = int(match.group(2))
+            return (max(0, size - length), size - 1) if length > 0 and size > 0 else False
+        start = int(match.group(1))
+        end = min(int(match.group(2)), size - 1) if match.group(2) != "" else size - 1
+        if start >= size or end < start:
+            return False
+        return start, end
+
+    @staticmethod
+    def create_server(mirrors, port=ARTIFACT_PORT):
+        """
+        Create an ArtifactServer serving local copies of artifacts on a specified port
+
+        :param mirrors: dict of URL prefix to the local directory or file to serve for it
+        :param port: port to bind to
+        :return: the ThreadingHTTPServer serving the artifacts
+        """
+        handler = partial(ArtifactServer, ArtifactStore(mirrors))
+        return ThreadingHTTPServer(('', port), handler)
 
 
 class AsynchronousServerWrapper(object):
@@ -214,10 +623,46 @@ def parse_args():
     parser = argparse.ArgumentParser(description=__doc__)
     parser.add_argument('--metadata', required=False)
     parser.add_argument('--cfn-resource', required=False)
+    parser.add_argument('--metadata-file', required=False,
+                        help="Json file to serve EC2 metadata from instead of --metadata whenever it exists")
+    parser.add_argument('--cfn-resource-file', required=False,
+                        help="File to serve the CloudFormation resource from instead of --cfn-resource whenever it "
+                             "exists")
+    parser.add_argument('--artifact-mirror', action="append", default=[],
+                        help="PREFIX=PATH: serve the local directory or file PATH for URLs starting with PREFIX. "
+                             "May be repeated")
+    parser.add_argument('--imds-v2-only', action="store_true",
+                        help="Reject EC2 metadata requests without an IMDSv2 session token")
     parser.add_argument('--container-mode', action="store_true")
+    parser.add_argument('--ready-file', required=False,
+                        help="File to write the time (seconds since epoch) to once all servers are serving")
     return parser.parse_args()
 
 
+def clear_ready_marker(path):
+    """
+    Remove a ready marker left behind by a previous run (e.g. when a container is restarted)
+
+    :param path: path of the ready marker
+    """
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def write_ready_marker(path):
+    """
+    Atomically write the ready marker so anything waiting on it never sees a partial file
+
+    :param path: path of the ready marker
+    """
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as fh:
+        fh.write(str(time.time()))
+    os.replace(tmp_path, path)
+
+
 def mock_metadata_route():
     """
     Set the EC2 metadata route (169.254.169.254) to local host (127.0.0.1)
@@ -225,26 +670,76 @@ def mock_metadata_route():
     subprocess.run(SET_METADATA_ROUTE_CMD, shell=True, stdout=sys.stdout, stderr=sys.stderr)
 
 
+def parse_artifact_mirrors(values):
+    """
+
+    :param values: list of "PREFIX=PATH" strings
+    :return: dict of URL prefix to local path
+    """
+    mirrors = {}
+    for value in values:
+        prefix, separator, path = value.partition("=")
+        if separator == "" or prefix == "" or path == "":
+            raise ValueError("Expected --artifact-mirror PREFIX=PATH but got '{}'".format(value))
+        mirrors[prefix] = path
+    return mirrors
+
+
+def mock_artifact_routes(prefixes):
+    """
+    Route the hosts of mirrored URL prefixes to the artifact server: host names resolve to ARTIFACT_MIRROR_ADDRESS
+    and connections to it (or to hosts given as IP addresses) on the prefixes' ports are sent to the server
+
+    :param prefixes: the mirrored URL prefixes
+    """
+    routes = set()
+    host_names = []
+    for prefix in prefixes:
+        parts = urlsplit(prefix)
+        port = parts.port or DEFAULT_PORTS.get(parts.scheme, 80)
+        try:
+            address = str(ipaddress.ip_address(parts.hostname))
+        except ValueError:
+            address = ARTIFACT_MIRROR_ADDRESS
+            if parts.hostname not in host_names:
+                host_names.append(parts.hostname)
+        # Mirrored https URLs are served over plain http (see CFNInitLocalContainer), so port 80 is routed too
+        routes.update([(address, port), (address, DEFAULT_PORTS["http"])])
+    if len(host_names) > 0:
+        with open(HOSTS_FILE, "a") as fh:
+            fh.write("".join("{} {}\n".format(ARTIFACT_MIRROR_ADDRESS, host) for host in host_names))
+    for address, port in sorted(routes):
+        subprocess.run(SET_ARTIFACT_ROUTE_CMD_FORMAT.format(address=address, port=port), shell=True,
+                       stdout=sys.stdout, stderr=sys.stderr)
+
+
 def serve():
     """
     Main method. Parse command line args and start the specified servers
     """
     args = parse_args()
+    if args.ready_file is not None:
+        clear_ready_marker(args.ready_file)
 
+    mirrors = parse_artifact_mirrors(args.artifact_mirror)
     metadata_port = 5000
     if args.container_mode:
         metadata_port = 80
         mock_metadata_route()
+        if len(mirrors) > 0:
+            mock_artifact_routes(mirrors)
 
     servers = []
-    if args.metadata is not None:
-        # data = json.loads(get_contents_if_file(args.metadata))
-        data = json.loads(args.metadata)
-        servers.append(AsynchronousServerWrapper(MetadataServer.create_server(data, metadata_port)))
-    if args.cfn_resource is not None:
-        # data = get_contents_if_file(args.cfn_resource)
-        data = args.cfn_resource
-        servers.append(AsynchronousServerWrapper(CloudFormationServer.create_server(data)))
+    if args.metadata is not None or args.metadata_file is not None:
+        data = json_loads(args.metadata) if args.metadata is not None else {}
+        servers.append(
+            AsynchronousServerWrapper(MetadataServer.create_server(data, metadata_port, args.metadata_file,
+                                                                     args.imds_v2_only)))
+    if args.cfn_resource is not None or args.cfn_resource_file is not None:
+        data = args.cfn_resource if args.cfn_resource is not None else ""
+        servers.append(AsynchronousServerWrapper(CloudFormationServer.create_server(data, path=args.cfn_resource_file)))
+    if len(mirrors) > 0:
+        servers.append(AsynchronousServerWrapper(ArtifactServer.create_server(mirrors)))
 
     def shutdown_servers(*args):
         for server in servers:
@@ -255,6 +750,12 @@ def serve():
     for server in servers:
         server.serve()
 
+    # Servers are bound and listening once created, and the metadata route (if any) is set up,
+    # so anything connecting from here on will be served
+    if args.ready_file is not None:
+        write_ready_marker(args.ready_file)
+        print("Servers ready")
+
     print("Waiting for servers to finish")
 
     try:
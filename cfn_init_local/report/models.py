@@ -0,0 +1,178 @@
+import time
+
+PASSED = "passed"
+FAILED = "failed"
+CACHED = "cached"
+NOT_RUN = "not_run"
+
+PHASE_CREATE = "container_create"
+PHASE_READY = "server_ready"
+PHASE_FIRST_RUN = "first_run"
+PHASE_SECOND_RUN = "second_run"
+PHASE_TEARDOWN = "teardown"
+CONFIG_SET_NAME_FORMAT = "{resource}[{config_set}]"
+PHASES = (PHASE_CREATE, PHASE_READY, PHASE_FIRST_RUN, PHASE_SECOND_RUN, PHASE_TEARDOWN)
+
+
+class CommandResult(object):
+    """Outcome of a single command (e.g. a cfn-init run) executed in a container"""
+
+    def __init__(self, exit_code=None, output="", duration=None, error=None, exception=None):
+        """
+        :param exit_code: exit code of the command, None if it never completed
+        :param output: captured output of the command
+        :param duration: wall-clock seconds the command took
+        :param error: description of why the command failed, if it did
+        :param exception: the exception the command failed with, if any. Not part of the report
+        """
+        self.exit_code = exit_code
+        self.output = output
+        self.duration = duration
+        self.error = error
+        self.exception = exception
+
+    @property
+    def status(self):
+        """
+
+        :return: PASSED or FAILED
+        """
+        return PASSED if self.error is None and self.exit_code == 0 else FAILED
+
+    def to_dict(self):
+        """
+
+        :return: json-serializable form of the result
+        """
+        return {
+            "status": self.status,
+            "exit_code": self.exit_code,
+            "duration": self.duration,
+            "error": self.error,
+            "output": self.output
+        }
+
+
+class ResourceReport(object):
+    """Outcome of testing cfn-init for a single resource"""
+
+    def __init__(self, stack, resource, status, container_id=None, identical_to=None, first_run=None,
+                 second_run=None, timings=None, error=None, artifacts=None, config_set=None):
+        """
+        :param stack: name of the stack the resource belongs to
+        :param resource: name of the resource
+        :param status: PASSED, FAILED, CACHED or NOT_RUN
+        :param container_id: id of the container cfn-init ran in
+        :param identical_to: name of the resource whose run this one shares, if deduplicated
+        :param first_run: CommandResult of the first cfn-init run
+        :param second_run: CommandResult of the second (idempotency) cfn-init run
+        :param timings: dict of phase (see PHASES) to wall-clock seconds
+        :param error: description of a failure outside of the cfn-init runs (e.g. the servers never being ready)
+        :param artifacts: path of the bundle of logs and artifacts collected from the resource's container
+        :param config_set: the configSet run, when running configSets each in a container of their own. None when
+            cfn-init ran its default
+        """
+        self.stack = stack
+        self.resource = resource
+        self.status = status
+        self.container_id = container_id
+        self.identical_to = identical_to
+        self.first_run = first_run
+        self.second_run = second_run
+        self.timings = timings or {}
+        self.error = error
+        self.artifacts = artifacts
+        self.config_set = config_set
+
+    @property
+    def name(self):
+        """
+
+        :return: name of the resource, followed by the configSet in brackets if one was run
+        """
+        return CONFIG_SET_NAME_FORMAT.format(resource=self.resource, config_set=self.config_set) \
+            if self.config_set is not None else self.resource
+
+    @property
+    def duration(self):
+        """
+
+        :return: total seconds spent across every phase
+        """
+        return sum(duration for duration in self.timings.values() if duration is not None)
+
+    def to_dict(self):
+        """
+
+        :return: json-serializable form of the report
+        """
+        return {
+            "stack": self.stack,
+            "resource": self.resource,
+            "config_set": self.config_set,
+            "status": self.status,
+            "container_id": self.container_id,
+            "identical_to": self.identical_to,
+            "error": self.error,
+            "artifacts": self.artifacts,
+            "first_run": self.first_run.to_dict() if self.first_run else None,
+            "second_run": self.second_run.to_dict() if self.second_run else None,
+            "timings": {phase: self.timings.get(phase) for phase in PHASES}
+        }
+
+
+class RunReport(object):
+    """Outcome of a whole execution of cfn-init-local"""
+
+    def __init__(self, started_at=None):
+        self.started_at = started_at if started_at is not None else time.time()
+        self.duration = None
+        self.resources = []
+
+    def add(self, resource_report):
+        """
+        Add the outcome of a resource, replacing any earlier outcome of the same resource and configSet (e.g. when
+        re-run while watching)
+
+        :param resource_report: ResourceReport to add
+        """
+        for index, existing in enumerate(self.resources):
+            if (existing.stack, existing.resource, existing.config_set) == \
+                    (resource_report.stack, resource_report.resource, resource_report.config_set):
+                self.resources[index] = resource_report
+                return
+        self.resources.append(resource_report)
+
+    def complete(self):
+        """
+        Mark the run as complete, recording its duration
+        """
+        self.duration = time.time() - self.started_at
+
+    def count(self, status):
+        """
+
+        :param status: a status
+        :return: number of resources with the status
+        """
+        return len([resource for resource in self.resources if resource.status == status])
+
+    @property
+    def passed(self):
+        """
+
+        :return: true if no resource failed
+        """
+        return self.count(FAILED) == 0
+
+    def to_dict(self):
+        """
+
+        :return: json-serializable form of the report
+        """
+        return {
+            "started_at": self.started_at,
+            "duration": self.duration,
+            "summary": {status: self.count(status) for status in (PASSED, FAILED, CACHED, NOT_RUN)},
+            "resources": [resource.to_dict() for resource in self.resources]
+        }
@@ -0,0 +1,104 @@
+import json
+import xml.etree.ElementTree as ElementTree
+from cfn_init_local.report.models import FAILED, CACHED, NOT_RUN
+
+
+class JsonReportWriter(object):
+    """Writes a RunReport as json"""
+
+    @staticmethod
+    def write(report, path):
+        """
+
+        :param report: the RunReport
+        :param path: file to write to
+        """
+        with open(path, "w") as fh:
+            json.dump(report.to_dict(), fh, indent=2)
+
+
+class JUnitReportWriter(object):
+    """
+    Writes a RunReport as JUnit XML so CI systems can display it. Each stack is a testsuite and each
+    resource a testcase; cached resources are reported as skipped.
+    """
+
+    @staticmethod
+    def write(report, path):
+        """
+
+        :param report: the RunReport
+        :param path: file to write to
+        """
+        ElementTree.ElementTree(JUnitReportWriter.to_element(report)).write(path, encoding="utf-8",
+                                                                            xml_declaration=True)
+
+    @staticmethod
+    def to_element(report):
+        """
+
+        :param report: the RunReport
+        :return: the root "testsuites" element
+        """
+        suites = ElementTree.Element("testsuites", name="cfn-init-local", time=JUnitReportWriter.__time(
+            report.duration))
+        stacks = []
+        for resource in report.resources:
+            if resource.stack not in stacks:
+                stacks.append(resource.stack)
+        for stack in stacks:
+            resources = [resource for resource in report.resources if resource.stack == stack]
+            suite = ElementTree.SubElement(
+                suites, "testsuite", name=stack, tests=str(len(resources)),
+                failures=str(len([resource for resource in resources if resource.status == FAILED])),
+                skipped=str(len([resource for resource in resources if resource.status in (CACHED, NOT_RUN)])),
+                time=JUnitReportWriter.__time(sum(resource.duration for resource in resources)))
+            for resource in resources:
+                JUnitReportWriter.__add_testcase(suite, resource)
+        return suites
+
+    @staticmethod
+    def __add_testcase(suite, resource):
+        """
+
+        :param suite: the testsuite element
+        :param resource: the ResourceReport
+        """
+        case = ElementTree.SubElement(suite, "testcase", classname=resource.stack, name=resource.name,
+                                      time=JUnitReportWriter.__time(resource.duration))
+        if resource.status == CACHED:
+            ElementTree.SubElement(case, "skipped", message="cfn-init passed for identical inputs in a previous run")
+        elif resource.status == NOT_RUN:
+            ElementTree.SubElement(case, "skipped", message=resource.error or "not run")
+        elif resource.status == FAILED:
+            failure = ElementTree.SubElement(case, "failure", message=JUnitReportWriter.__failure_message(resource))
+            failed_run = resource.second_run if resource.first_run and resource.first_run.status != FAILED \
+                else resource.first_run
+            failure.text = failed_run.output if failed_run else None
+        output = "\n".join(run.output for run in (resource.first_run, resource.second_run) if run and run.output)
+        if output:
+            ElementTree.SubElement(case, "system-out").text = output
+
+    @staticmethod
+    def __failure_message(resource):
+        """
+
+        :param resource: a failed ResourceReport
+        :return: short description of the failure
+        """
+        if resource.error:
+            return resource.error
+        if resource.first_run is not None and resource.first_run.status == FAILED:
+            return "First run of cfn-init failed with exit code {}".format(resource.first_run.exit_code)
+        if resource.second_run is not None and resource.second_run.status == FAILED:
+            return "Second run of cfn-init failed with exit code {}".format(resource.second_run.exit_code)
+        return "cfn-init failed"
+
+    @staticmethod
+    def __time(duration):
+        """
+
+        :param duration: seconds or None
+        :return: the duration formatted for a time attribute
+        """
+        return "{:.3f}".format(duration or 0.0)
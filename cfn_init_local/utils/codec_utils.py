@@ -0,0 +1,39 @@
+import json
+
+try:
+    import orjson
+except ImportError:  # optional, installed with the "fast" extra
+    orjson = None
+
+
+class JsonCodec(object):
+    """Json encoding and decoding, using orjson when it is installed and the json module otherwise"""
+
+    @staticmethod
+    def loads(text):
+        """
+        Decode json
+
+        :param text: json string or bytes
+        :return: the decoded data
+        :raises ValueError: if the text is not valid json
+        """
+        if orjson is not None:
+            return orjson.loads(text)
+        return json.loads(text)
+
+    @staticmethod
+    def dumps(data):
+        """
+        Encode data as compact json. Data orjson cannot encode (e.g. integers wider than 64 bits) is encoded
+        with the json module instead
+
+        :param data: json-serializable data
+        :return: json string
+        """
+        if orjson is not None:
+            try:
+                return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+            except TypeError:
+                pass
+        return json.dumps(data, separators=(",", ":"))
@@ -15,13 +15,18 @@ class MetadataPathFactory(object):
 
     def __init__(self, paths={}):
         self._paths = paths
+        # Most resources share a metadata file (often the default), so each file is read once per factory
+        self._documents = {}
 
     def get_metadata(self, resource_id):
         """
         Get the metadata from the metadata paths passed in or use the default
 
-        :param resource_id: resource id to get the metadata for
+        :param resource_id: resource id (or resource) to get the metadata for
         :return: the EC2 metadata json string for the specified resource
         """
-        metadata_path = self._paths.get(resource_id, DEFAULT_METADATA_PATH)
-        return IOUtils.read_file(metadata_path)
+        metadata_path = self._paths.get(str(resource_id), DEFAULT_METADATA_PATH)
+        document = self._documents.get(metadata_path)
+        if document is None:
+            document = self._documents[metadata_path] = IOUtils.read_file(metadata_path)
+        return document
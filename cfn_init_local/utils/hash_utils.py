@@ -0,0 +1,51 @@
+import hashlib
+import json
+from functools import lru_cache
+
+JSON_STRING_CACHE_SIZE = 256
+
+
+class HashUtils(object):
+    """Helpers for deriving stable content hashes"""
+
+    @staticmethod
+    def canonicalize(data):
+        """
+        Canonical JSON form of some data so that equivalent data always hashes the same. Strings that hold
+        JSON (like EC2 metadata read from a file) are parsed first so formatting differences are ignored.
+
+        :param data: json-serializable data or a json string
+        :return: canonical json string
+        """
+        if isinstance(data, str):
+            return _canonicalize_string(data)
+        return json.dumps(data, sort_keys=True, separators=(",", ":"))
+
+    @staticmethod
+    def stable_hash(*parts):
+        """
+        Hash a number of pieces of data into a single hex digest
+
+        :param parts: json-serializable data or json strings
+        :return: sha256 hex digest
+        """
+        digest = hashlib.sha256()
+        for part in parts:
+            digest.update(HashUtils.canonicalize(part).encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+
+@lru_cache(maxsize=JSON_STRING_CACHE_SIZE)
+def _canonicalize_string(data):
+    """
+    Canonical form of a string that may hold json. Cached, since the same EC2 metadata document is hashed along
+    with every resource it is served to
+
+    :param data: the string
+    :return: canonical json string, or the string itself if it is not json
+    """
+    try:
+        return json.dumps(json.loads(data), sort_keys=True, separators=(",", ":"))
+    except ValueError:
+        return data
@@ -1,4 +1,6 @@
-import json
+import gzip
+import os
+from cfn_init_local.utils.codec_utils import JsonCodec
 
 
 class IOUtils(object):
@@ -21,4 +23,30 @@ class IOUtils(object):
         :param path:
         :return:
         """
-        return json.loads(IOUtils.read_file(path))
+        return JsonCodec.loads(IOUtils.read_file(path))
+
+    @staticmethod
+    def write_stream(chunks, path, compress=False):
+        """
+        Write a stream to a file chunk by chunk, without holding all of it in memory. The file only
+        appears once the whole stream is written.
+
+        :param chunks: iterable of bytes
+        :param path: file to write. Its directory is created if needed
+        :param compress: whether to gzip the stream
+        :return: number of (uncompressed) bytes written
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = path + ".tmp"
+        size = 0
+        try:
+            with (gzip.open(tmp_path, "wb") if compress else open(tmp_path, "wb")) as fh:
+                for chunk in chunks:
+                    fh.write(chunk)
+                    size += len(chunk)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return size
@@ -0,0 +1,96 @@
+import codecs
+import os
+from collections import deque
+
+DEFAULT_MAX_BUFFERED_CHARS = 64 * 1024
+TRUNCATED_MARKER = "[... output truncated, see the log file for all of it ...]\n"
+
+
+class StreamedOutput(object):
+    """
+    Sink for the output of a command as it is produced. Complete lines are passed on as they arrive
+    (e.g. to be logged with a prefix), everything is appended to an optional log file and only the tail
+    of the output is kept in memory.
+    """
+
+    def __init__(self, on_line=None, log_path=None, append=False, max_buffered_chars=DEFAULT_MAX_BUFFERED_CHARS):
+        """
+        :param on_line: function called with each complete line of output (without its line ending)
+        :param log_path: file to write all of the output to. Its directory is created if needed
+        :param append: whether to append to the log file rather than replace it
+        :param max_buffered_chars: max number of trailing characters of output kept in memory
+        """
+        self._on_line = on_line
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._partial_line = ""
+        self._tail = deque()
+        self._tail_chars = 0
+        self._max_buffered_chars = max_buffered_chars
+        self._truncated = False
+        self._log = None
+        if log_path is not None:
+            os.makedirs(os.path.dirname(os.path.abspath(log_path)), exist_ok=True)
+            self._log = open(log_path, "ab" if append else "wb")
+
+    def write(self, chunk):
+        """
+        Handle the next chunk of output. Chunks may split lines and multi-byte characters anywhere.
+
+        :param chunk: the chunk (bytes)
+        """
+        if self._log is not None:
+            self._log.write(chunk)
+            self._log.flush()
+        self.__buffer(self._decoder.decode(chunk))
+
+    def close(self):
+        """
+        Pass on any trailing partial line and close the log file
+        """
+        self.__buffer(self._decoder.decode(b"", final=True))
+        if self._partial_line and self._on_line is not None:
+            self._on_line(self._partial_line)
+        self._partial_line = ""
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+    @property
+    def text(self):
+        """
+        The output kept in memory
+
+        :return: the tail of the output, prefixed with a marker if earlier output was dropped
+        """
+        text = "".join(self._tail)
+        return TRUNCATED_MARKER + text if self._truncated else text
+
+    def __buffer(self, text):
+        """
+
+        :param text: decoded output to pass on and keep the tail of
+        """
+        if not text:
+            return
+        self._tail.append(text)
+        self._tail_chars += len(text)
+        while self._tail_chars > self._max_buffered_chars:
+            excess = self._tail_chars - self._max_buffered_chars
+            head = self._tail.popleft()
+            if len(head) > excess:
+                self._tail.appendleft(head[excess:])
+            self._tail_chars -= min(excess, len(head))
+            self._truncated = True
+
+        if self._on_line is None:
+            return
+        lines = (self._partial_line + text).split("\n")
+        self._partial_line = lines.pop()
+        for line in lines:
+            self._on_line(line.rstrip("\r"))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        self.close()
@@ -0,0 +1,52 @@
+import os
+import time
+
+
+class FileWatcher(object):
+    """Polls a set of files for changes"""
+
+    def __init__(self, paths, interval=0.25):
+        """
+        :param paths: paths of the files to watch
+        :param interval: seconds between polls
+        """
+        self._paths = sorted(set(paths))
+        self._interval = interval
+        self._versions = self.__versions()
+
+    def poll(self):
+        """
+        Check whether any of the files changed since the last poll
+
+        :return: list of the paths that changed (or were created or deleted)
+        """
+        versions = self.__versions()
+        changed = [path for path in self._paths if versions[path] != self._versions[path]]
+        self._versions = versions
+        return changed
+
+    def wait(self):
+        """
+        Block until any of the files change
+
+        :return: list of the paths that changed
+        """
+        while True:
+            changed = self.poll()
+            time.sleep(self._interval)
+            if len(changed) > 0:
+                # Editors often save in several writes; pick those up as part of the same change
+                return sorted(set(changed + self.poll()))
+
+    def __versions(self):
+        """
+        :return: dict of path to a value that changes whenever the file does, None if it does not exist
+        """
+        versions = {}
+        for path in self._paths:
+            try:
+                stat = os.stat(path)
+                versions[path] = (stat.st_mtime_ns, stat.st_ino, stat.st_size)
+            except FileNotFoundError:
+                versions[path] = None
+        return versions
@@ -20,9 +20,15 @@ setuptools.setup(
     install_requires=[
         'docker'
     ],
+    extras_require={
+        'yaml': ['PyYAML'],
+        'fast': ['orjson']
+    },
     include_package_data=True,
     entry_points={
         'console_scripts': [
-            'cfn-init-local = cfn_init_local.cli:main'
+            'cfn-init-local = cfn_init_local.cli:main',
+            'cfn-init-local-batch = cfn_init_local.cli:batch_main',
+            'cfn-init-local-validate = cfn_init_local.cli:validate_main'
         ]
     })
@@ -0,0 +1,80 @@
+import unittest
+from unittest.mock import Mock, call
+from cfn_init_local.cache.checkpoints import CheckpointStore, CHECKPOINT_REPOSITORY
+from cfn_init_local.cloudformation.models import Resource
+
+IMAGE = "image"
+IMAGE_ID = "sha256:image"
+METADATA = '{"metadata": "metadata"}'
+INIT = {
+    "configSets": {"default": ["first", "second", "third"]},
+    "first": {"files": {"/tmp/first": {"content": "first"}}},
+    "second": {"commands": {"second": {"command": "echo second"}}},
+    "third": {"commands": {"third": {"command": "echo third"}}},
+}
+
+
+class CheckpointStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.client = Mock()
+        self.client.image_exists = Mock(return_value=False)
+        self.store = CheckpointStore(self.client)
+        self.resource = Resource("resource", {"Metadata": {"AWS::CloudFormation::Init": INIT}})
+
+    def test_plan_without_checkpoints_starts_from_image(self):
+        plan = self.store.plan(self.resource, METADATA, IMAGE, IMAGE_ID)
+        self.assertEqual(plan.start_image, IMAGE)
+        self.assertEqual([step.config_name for step in plan.remaining_steps], ["first", "second", "third"])
+        self.assertEqual(plan.restored_steps, [])
+
+    def test_plan_starts_from_deepest_existing_checkpoint(self):
+        steps = self.store.plan(self.resource, METADATA, IMAGE, IMAGE_ID).steps
+        self.client.image_exists = Mock(side_effect=lambda image: image in {steps[0].image, steps[1].image})
+
+        plan = self.store.plan(self.resource, METADATA, IMAGE, IMAGE_ID)
+
+        self.assertEqual(plan.start_image, steps[1].image)
+        self.assertEqual([step.config_name for step in plan.remaining_steps], ["third"])
+
+    def test_plan_keys_are_cumulative(self):
+        plan = self.store.plan(self.resource, METADATA, IMAGE, IMAGE_ID)
+        edited_init = dict(INIT, second={"commands": {"second": {"command": "echo edited"}}})
+        edited = Resource("resource", {"Metadata": {"AWS::CloudFormation::Init": edited_init}})
+        edited_plan = self.store.plan(edited, METADATA, IMAGE, IMAGE_ID)
+        self.assertEqual(plan.steps[0].key, edited_plan.steps[0].key)
+        self.assertNotEqual(plan.steps[1].key, edited_plan.steps[1].key)
+        self.assertNotEqual(plan.steps[2].key, edited_plan.steps[2].key)
+
+    def test_plan_adds_a_config_set_per_step(self):
+        plan = self.store.plan(self.resource, METADATA, IMAGE, IMAGE_ID)
+        for step in plan.steps:
+            self.assertEqual(plan.resource.get_config_names(step.config_set), [step.config_name])
+        self.assertEqual(plan.resource.get_config_names(plan.config_sets[0]), ["first", "second", "third"])
+
+    def test_plan_when_config_set_does_not_exist_returns_none(self):
+        self.assertIsNone(self.store.plan(self.resource, METADATA, IMAGE, IMAGE_ID, "missing"))
+
+    def test_run_runs_and_commits_remaining_steps(self):
+        plan = self.store.plan(self.resource, METADATA, IMAGE, IMAGE_ID)
+        container = Mock()
+        container.run_cfn_init = Mock(side_effect=["first\n", "second\n", "third\n"])
+
+        self.assertEqual(CheckpointStore.run(container, plan), "first\nsecond\nthird\n")
+        container.run_cfn_init.assert_has_calls([call([step.config_set]) for step in plan.steps])
+        container.commit.assert_has_calls([call(CHECKPOINT_REPOSITORY, step.key) for step in plan.steps])
+
+    def test_run_stops_at_first_failing_step(self):
+        plan = self.store.plan(self.resource, METADATA, IMAGE, IMAGE_ID)
+        container = Mock()
+        container.run_cfn_init = Mock(side_effect=[None, ValueError])
+
+        with self.assertRaises(ValueError):
+            CheckpointStore.run(container, plan)
+
+        container.commit.assert_called_once_with(CHECKPOINT_REPOSITORY, plan.steps[0].key)
+
+    def test_clear_removes_checkpoint_images(self):
+        self.client.remove_images = Mock(return_value=2)
+        self.assertEqual(self.store.clear(), 2)
+        self.client.remove_images.assert_called_once_with(CHECKPOINT_REPOSITORY)
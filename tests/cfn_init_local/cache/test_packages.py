@@ -0,0 +1,41 @@
+import unittest
+from unittest.mock import Mock
+from cfn_init_local.cache.packages import PackageCache
+
+
+class PackageCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.client = Mock()
+        self.container = Mock()
+        self.cache = PackageCache(self.client, max_size_mb=1)
+
+    def test_volume_is_per_image_unless_family_is_specified(self):
+        self.assertEqual(self.cache.volume("registry:5000/team/al2:latest"),
+                         "cfn-init-local-packages-registry-5000-team-al2-latest")
+        self.assertEqual(PackageCache(self.client, "al2").volume("any:image"), "cfn-init-local-packages-al2")
+
+    def test_seed_copies_shared_packages_under_shared_lock(self):
+        PackageCache.seed(self.container)
+
+        script = self.container.execute.call_args[0][0][2]
+        self.assertIn("keepcache=1", script)
+        self.assertIn("flock -s /var/cfn-init-local/package-cache/.lock", script)
+        self.assertIn("cp -au /var/cfn-init-local/package-cache/yum/. /var/cache/yum/", script)
+
+    def test_publish_copies_packages_and_prunes_under_exclusive_lock(self):
+        self.cache.publish(self.container)
+
+        script = self.container.execute.call_args[0][0][2]
+        self.assertTrue(script.startswith("flock /var/cfn-init-local/package-cache/.lock"))
+        self.assertIn("cp -au /var/cache/apt/archives/. /var/cfn-init-local/package-cache/apt/", script)
+        self.assertIn("-le 1048576", script)
+
+    def test_sizes_and_clear_only_consider_package_cache_volumes(self):
+        self.client.volume_sizes = Mock(return_value={"cfn-init-local-packages-al2": 10})
+        self.client.remove_volumes = Mock(return_value=1)
+
+        self.assertEqual(self.cache.sizes(), {"cfn-init-local-packages-al2": 10})
+        self.assertEqual(self.cache.clear(), 1)
+        self.client.volume_sizes.assert_called_once_with("cfn-init-local-packages-")
+        self.client.remove_volumes.assert_called_once_with("cfn-init-local-packages-")
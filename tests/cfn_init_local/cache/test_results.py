@@ -0,0 +1,84 @@
+import os
+import tempfile
+import time
+import unittest
+from cfn_init_local.cache.results import ResultCache
+
+KEY = "key"
+OTHER_KEY = "other_key"
+STACK = "stack"
+RESOURCE = "resource"
+
+
+class ResultCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.cache = ResultCache(self.directory.name)
+
+    def test_key_is_stable_for_equivalent_inputs(self):
+        key = ResultCache.key({"a": 1, "b": 2}, '{"x": "y"}', "image")
+        self.assertEqual(key, ResultCache.key({"b": 2, "a": 1}, '{ "x" : "y" }', "image"))
+
+    def test_key_changes_when_any_input_changes(self):
+        key = ResultCache.key({"a": 1}, '{"x": "y"}', "image")
+        self.assertNotEqual(key, ResultCache.key({"a": 2}, '{"x": "y"}', "image"))
+        self.assertNotEqual(key, ResultCache.key({"a": 1}, '{"x": "z"}', "image"))
+        self.assertNotEqual(key, ResultCache.key({"a": 1}, '{"x": "y"}', "other_image"))
+        self.assertNotEqual(key, ResultCache.key({"a": 1}, '{"x": "y"}', "image", "install"))
+        self.assertNotEqual(key, ResultCache.key({"a": 1}, '{"x": "y"}', "image", settings={"imds_v2_only": True}))
+        self.assertEqual(key, ResultCache.key({"a": 1}, '{"x": "y"}', "image", settings={}))
+
+    def test_get_when_no_result_returns_none(self):
+        self.assertIsNone(self.cache.get(KEY))
+
+    def test_get_returns_result_that_was_put(self):
+        self.cache.put(KEY, STACK, RESOURCE)
+        result = self.cache.get(KEY)
+        self.assertEqual(result["stack"], STACK)
+        self.assertEqual(result["resource"], RESOURCE)
+
+    def test_get_when_result_expired_returns_none(self):
+        cache = ResultCache(self.directory.name, max_age_days=1)
+        cache.put(KEY, STACK, RESOURCE)
+        self.age_entry(KEY, days=2)
+        self.assertIsNone(cache.get(KEY))
+
+    def test_clear_removes_all_results(self):
+        self.cache.put(KEY, STACK, RESOURCE)
+        self.cache.put(OTHER_KEY, STACK, RESOURCE)
+        self.cache.clear()
+        self.assertIsNone(self.cache.get(KEY))
+        self.assertIsNone(self.cache.get(OTHER_KEY))
+
+    def test_evict_removes_expired_results(self):
+        cache = ResultCache(self.directory.name, max_age_days=1)
+        cache.put(KEY, STACK, RESOURCE)
+        cache.put(OTHER_KEY, STACK, RESOURCE)
+        self.age_entry(KEY, days=2)
+        self.assertEqual(cache.evict(), 1)
+        self.assertIsNotNone(cache.get(OTHER_KEY))
+
+    def test_evict_removes_oldest_results_over_max_entries(self):
+        cache = ResultCache(self.directory.name, max_entries=1)
+        cache.put(KEY, STACK, RESOURCE)
+        cache.put(OTHER_KEY, STACK, RESOURCE)
+        self.age_entry(KEY, days=0.5)
+        self.assertEqual(cache.evict(), 1)
+        self.assertIsNone(cache.get(KEY))
+        self.assertIsNotNone(cache.get(OTHER_KEY))
+
+    def test_evict_removes_oldest_results_over_max_size(self):
+        cache = ResultCache(self.directory.name, max_size_mb=1)
+        cache.put(KEY, STACK, RESOURCE)
+        cache.put(OTHER_KEY, STACK, "r" * 1024 * 1024)
+        self.age_entry(OTHER_KEY, days=0.5)
+        self.assertEqual(cache.evict(), 1)
+        self.assertIsNotNone(cache.get(KEY))
+        self.assertIsNone(cache.get(OTHER_KEY))
+
+    def age_entry(self, key, days):
+        path = os.path.join(self.directory.name, "results", key + ".json")
+        mtime = time.time() - days * 24 * 60 * 60
+        os.utime(path, (mtime, mtime))
@@ -0,0 +1,68 @@
+import os
+import tempfile
+import time
+import unittest
+from cfn_init_local.cache.templates import ParsedTemplate, TemplateCache
+
+BODY = {"Resources": {"Instance": {"Metadata": {"AWS::CloudFormation::Init": {"config": {}}}}}}
+TEXT = '{"Resources": {}}'
+
+
+class TemplateCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.cache = TemplateCache(os.path.join(self.directory.name, "cache"))
+        self.template_path = os.path.join(self.directory.name, "template.json")
+        self.write(TEXT)
+        self.parsed = ParsedTemplate(TemplateCache.digest(TEXT), BODY, ["Instance"])
+
+    def test_get_when_not_cached_returns_none(self):
+        self.assertIsNone(self.cache.get(self.template_path))
+
+    def test_get_returns_put_template_while_file_is_unchanged(self):
+        self.cache.put(self.template_path, self.parsed)
+
+        self.assertEqual(self.cache.get(self.template_path), self.parsed)
+        self.assertIsNone(self.cache.get(self.template_path, incremental=True))
+
+    def test_get_when_file_changed_returns_none(self):
+        self.cache.put(self.template_path, self.parsed)
+        self.write('{"Resources": {"Other": {}}}')
+
+        self.assertIsNone(self.cache.get(self.template_path))
+        self.assertIsNone(self.cache.get(self.template_path, digest=TemplateCache.digest("changed")))
+
+    def test_get_with_digest_when_only_modification_time_changed_returns_template(self):
+        self.cache.put(self.template_path, self.parsed)
+        os.utime(self.template_path, ns=(0, 0))
+
+        self.assertIsNone(self.cache.get(self.template_path))
+        self.assertEqual(self.cache.get(self.template_path, digest=self.parsed.digest), self.parsed)
+
+    def test_get_when_entry_is_corrupt_returns_none(self):
+        self.cache.put(self.template_path, self.parsed)
+        entries = os.path.join(self.directory.name, "cache", "templates")
+        for name in os.listdir(entries):
+            with open(os.path.join(entries, name), "wb") as fh:
+                fh.write(b"not a pickle")
+
+        self.assertIsNone(self.cache.get(self.template_path))
+
+    def test_clear_and_evict_remove_entries(self):
+        self.cache.put(self.template_path, self.parsed)
+        self.assertEqual(self.cache.evict(), 0)
+        entries = os.path.join(self.directory.name, "cache", "templates")
+        two_weeks_ago = time.time() - 14 * 24 * 60 * 60
+        for name in os.listdir(entries):
+            os.utime(os.path.join(entries, name), (two_weeks_ago, two_weeks_ago))
+        self.assertEqual(self.cache.evict(), 1)
+
+        self.cache.put(self.template_path, self.parsed)
+        self.cache.clear()
+        self.assertIsNone(self.cache.get(self.template_path))
+
+    def write(self, text):
+        with open(self.template_path, "w") as fh:
+            fh.write(text)
@@ -0,0 +1,110 @@
+import unittest
+from unittest.mock import Mock
+from cfn_init_local.cloudformation.exceptions import EvaluationException
+from cfn_init_local.cloudformation.intrinsics import IntrinsicEvaluator, compile_sub
+
+STACK_NAME = "stack"
+TEMPLATE = {
+    "Parameters": {
+        "Env": {"Type": "String", "Default": "dev"},
+        "Subnets": {"Type": "CommaDelimitedList"},
+        "NoDefault": {"Type": "String"}
+    },
+    "Mappings": {
+        "Packages": {"us-east-1": {"Version": "1.0"}, "eu-west-1": {"Version": "2.0"}}
+    },
+    "Conditions": {
+        "IsProd": {"Fn::Equals": [{"Ref": "Env"}, "prod"]},
+        "IsNotProd": {"Fn::Not": [{"Condition": "IsProd"}]},
+        "IsProdInEu": {"Fn::And": [{"Condition": "IsProd"}, {"Fn::Equals": [{"Ref": "AWS::Region"}, "eu-west-1"]}]},
+        "Loop": {"Fn::Not": [{"Condition": "Loop"}]},
+        "NeedsValue": {"Fn::Equals": [{"Ref": "NoDefault"}, "value"]}
+    },
+    "Resources": {
+        "Instance": {},
+        "Bucket": {}
+    }
+}
+
+
+class IntrinsicEvaluatorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.evaluator = IntrinsicEvaluator(TEMPLATE, STACK_NAME, {"Subnets": "a,b"})
+
+    def test_ref_resolves_parameters_defaults_and_pseudo_parameters(self):
+        self.assertEqual(self.evaluator.evaluate({"Ref": "Env"}), "dev")
+        self.assertEqual(self.evaluator.evaluate({"Ref": "Subnets"}), ["a", "b"])
+        self.assertEqual(self.evaluator.evaluate({"Ref": "AWS::Region"}), "us-east-1")
+        self.assertEqual(self.evaluator.evaluate({"Ref": "AWS::StackName"}), STACK_NAME)
+        self.assertEqual(self.evaluator.evaluate({"Ref": "Instance"}), "Instance")
+
+    def test_ref_with_overridden_pseudo_parameter(self):
+        evaluator = IntrinsicEvaluator(TEMPLATE, STACK_NAME, {"AWS::Region": "eu-west-1"})
+        self.assertEqual(evaluator.evaluate({"Ref": "AWS::Region"}), "eu-west-1")
+        self.assertIn(":eu-west-1:", evaluator.evaluate({"Ref": "AWS::StackId"}))
+
+    def test_ref_to_parameter_without_value_throws_exception(self):
+        with self.assertRaises(EvaluationException) as context:
+            self.evaluator.evaluate({"files": {"Ref": "NoDefault"}})
+        self.assertEqual(context.exception.path, "$.files.Ref")
+
+    def test_sub_resolves_refs_attributes_variables_and_literals(self):
+        evaluator = IntrinsicEvaluator(TEMPLATE, STACK_NAME, attributes={"Bucket.Arn": "arn:aws:s3:::bucket"})
+        value = evaluator.evaluate({"Fn::Sub": ["${Env}/${AWS::Region}/${Bucket.Arn}/${Instance.Ip}/${Name}/${!Env}",
+                                                {"Name": {"Ref": "Env"}}]})
+        self.assertEqual(value, "dev/us-east-1/arn:aws:s3:::bucket/Instance.Ip/dev/${Env}")
+
+    def test_compile_sub_is_cached(self):
+        self.assertIs(compile_sub("${Env}-suffix"), compile_sub("${Env}-suffix"))
+        self.assertEqual(compile_sub("${Env}-suffix"), ((True, "Env"), (False, "-suffix")))
+
+    def test_join_select_split_and_base64(self):
+        self.assertEqual(self.evaluator.evaluate({"Fn::Join": ["-", ["a", {"Ref": "Env"}]]}), "a-dev")
+        self.assertEqual(self.evaluator.evaluate({"Fn::Select": [1, {"Ref": "Subnets"}]}), "b")
+        self.assertEqual(self.evaluator.evaluate({"Fn::Split": [",", "x,y"]}), ["x", "y"])
+        self.assertEqual(self.evaluator.evaluate({"Fn::Base64": "text"}), "dGV4dA==")
+
+    def test_find_in_map(self):
+        value = self.evaluator.evaluate({"Fn::FindInMap": ["Packages", {"Ref": "AWS::Region"}, "Version"]})
+        self.assertEqual(value, "1.0")
+
+    def test_find_in_map_when_key_missing_throws_exception(self):
+        with self.assertRaises(EvaluationException):
+            self.evaluator.evaluate({"Fn::FindInMap": ["Packages", "ap-south-1", "Version"]})
+
+    def test_if_and_no_value_remove_properties_and_list_items(self):
+        evaluator = IntrinsicEvaluator(TEMPLATE, STACK_NAME, {"Env": "prod"})
+        value = evaluator.evaluate({
+            "prod": {"Fn::If": ["IsProd", "yes", "no"]},
+            "removed": {"Fn::If": ["IsNotProd", "yes", {"Ref": "AWS::NoValue"}]},
+            "list": ["kept", {"Fn::If": ["IsProdInEu", "eu", {"Ref": "AWS::NoValue"}]}]
+        })
+        self.assertEqual(value, {"prod": "yes", "list": ["kept"]})
+
+    def test_condition_is_evaluated_once(self):
+        evaluate_condition = Mock(wraps=self.evaluator._IntrinsicEvaluator__evaluate_condition)
+        self.evaluator._IntrinsicEvaluator__evaluate_condition = evaluate_condition
+        self.assertFalse(self.evaluator.condition("IsProd"))
+        self.assertFalse(self.evaluator.condition("IsProd"))
+        evaluate_condition.assert_called_once()
+
+    def test_condition_referencing_itself_throws_exception(self):
+        with self.assertRaises(EvaluationException):
+            self.evaluator.condition("Loop")
+
+    def test_condition_that_can_not_be_evaluated_throws_same_exception_every_time(self):
+        for _ in range(2):
+            with self.assertRaises(EvaluationException) as context:
+                self.evaluator.condition("NeedsValue")
+            self.assertNotIn("references itself", str(context.exception))
+
+    def test_shared_subtrees_are_evaluated_once(self):
+        shared = [{"Ref": "Env"}, {"Fn::Join": ["-", ["a", "b"]]}]
+        value = self.evaluator.evaluate({"first": shared, "second": {"nested": shared}})
+        self.assertEqual(value["first"], ["dev", "a-b"])
+        self.assertIs(value["first"], value["second"]["nested"])
+
+    def test_values_without_functions_are_unchanged(self):
+        node = {"config": {"files": {"/etc/app": {"content": "text", "mode": "000644"}}, "list": [1, True]}}
+        self.assertEqual(self.evaluator.evaluate(node), node)
@@ -0,0 +1,92 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from cfn_init_local.cache.templates import TemplateCache
+from cfn_init_local.cloudformation.loader import TemplateLoader
+from cfn_init_local.cloudformation.models import Template
+
+INIT_RESOURCE = {"Metadata": {"AWS::CloudFormation::Init": {"config": {}}}}
+
+
+def nested_stack(url):
+    return {"Type": "AWS::CloudFormation::Stack", "Properties": {"TemplateURL": url}}
+
+
+class TemplateLoaderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def test_load_follows_local_nested_stacks_recursively(self):
+        self.write("root.json", {"Resources": {"App": nested_stack("stacks/app.json"), "Root": INIT_RESOURCE}})
+        self.write("stacks/app.json", {"Resources": {"Web": nested_stack("file://web.yaml"), "App": INIT_RESOURCE}})
+        self.write("stacks/web.yaml", {"Resources": {"Web": INIT_RESOURCE}})
+
+        root = TemplateLoader().load(self.path("root.json"), "Root")
+
+        app = root.nested_stacks["App"]
+        web = app.nested_stacks["Web"]
+        self.assertEqual(app.name, "Root-App")
+        self.assertEqual(web.name, "Root-App-Web")
+        self.assertEqual(web.path, self.path("stacks/web.yaml"))
+        self.assertListEqual(web.cfn_init_resource_names, ["Web"])
+
+    def test_load_parses_templates_with_the_same_content_once(self):
+        self.write("root.json", {"Resources": {"A": nested_stack("a.json"), "B": nested_stack("b.json"),
+                                               "C": nested_stack("a.json")}})
+        self.write("a.json", {"Resources": {"Shared": INIT_RESOURCE}})
+        self.write("b.json", {"Resources": {"Shared": INIT_RESOURCE}})
+
+        with patch.object(Template, "parse", wraps=Template.parse) as parse:
+            root = TemplateLoader().load(self.path("root.json"), "Root")
+
+        self.assertEqual(parse.call_count, 2)
+        names = [nested.name for nested in root.nested_stacks.values()]
+        self.assertListEqual(names, ["Root-A", "Root-B", "Root-C"])
+        self.assertIs(root.nested_stacks["A"].body, root.nested_stacks["B"].body)
+
+    def test_load_skips_remote_nested_stacks(self):
+        self.write("root.json", {"Resources": {"Remote": nested_stack("https://bucket.s3.amazonaws.com/t.json"),
+                                               "Sub": nested_stack({"Fn::Sub": "${Url}"})}})
+
+        self.assertDictEqual(TemplateLoader().load(self.path("root.json"), "Root").nested_stacks, {})
+
+    def test_load_when_a_template_includes_itself_throws_error(self):
+        self.write("root.json", {"Resources": {"Child": nested_stack("child.json")}})
+        self.write("child.json", {"Resources": {"Loop": nested_stack("root.json")}})
+
+        with self.assertRaises(ValueError):
+            TemplateLoader().load(self.path("root.json"), "Root")
+
+    def test_load_incremental_keeps_nested_stacks(self):
+        self.write("root.json", {"Resources": {"Child": nested_stack("child.json"), "Bucket": {"Type": "S3"}}})
+        self.write("child.json", {"Resources": {"Init": INIT_RESOURCE}})
+
+        root = TemplateLoader(incremental=True).load(self.path("root.json"), "Root")
+
+        self.assertDictEqual(root.body["Resources"]["Bucket"], {})
+        self.assertListEqual(root.nested_stacks["Child"].cfn_init_resource_names, ["Init"])
+
+    def test_load_with_template_cache_does_not_parse_unchanged_templates(self):
+        self.write("root.json", {"Resources": {"Child": nested_stack("child.json"), "Root": INIT_RESOURCE}})
+        self.write("child.json", {"Resources": {"Init": INIT_RESOURCE}})
+        cache = TemplateCache(self.path("cache"))
+        TemplateLoader(template_cache=cache).load(self.path("root.json"), "Root")
+
+        with patch.object(Template, "parse") as parse:
+            root = TemplateLoader(template_cache=cache).load(self.path("root.json"), "Root")
+
+        parse.assert_not_called()
+        self.assertListEqual(root.cfn_init_resource_names, ["Root"])
+        self.assertListEqual(root.nested_stacks["Child"].cfn_init_resource_names, ["Init"])
+
+    def path(self, name):
+        return os.path.join(self.directory.name, name)
+
+    def write(self, name, body):
+        os.makedirs(os.path.dirname(self.path(name)), exist_ok=True)
+        with open(self.path(name), "w") as fh:
+            json.dump(body, fh)
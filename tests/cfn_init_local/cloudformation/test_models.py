@@ -56,7 +56,64 @@ class ResourceTest(unittest.TestCase):
 	def test_describe_stack_resource_response_returns_response_with_cfn_init_embeded(self):
 		resource = Resource(NAME, BODY_WITH_CFN_INIT)
 		# using json.loads so the DESCRIBE_STACK_RESOURCE_RESPONSE can be an easier to read dict
-		self.assertEqual(json.dumps(DESCRIBE_STACK_RESOURCE_RESPONSE), resource.describe_stack_resource_response)
+		response = json.loads(resource.describe_stack_resource_response)
+		detail = response["DescribeStackResourceResponse"]["DescribeStackResourceResult"]["StackResourceDetail"]
+		self.assertEqual(json.loads(detail["Metadata"]), CFN_INIT_SECTION)
+		detail["Metadata"] = json.dumps(CFN_INIT_SECTION)
+		self.assertEqual(response, DESCRIBE_STACK_RESOURCE_RESPONSE)
+
+	def test_describe_stack_resource_response_is_serialized_on_first_use(self):
+		resource = Resource(NAME, BODY_WITH_CFN_INIT)
+		self.assertIsNone(resource._response)
+		self.assertIs(resource.describe_stack_resource_response, resource.describe_stack_resource_response)
+
+	def test_describe_stack_resource_response_returns_none_when_no_cfn_init(self):
+		self.assertIsNone(Resource(NAME, {}).describe_stack_resource_response)
+
+	def test_resource_has_no_instance_dict(self):
+		self.assertFalse(hasattr(Resource(NAME, {}), "__dict__"))
+
+	def test_get_config_names_without_config_sets_returns_config(self):
+		resource = Resource(NAME, {"Metadata": {"AWS::CloudFormation::Init": {"config": {}}}})
+		self.assertListEqual(resource.get_config_names(), ["config"])
+
+	def test_get_config_names_returns_configs_of_config_set(self):
+		init = {"configSets": {"default": ["a", "b"], "single": "b"}, "a": {}, "b": {}}
+		resource = Resource(NAME, {"Metadata": {"AWS::CloudFormation::Init": init}})
+		self.assertListEqual(resource.get_config_names(), ["a", "b"])
+		self.assertListEqual(resource.get_config_names("single"), ["b"])
+
+	def test_get_config_names_when_config_set_does_not_exist_throws_error(self):
+		resource = Resource(NAME, {"Metadata": {"AWS::CloudFormation::Init": {"config": {}}}})
+		with self.assertRaises(ValueError):
+			resource.get_config_names("missing")
+
+	def test_get_config_names_expands_config_set_references_in_order(self):
+		init = {"configSets": {"default": ["a", {"ConfigSet": "nested"}, "d"], "nested": ["b", {"ConfigSet": "leaf"}],
+							  "leaf": "c"}}
+		resource = Resource(NAME, {"Metadata": {"AWS::CloudFormation::Init": init}})
+		self.assertListEqual(resource.get_config_names(), ["a", "b", "c", "d"])
+
+	def test_get_config_names_when_config_sets_reference_each_other_throws_error(self):
+		init = {"configSets": {"default": [{"ConfigSet": "other"}], "other": ["a", {"ConfigSet": "default"}]}}
+		resource = Resource(NAME, {"Metadata": {"AWS::CloudFormation::Init": init}})
+		with self.assertRaisesRegex(ValueError, "default -> other -> default"):
+			resource.get_config_names()
+
+	def test_config_set_names_returns_config_sets_or_default(self):
+		init = {"configSets": {"install": ["a"], "configure": ["b"]}, "a": {}, "b": {}}
+		self.assertListEqual(Resource(NAME, {"Metadata": {"AWS::CloudFormation::Init": init}}).config_set_names,
+							 ["install", "configure"])
+		resource = Resource(NAME, {"Metadata": {"AWS::CloudFormation::Init": {"config": {}}}})
+		self.assertListEqual(resource.config_set_names, ["default"])
+
+	def test_with_config_sets_adds_config_sets_without_modifying_resource(self):
+		init = {"configSets": {"default": ["config"]}, "config": {}}
+		resource = Resource(NAME, {"Metadata": {"AWS::CloudFormation::Init": init}})
+		new_resource = resource.with_config_sets({"extra": ["config"]})
+		self.assertListEqual(new_resource.get_config_names("extra"), ["config"])
+		self.assertListEqual(new_resource.get_config_names(), ["config"])
+		self.assertNotIn("extra", init["configSets"])
 
 
 class TemplateTest(unittest.TestCase):
@@ -65,13 +122,21 @@ class TemplateTest(unittest.TestCase):
 		template = Template(NAME, {})
 		self.assertEqual(template.name, NAME)
 
-	@patch.object(IOUtils, "read_json")
-	def test_from_file_reads_json_from_specified_path(self, mock_read_json_method):
-		mock_read_json_method.return_value = BODY
+	@patch.object(IOUtils, "read_file")
+	def test_from_file_reads_json_from_specified_path(self, mock_read_file_method):
+		mock_read_file_method.return_value = json.dumps(BODY)
 		template = Template.from_file_path(FILE_PATH, NAME)
+		mock_read_file_method.assert_called_once_with(FILE_PATH)
 		self.assertEqual(template.name, NAME)
 		self.assertDictEqual(template.body, BODY)
 
+	@patch.object(IOUtils, "read_file")
+	def test_from_file_reads_yaml_from_specified_path(self, mock_read_file_method):
+		mock_read_file_method.return_value = "Resources:\n  ResourceWithCfnInit:\n    Metadata:\n      AWS::CloudFormation::Init: data\n"
+		template = Template.from_file_path(FILE_PATH + ".yaml", NAME, incremental=True)
+		self.assertDictEqual(template.body, {"Resources": {"ResourceWithCfnInit": BODY_WITH_CFN_INIT}})
+		self.assertListEqual(template.cfn_init_resource_names, ["ResourceWithCfnInit"])
+
 	def test_get_resources_using_cfn_init_returns_no_resources_when_none_use_cfn_init(self):
 		template = Template(NAME, BODY_WITH_NO_RESOURCES_USING_CFN_INIT)
 		resources = template.get_resources_using_cfn_init()
@@ -82,3 +147,56 @@ class TemplateTest(unittest.TestCase):
 		resources = template.get_resources_using_cfn_init()
 		self.assertEqual(len(resources), 1)
 		self.assertEqual(type(resources[0]), Resource)
+
+	def test_get_resources_using_cfn_init_with_evaluator_resolves_metadata_and_skips_false_conditions(self):
+		body = {
+			"Parameters": {"Env": {"Type": "String", "Default": "dev"}},
+			"Conditions": {"IsProd": {"Fn::Equals": [{"Ref": "Env"}, "prod"]}},
+			"Resources": {
+				"Dev": {"Metadata": {"AWS::CloudFormation::Init": {"config": {"commands": {"env": {"command": {"Fn::Sub": "echo ${Env}"}}}}}}},
+				"Prod": {"Condition": "IsProd", "Metadata": {"AWS::CloudFormation::Init": {"config": {}}}}
+			}
+		}
+		template = Template(NAME, body)
+		resources = template.get_resources_using_cfn_init(template.evaluator())
+		self.assertEqual([resource.name for resource in resources], ["Dev"])
+		self.assertEqual(resources[0].get_config("config")["commands"]["env"]["command"], "echo dev")
+
+	def test_read_parameters_reads_cli_format(self):
+		with patch.object(IOUtils, "read_json", return_value=[{"ParameterKey": "Env", "ParameterValue": "prod"}]):
+			self.assertEqual(Template.read_parameters(FILE_PATH), {"Env": "prod"})
+
+	def test_read_parameters_reads_dict(self):
+		with patch.object(IOUtils, "read_json", return_value={"Env": "prod"}):
+			self.assertEqual(Template.read_parameters(FILE_PATH), {"Env": "prod"})
+
+	def test_get_resources_using_cfn_init_only_creates_resources_using_cfn_init(self):
+		template = Template(NAME, BODY_WITH_ONE_RESOURCE_USING_CFN_INIT)
+		self.assertListEqual(template.cfn_init_resource_names, ["ResourceWithCfnInit"])
+		with patch("cfn_init_local.cloudformation.models.Resource") as resourcecls:
+			template.get_resources_using_cfn_init()
+		resourcecls.assert_called_once_with("ResourceWithCfnInit", BODY_WITH_CFN_INIT)
+
+	@patch.object(IOUtils, "read_file")
+	def test_from_file_with_incremental_keeps_only_resources_using_cfn_init(self, mock_read_file_method):
+		body = dict(BODY_WITH_ONE_RESOURCE_USING_CFN_INIT, Resources={"ResourceWithCfnInit": BODY_WITH_CFN_INIT, "ResourceWithoutCfnInit": {"Type": "AWS::S3::Bucket"}})
+		mock_read_file_method.return_value = json.dumps(body)
+		template = Template.from_file_path(FILE_PATH, NAME, incremental=True)
+		self.assertDictEqual(template.body["Resources"], {"ResourceWithCfnInit": BODY_WITH_CFN_INIT, "ResourceWithoutCfnInit": {}})
+		self.assertListEqual(template.cfn_init_resource_names, ["ResourceWithCfnInit"])
+
+	def test_get_nested_stack_parameters_evaluates_parameters_and_passes_on_pseudo_parameters(self):
+		body = {
+			"Parameters": {"Env": {"Type": "String"}},
+			"Conditions": {"IsProd": {"Fn::Equals": [{"Ref": "Env"}, "prod"]}},
+			"Resources": {
+				"Nested": {"Type": "AWS::CloudFormation::Stack", "Properties": {"Parameters": {"Name": {"Fn::Sub": "${Env}-app"}}}},
+				"ProdOnly": {"Type": "AWS::CloudFormation::Stack", "Condition": "IsProd"}
+			}
+		}
+		template = Template(NAME, body)
+		parameters = {"Env": "dev", "AWS::Region": "eu-west-1", "AWS::StackName": "ignored"}
+		evaluator = template.evaluator(parameters)
+		self.assertDictEqual(template.get_nested_stack_parameters("Nested", parameters, evaluator),
+							 {"AWS::Region": "eu-west-1", "Name": "dev-app"})
+		self.assertIsNone(template.get_nested_stack_parameters("ProdOnly", parameters, evaluator))
@@ -0,0 +1,42 @@
+import json
+import unittest
+from cfn_init_local.cloudformation.scanner import TemplateScanner
+
+TEMPLATE = {
+    "AWSTemplateFormatVersion": "2010-09-09",
+    "Parameters": {"Env": {"Type": "String", "Default": "dev"}},
+    "Resources": {
+        "Kept": {"Type": "AWS::EC2::Instance", "Metadata": {"keep": True}, "Properties": {"List": [1, {"a": "}"}]}},
+        "Dropped": {"Type": "AWS::S3::Bucket", "Properties": {"BucketName": "{\"not\": \"json\"}"}}
+    },
+    "Outputs": {}
+}
+
+
+class TemplateScannerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.scanner = TemplateScanner(lambda body: "Metadata" in body)
+
+    def test_scan_keeps_sections_and_kept_resources(self):
+        template = self.scanner.scan(json.dumps(TEMPLATE, indent=4))
+        self.assertEqual(template["Parameters"], TEMPLATE["Parameters"])
+        self.assertEqual(template["Outputs"], {})
+        self.assertEqual(template["Resources"]["Kept"], TEMPLATE["Resources"]["Kept"])
+
+    def test_scan_keeps_names_of_dropped_resources_with_empty_bodies(self):
+        template = self.scanner.scan(json.dumps(TEMPLATE))
+        self.assertListEqual(list(template["Resources"].keys()), ["Kept", "Dropped"])
+        self.assertEqual(template["Resources"]["Dropped"], {})
+
+    def test_scan_when_keeping_everything_matches_json_loads(self):
+        text = json.dumps(TEMPLATE, indent="\t")
+        self.assertEqual(TemplateScanner(lambda body: True).scan(text), json.loads(text))
+
+    def test_scan_empty_template(self):
+        self.assertEqual(self.scanner.scan(" { } "), {})
+
+    def test_scan_when_invalid_throws_error(self):
+        for text in ["[]", '{"Resources": {"A": {}} "Outputs": {}}', '{"Resources": {}} extra', '{"Resources"}']:
+            with self.assertRaises(ValueError):
+                self.scanner.scan(text)
@@ -0,0 +1,88 @@
+import unittest
+from cfn_init_local.cloudformation.models import Resource
+from cfn_init_local.cloudformation.validation import InitValidator
+
+NAME = "Instance"
+PATH = "$.Resources.Instance.Metadata.AWS::CloudFormation::Init"
+VALID_INIT = {
+    "configSets": {"default": ["install", {"ConfigSet": "configure"}], "configure": "configure"},
+    "install": {
+        "packages": {"yum": {"httpd": [], "php": ["7.4"]}},
+        "groups": {"web": {"gid": "45"}},
+        "users": {"web": {"groups": ["web"], "uid": 50, "homeDir": "/srv/web"}},
+        "sources": {"/srv/web": "https://example.com/site.tar.gz"}
+    },
+    "configure": {
+        "files": {
+            "/etc/httpd/conf.d/app.conf": {"content": "Listen 80", "mode": "000644", "owner": "root",
+                                           "group": "root", "encoding": "plain"},
+            "/etc/app.json": {"content": {"key": "value"}, "context": {"name": "app"}}
+        },
+        "commands": {"restart": {"command": ["apachectl", "graceful"], "env": {"A": "b"}, "cwd": "/",
+                                 "test": "true", "ignoreErrors": "false"}},
+        "services": {"sysvinit": {"httpd": {"enabled": True, "ensureRunning": "true",
+                                            "files": ["/etc/httpd/conf.d/app.conf"], "sources": ["/srv/web"],
+                                            "packages": {"yum": ["httpd"]}, "commands": ["restart"]}}}
+    }
+}
+
+
+def validate(init):
+    return [(error.path, error.message) for error in
+            InitValidator.validate(Resource(NAME, {"Metadata": {"AWS::CloudFormation::Init": init}}))]
+
+
+class InitValidatorTest(unittest.TestCase):
+
+    def test_validate_valid_init_returns_no_errors(self):
+        self.assertListEqual(validate(VALID_INIT), [])
+
+    def test_validate_reports_every_error_with_its_path(self):
+        errors = validate({"config": {
+            "command": {},
+            "packages": {"yumm": {"httpd": []}},
+            "files": {"/etc/app.conf": {"content": "x", "source": "y", "mode": 644, "owner": 0, "encodnig": "plain"}},
+            "commands": {"start": {"cmd": "start"}},
+            "services": {"sysvinit": {"httpd": {"files": ["/etc/missing.conf"], "enabled": "yes"}}}
+        }})
+
+        paths = [path for path, _ in errors]
+        self.assertListEqual(paths, [
+            PATH + ".config.command",
+            PATH + ".config.packages.yumm",
+            PATH + ".config.files./etc/app.conf.encodnig",
+            PATH + ".config.files./etc/app.conf",
+            PATH + ".config.files./etc/app.conf.owner",
+            PATH + ".config.files./etc/app.conf.mode",
+            PATH + ".config.commands.start.cmd",
+            PATH + ".config.commands.start",
+            PATH + ".config.services.sysvinit.httpd.enabled",
+            PATH + ".config.services.sysvinit.httpd.files[0]"
+        ])
+        self.assertIn("Unknown package manager 'yumm'", errors[1][1])
+        self.assertIn("quoted string", errors[5][1])
+
+    def test_validate_reports_bad_config_set_references(self):
+        errors = validate({"configSets": {"default": ["missing", {"ConfigSet": "other"}, 1]}, "config": {}})
+
+        self.assertListEqual([path for path, _ in errors], [
+            PATH + ".configSets.default[0]", PATH + ".configSets.default[1]", PATH + ".configSets.default[2]"])
+
+    def test_validate_reports_each_config_set_cycle_once(self):
+        errors = validate({"configSets": {"default": ["config", {"ConfigSet": "a"}], "a": [{"ConfigSet": "b"}],
+                                          "b": [{"ConfigSet": "a"}]}, "config": {}})
+
+        self.assertListEqual([path for path, _ in errors], [PATH + ".configSets.a"])
+        self.assertIn("a -> b -> a", errors[0][1])
+
+    def test_validate_without_config_sets_requires_config(self):
+        self.assertListEqual([path for path, _ in validate({"install": {}})], [PATH])
+
+    def test_validate_rejects_bad_mode_strings(self):
+        errors = validate({"config": {"files": {"/f": {"content": "", "mode": "0008"}}}})
+        self.assertListEqual([path for path, _ in errors], [PATH + ".config.files./f.mode"])
+
+    def test_validate_does_not_type_check_intrinsic_functions(self):
+        init = {"config": {"files": {"/f": {"content": {"Fn::Sub": "${A}"}, "mode": {"Ref": "Mode"}}},
+                           "commands": {"c": {"command": {"Fn::Join": [" ", ["a", "b"]]}}}}}
+        self.assertListEqual(validate(init), [])
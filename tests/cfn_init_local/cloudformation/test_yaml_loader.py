@@ -0,0 +1,65 @@
+import unittest
+from unittest.mock import patch
+from cfn_init_local.cloudformation import yaml_loader
+from cfn_init_local.cloudformation.yaml_loader import YamlTemplateLoader
+
+TEMPLATE = """
+AWSTemplateFormatVersion: 2010-09-09
+Conditions:
+  IsProd: !Equals [!Ref Env, prod]
+Resources:
+  Instance:
+    Condition: IsProd
+    Metadata:
+      AWS::CloudFormation::Init:
+        config:
+          files:
+            /etc/app.conf:
+              content: !Sub |
+                endpoint=${Database.Endpoint.Address}
+          commands:
+            join:
+              command: !Join [" ", [echo, !GetAtt Database.Endpoint.Address]]
+            select:
+              command: !Select [0, !GetAZs ""]
+            condition:
+              command: !If [IsProd, !Condition IsProd, !Ref AWS::NoValue]
+"""
+
+
+class YamlTemplateLoaderTest(unittest.TestCase):
+
+    def test_loads_converts_short_form_tags_to_long_form(self):
+        body = YamlTemplateLoader.loads(TEMPLATE)
+
+        self.assertEqual(body["Conditions"]["IsProd"], {"Fn::Equals": [{"Ref": "Env"}, "prod"]})
+        config = body["Resources"]["Instance"]["Metadata"]["AWS::CloudFormation::Init"]["config"]
+        self.assertEqual(config["files"]["/etc/app.conf"]["content"],
+                         {"Fn::Sub": "endpoint=${Database.Endpoint.Address}\n"})
+        self.assertEqual(config["commands"]["join"]["command"],
+                         {"Fn::Join": [" ", ["echo", {"Fn::GetAtt": ["Database", "Endpoint.Address"]}]]})
+        self.assertEqual(config["commands"]["select"]["command"], {"Fn::Select": [0, {"Fn::GetAZs": ""}]})
+        self.assertEqual(config["commands"]["condition"]["command"],
+                         {"Fn::If": ["IsProd", {"Condition": "IsProd"}, {"Ref": "AWS::NoValue"}]})
+
+    def test_loads_keeps_dates_as_strings(self):
+        self.assertEqual(YamlTemplateLoader.loads(TEMPLATE)["AWSTemplateFormatVersion"], "2010-09-09")
+
+    def test_loads_get_att_sequence_form(self):
+        self.assertEqual(YamlTemplateLoader.loads("!GetAtt [Database, Port]"), {"Fn::GetAtt": ["Database", "Port"]})
+
+    def test_loads_invalid_yaml_reports_line(self):
+        with self.assertRaises(yaml_loader.yaml.YAMLError) as context:
+            YamlTemplateLoader.loads("Resources:\n  A: [1\n")
+        self.assertIn("line", str(context.exception))
+
+    def test_is_yaml_uses_extension_then_content(self):
+        self.assertTrue(YamlTemplateLoader.is_yaml("template.YML", "{}"))
+        self.assertTrue(YamlTemplateLoader.is_yaml("template.template", "Resources: {}"))
+        self.assertFalse(YamlTemplateLoader.is_yaml("template.template", '\n {"Resources": {}}'))
+
+    def test_loads_without_pyyaml_throws_error(self):
+        with patch.object(yaml_loader, "yaml", None), \
+                patch.object(YamlTemplateLoader, "_YamlTemplateLoader__loader", None):
+            with self.assertRaises(ImportError):
+                YamlTemplateLoader.loads(TEMPLATE)
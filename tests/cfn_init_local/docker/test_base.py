@@ -1,5 +1,7 @@
+import io
+import tarfile
 import unittest
-from unittest.mock import Mock
+from unittest.mock import Mock, call
 from cfn_init_local.docker.base import BaseContainer, BasePod
 from cfn_init_local.docker.exceptions import DockerException
 
@@ -70,6 +72,70 @@ class BaseContainerTest(unittest.TestCase):
 		container.stop()
 		self.docker_container.stop.assert_called_once()
 
+	def test_stop_with_timeout_passes_timeout_to_container_stop(self):
+		container = BaseContainer(IMAGE, CMD, self.docker_container)
+		container.stop(0)
+		self.docker_container.stop.assert_called_once_with(timeout=0)
+
+	def test_remove_calls_container_remove(self):
+		container = BaseContainer(IMAGE, CMD, self.docker_container)
+		container.remove()
+		self.docker_container.remove.assert_called_once()
+
+	def test_execute_stream_writes_chunks_to_output_and_returns_text(self):
+		self.mock_exec_api([b"first ", b"second"], 0)
+		output = Mock()
+		container = BaseContainer(IMAGE, CMD, self.docker_container)
+		self.assertEqual(container.execute_stream(EXECUTE_CMD, output), output.text)
+		output.write.assert_has_calls([call(b"first "), call(b"second")])
+		self.docker_container.client.api.exec_create.assert_called_once_with(ID, EXECUTE_CMD)
+		self.docker_container.client.api.exec_start.assert_called_once_with("exec", stream=True)
+
+	def test_execute_stream_when_exit_code_non_zero_throws_exception(self):
+		self.mock_exec_api([b"output"], 1)
+		container = BaseContainer(IMAGE, CMD, self.docker_container)
+		with self.assertRaises(DockerException):
+			container.execute_stream(EXECUTE_CMD, Mock())
+
+	def mock_exec_api(self, chunks, exit_code):
+		api = self.docker_container.client.api
+		api.exec_create = Mock(return_value={"Id": "exec"})
+		api.exec_start = Mock(return_value=iter(chunks))
+		api.exec_inspect = Mock(return_value={"ExitCode": exit_code})
+
+	def test_put_file_puts_single_file_archive_at_root(self):
+		container = BaseContainer(IMAGE, CMD, self.docker_container)
+		container.put_file("/var/dir/file.json", OUTPUT)
+		directory, archive = self.docker_container.put_archive.call_args[0]
+		self.assertEqual(directory, "/")
+		with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+			self.assertListEqual(tar.getnames(), ["var/dir/file.json"])
+			self.assertEqual(tar.extractfile("var/dir/file.json").read(), OUTPUT)
+
+	def test_put_files_puts_every_file_in_one_archive(self):
+		container = BaseContainer(IMAGE, CMD, self.docker_container)
+		container.put_files({"/var/first": b"first", "/etc/second": b"second"})
+		self.docker_container.put_archive.assert_called_once()
+		with tarfile.open(fileobj=io.BytesIO(self.docker_container.put_archive.call_args[0][1])) as tar:
+			self.assertListEqual(sorted(tar.getnames()), ["etc/second", "var/first"])
+			self.assertEqual(tar.extractfile("etc/second").read(), b"second")
+
+	def test_put_files_when_not_started_throws_error(self):
+		with self.assertRaises(ValueError):
+			BaseContainer(IMAGE, CMD).put_files({"/var/file": OUTPUT})
+
+	def test_mark_failed_sets_failed(self):
+		container = BaseContainer(IMAGE, CMD)
+		self.assertFalse(container.failed)
+		container.mark_failed()
+		self.assertTrue(container.failed)
+
+	def test_clear_failed_clears_failed(self):
+		container = BaseContainer(IMAGE, CMD)
+		container.mark_failed()
+		container.clear_failed()
+		self.assertFalse(container.failed)
+
 
 class BasePodTest(unittest.TestCase):
 
@@ -89,3 +155,34 @@ class BasePodTest(unittest.TestCase):
 		with BasePod([self.container]):
 			pass
 		self.container.stop.assert_called_once()
+
+	def test_with_clause_passes_stop_timeout_to_containers(self):
+		with BasePod([self.container], stop_timeout=0):
+			pass
+		self.container.stop.assert_called_once_with(0)
+
+	def test_with_clause_does_not_remove_containers_by_default(self):
+		with BasePod([self.container]):
+			pass
+		self.container.remove.assert_not_called()
+
+	def test_with_clause_removes_only_containers_that_did_not_fail(self):
+		failed_container = Mock()
+		failed_container.failed = True
+		self.container.failed = False
+		pod = BasePod([self.container, failed_container], remove=True)
+		with pod:
+			pass
+		self.container.remove.assert_called_once()
+		failed_container.stop.assert_called_once()
+		failed_container.remove.assert_not_called()
+		self.assertListEqual([failed_container], pod.retained_containers())
+		self.assertIsNotNone(pod.teardown_duration)
+
+	def test_discard_container_removes_and_stops_container(self):
+		other_container = Mock()
+		pod = BasePod([self.container, other_container], stop_timeout=0)
+		pod.discard_container(self.container)
+		self.assertListEqual([other_container], pod.containers)
+		self.container.stop.assert_called_once_with(0)
+		self.container.remove.assert_not_called()
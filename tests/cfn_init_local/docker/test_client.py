@@ -1,3 +1,6 @@
+import docker
+import io
+import tarfile
 import unittest
 from unittest.mock import Mock, call
 from cfn_init_local import ROOT
@@ -6,6 +9,7 @@ from cfn_init_local.docker.client import DockerClient
 from cfn_init_local.docker.exceptions import ImageNotFoundException
 
 IMAGE = "image"
+OTHER_IMAGE = "other_image"
 CMD = "cmd"
 ID = 1
 
@@ -27,7 +31,7 @@ class DockerClientTest(unittest.TestCase):
         self.docker = Mock()
         self.docker_container = Mock()
         self.docker_container.id = ID
-        self.docker.containers.run = Mock(return_value=self.docker_container)
+        self.docker.containers.create = Mock(return_value=self.docker_container)
         self.client = DockerClient(self.docker)
 
     def test_start_container_when_image_exists(self):
@@ -38,7 +42,49 @@ class DockerClientTest(unittest.TestCase):
 
         self.assertEqual(container.id, ID)
         self.docker.images.list.assert_called_once_with(filters={"reference": IMAGE})
-        self.docker.containers.run.assert_called_once_with(*EXPECTED_RUN_CMD_ARGS, **EXPECTED_RUN_CMD_KWARGS)
+        self.docker.containers.create.assert_called_once_with(*EXPECTED_RUN_CMD_ARGS, **EXPECTED_RUN_CMD_KWARGS)
+
+    def test_start_container_delivers_files_before_starting(self):
+        self.docker.images.list = Mock(return_value=[IMAGE])
+        events = []
+        self.docker_container.put_archive = Mock(side_effect=lambda *args: events.append("put_archive"))
+        self.docker_container.start = Mock(side_effect=lambda: events.append("start"))
+        container = BaseContainer(IMAGE, CMD, files={"/var/file.json": b"data"})
+
+        self.client.start_container(container)
+
+        self.assertListEqual(events, ["put_archive", "start"])
+        directory, archive = self.docker_container.put_archive.call_args[0]
+        self.assertEqual(directory, "/")
+        with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+            self.assertEqual(tar.extractfile("var/file.json").read(), b"data")
+
+    def test_start_container_mounts_container_volumes(self):
+        self.docker.images.list = Mock(return_value=[IMAGE])
+        volume = {"/mirror": {"bind": "/var/cfn-init-local/mirrors/0", "mode": "ro"}}
+
+        self.client.start_container(BaseContainer(IMAGE, CMD, volumes=volume))
+
+        self.assertEqual(self.docker.containers.create.call_args[1]["volumes"],
+                         dict(EXPECTED_RUN_CMD_KWARGS["volumes"], **volume))
+
+    def test_start_container_without_files_does_not_put_archive(self):
+        self.docker.images.list = Mock(return_value=[IMAGE])
+
+        self.client.start_container(BaseContainer(IMAGE, CMD))
+
+        self.docker_container.put_archive.assert_not_called()
+        self.docker_container.start.assert_called_once()
+
+    def test_start_container_when_files_cannot_be_delivered_removes_container(self):
+        self.docker.images.list = Mock(return_value=[IMAGE])
+        self.docker_container.put_archive = Mock(side_effect=ValueError("failed"))
+
+        with self.assertRaises(ValueError):
+            self.client.start_container(BaseContainer(IMAGE, CMD, files={"/var/file.json": b"data"}))
+
+        self.docker_container.start.assert_not_called()
+        self.docker_container.remove.assert_called_once_with(force=True)
 
     def test_start_container_when_image_does_not_exists_throws_error(self):
         self.docker.images.list = Mock(return_value=[])
@@ -58,9 +104,70 @@ class DockerClientTest(unittest.TestCase):
 
         for i in range(num_containers):
             self.assertEqual(containers[i].id, ID)
-        list_calls = [call(filters={"reference": IMAGE}) for _ in range(num_containers)]
-        self.docker.images.list.assert_has_calls(list_calls)
-        run_calls = [call(*EXPECTED_RUN_CMD_ARGS, **EXPECTED_RUN_CMD_KWARGS)]
-        self.docker.containers.run.assert_has_calls(run_calls)
+        self.docker.images.list.assert_called_once_with(filters={"reference": IMAGE})
+        run_calls = [call(*EXPECTED_RUN_CMD_ARGS, **EXPECTED_RUN_CMD_KWARGS) for _ in range(num_containers)]
+        self.docker.containers.create.assert_has_calls(run_calls)
         self.assertListEqual(pod.containers, containers)
 
+    def test_create_pod_validates_each_distinct_image_once(self):
+        self.docker.images.list = Mock(return_value=[IMAGE])
+        containers = [BaseContainer(IMAGE, CMD), BaseContainer(IMAGE, CMD), BaseContainer(OTHER_IMAGE, CMD)]
+
+        self.client.create_pod(containers)
+
+        self.docker.images.list.assert_has_calls(
+            [call(filters={"reference": IMAGE}), call(filters={"reference": OTHER_IMAGE})])
+        self.assertEqual(self.docker.images.list.call_count, 2)
+        self.assertEqual(self.docker.containers.create.call_count, 3)
+
+    def test_create_pod_when_image_does_not_exist_starts_no_containers(self):
+        self.docker.images.list = Mock(return_value=[])
+
+        with self.assertRaises(ImageNotFoundException):
+            self.client.create_pod([BaseContainer(IMAGE, CMD)])
+
+        self.docker.containers.create.assert_not_called()
+
+    def test_create_pod_when_a_container_fails_to_start_removes_started_containers_and_starts_no_more(self):
+        self.docker.images.list = Mock(return_value=[IMAGE])
+        self.docker.containers.create = Mock(side_effect=[self.docker_container, ValueError("failed"),
+                                                          self.docker_container])
+        containers = [BaseContainer(IMAGE, CMD), BaseContainer(IMAGE, CMD), BaseContainer(IMAGE, CMD)]
+
+        with self.assertRaises(ValueError):
+            self.client.create_pod(containers, max_concurrent_requests=1, remove=False)
+
+        self.assertEqual(self.docker.containers.create.call_count, 2)
+        self.docker_container.stop.assert_called_once()
+        self.docker_container.remove.assert_called_once()
+
+    def test_get_image_id_returns_image_id(self):
+        image = Mock()
+        image.id = "sha256:abc"
+        self.docker.images.get = Mock(return_value=image)
+
+        self.assertEqual(self.client.get_image_id(IMAGE), "sha256:abc")
+        self.docker.images.get.assert_called_once_with(IMAGE)
+
+    def test_get_image_id_when_image_does_not_exist_throws_error(self):
+        self.docker.images.get = Mock(side_effect=docker.errors.ImageNotFound("not found"))
+
+        with self.assertRaises(ImageNotFoundException):
+            self.client.get_image_id(IMAGE)
+
+    def test_volume_sizes_returns_sizes_of_volumes_with_prefix(self):
+        self.docker.df = Mock(return_value={"Volumes": [
+            {"Name": "prefix-a", "UsageData": {"Size": 10}},
+            {"Name": "prefix-b", "UsageData": {"Size": -1}},
+            {"Name": "other", "UsageData": {"Size": 5}}]})
+
+        self.assertEqual(self.client.volume_sizes("prefix-"), {"prefix-a": 10, "prefix-b": None})
+
+    def test_remove_volumes_removes_only_volumes_starting_with_prefix(self):
+        volumes = [Mock(), Mock()]
+        volumes[0].name, volumes[1].name = "prefix-a", "not-prefix-a"
+        self.docker.volumes.list = Mock(return_value=volumes)
+
+        self.assertEqual(self.client.remove_volumes("prefix-"), 1)
+        volumes[0].remove.assert_called_once_with(force=True)
+        volumes[1].remove.assert_not_called()
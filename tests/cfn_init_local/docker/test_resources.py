@@ -1,15 +1,24 @@
+import gzip
+import os
+import tempfile
 import unittest
 from unittest.mock import Mock
 from cfn_init_local.docker.resources import CFNInitLocalContainer
+from cfn_init_local.docker.exceptions import ContainerNotReadyException, CommandTimeoutException, DockerException
 
 IMAGE = "image"
 RUN_CMD = "run_cmd"
-METADATA = {"metadata": "metadata"}
-CFN_RESOURCE_DATA = {"cfn_data": "cfn_data"}
-EXPECTED_START_SERVER_CMD_FORMAT = "/usr/bin/env python3 /var/cfn-init-local/server.py" \
-                                   " --metadata '{metadata}'" \
-                                   " --cfn-resource '{resource}'" \
-                                   " --container-mode"
+METADATA = '{"metadata": "metadata"}'
+CFN_RESOURCE_DATA = '{"cfn_data": "cfn_data"}'
+EXPECTED_START_SERVER_CMD = "/usr/bin/env python3 /var/cfn-init-local/server.py" \
+                            " --container-mode" \
+                            " --ready-file /var/cfn-init-local/ready" \
+                            " --metadata-file /var/cfn-init-local/metadata.json" \
+                            " --cfn-resource-file /var/cfn-init-local/cfn-resource.json"
+EXPECTED_FILES = {
+    "/var/cfn-init-local/metadata.json": METADATA.encode("utf-8"),
+    "/var/cfn-init-local/cfn-resource.json": CFN_RESOURCE_DATA.encode("utf-8")
+}
 EXPECTED_CFN_INIT_CMD_FORMAT = "/opt/aws/bin/cfn-init -v --stack {stack} --resource {resource} --url http://127.0.0.1:5001"
 
 
@@ -23,11 +32,46 @@ class TestCFNInitLocalContainer(unittest.TestCase):
     def test_create(self):
         container = CFNInitLocalContainer.create(IMAGE, METADATA, self.resource, self.stack)
         self.assertEqual(container.image, IMAGE)
-        expected_run_cmd = EXPECTED_START_SERVER_CMD_FORMAT.format(metadata=METADATA, resource=CFN_RESOURCE_DATA)
-        self.assertEqual(container.run_cmd, expected_run_cmd)
+        self.assertEqual(container.run_cmd, EXPECTED_START_SERVER_CMD)
+        self.assertDictEqual(container.files, EXPECTED_FILES)
         self.assertEqual(container.resource, self.resource)
         self.assertEqual(container.stack, self.stack)
 
+    def test_create_with_quotes_in_payload_keeps_them_out_of_run_cmd(self):
+        self.resource.describe_stack_resource_response = '{"command": "echo \'quoted\'"}'
+        container = CFNInitLocalContainer.create(IMAGE, METADATA, self.resource, self.stack)
+        self.assertEqual(container.run_cmd, EXPECTED_START_SERVER_CMD)
+        self.assertIn(b"echo 'quoted'", container.files["/var/cfn-init-local/cfn-resource.json"])
+
+    def test_create_with_artifact_mirrors_mounts_them_and_serves_https_urls_over_http(self):
+        self.resource.describe_stack_resource_response = '{"source": "https://bucket/releases/app.tar.gz"}'
+        container = CFNInitLocalContainer.create(IMAGE, METADATA, self.resource, self.stack,
+                                                 {"https://bucket/releases/": "/mirror"})
+        self.assertEqual(container.run_cmd, EXPECTED_START_SERVER_CMD +
+                         " --artifact-mirror https://bucket/releases/=/var/cfn-init-local/mirrors/0")
+        self.assertDictEqual(container.volumes, {"/mirror": {"bind": "/var/cfn-init-local/mirrors/0", "mode": "ro"}})
+        self.assertIn(b'"http://bucket/releases/app.tar.gz"', container.files["/var/cfn-init-local/cfn-resource.json"])
+
+    def test_create_with_package_cache_volume_mounts_it(self):
+        container = CFNInitLocalContainer.create(IMAGE, METADATA, self.resource, self.stack,
+                                                 package_cache_volume="volume")
+        self.assertDictEqual(container.volumes, {"volume": {"bind": "/var/cfn-init-local/package-cache", "mode": "rw"}})
+
+    def test_create_with_imds_v2_only_passes_it_to_server(self):
+        container = CFNInitLocalContainer.create(IMAGE, METADATA, self.resource, self.stack, imds_v2_only=True)
+        self.assertEqual(container.run_cmd, EXPECTED_START_SERVER_CMD + " --imds-v2-only")
+
+    def test_update_puts_payload_files_in_one_request(self):
+        docker_container = Mock()
+        container = CFNInitLocalContainer(IMAGE, RUN_CMD, docker_container, self.resource, self.stack)
+        resource = Mock()
+        resource.describe_stack_resource_response = CFN_RESOURCE_DATA
+
+        container.update(METADATA, resource)
+
+        docker_container.put_archive.assert_called_once()
+        self.assertEqual(container.resource, resource)
+
     def test_run_cfn_init(self):
         docker_container = Mock()
         docker_container.exec_run = Mock(return_value=(0, b"result"))
@@ -41,4 +85,101 @@ class TestCFNInitLocalContainer(unittest.TestCase):
         expected_cmd = EXPECTED_CFN_INIT_CMD_FORMAT.format(stack="stack", resource="resource")
         docker_container.exec_run.assert_called_once_with(expected_cmd)
 
+    def test_run_cfn_init_with_config_sets(self):
+        docker_container = Mock()
+        docker_container.exec_run = Mock(return_value=(0, b"result"))
+        self.resource.name = "resource"
+        self.stack.name = "stack"
+
+        container = CFNInitLocalContainer(IMAGE, RUN_CMD, docker_container, self.resource, self.stack)
+
+        container.run_cfn_init(["first", "second"])
+        expected_cmd = EXPECTED_CFN_INIT_CMD_FORMAT.format(stack="stack", resource="resource")
+        docker_container.exec_run.assert_called_once_with(expected_cmd + " --configsets first,second")
+
+    def test_run_cfn_init_with_timeout_wraps_command(self):
+        docker_container = Mock()
+        docker_container.exec_run = Mock(return_value=(0, b"result"))
+        self.resource.name = "resource"
+        self.stack.name = "stack"
+
+        container = CFNInitLocalContainer(IMAGE, RUN_CMD, docker_container, self.resource, self.stack)
+
+        container.run_cfn_init(timeout=60)
+        expected_cmd = EXPECTED_CFN_INIT_CMD_FORMAT.format(stack="stack", resource="resource")
+        docker_container.exec_run.assert_called_once_with("timeout -k 10 60 " + expected_cmd)
+
+    def test_run_cfn_init_when_timed_out_throws_timeout_exception(self):
+        docker_container = Mock()
+        docker_container.exec_run = Mock(return_value=(124, b"partial output"))
+
+        container = CFNInitLocalContainer(IMAGE, RUN_CMD, docker_container, self.resource, self.stack)
+
+        with self.assertRaises(CommandTimeoutException) as context:
+            container.run_cfn_init(timeout=60)
+        self.assertEqual(context.exception.output, "partial output")
+
+    def test_run_cfn_init_without_timeout_does_not_treat_exit_code_as_timeout(self):
+        docker_container = Mock()
+        docker_container.exec_run = Mock(return_value=(124, b"output"))
+
+        container = CFNInitLocalContainer(IMAGE, RUN_CMD, docker_container, self.resource, self.stack)
+
+        with self.assertRaises(DockerException) as context:
+            container.run_cfn_init()
+        self.assertNotIsInstance(context.exception, CommandTimeoutException)
+
+    def test_run_cfn_init_with_output_streams_command(self):
+        docker_container = Mock()
+        docker_container.client.api.exec_create = Mock(return_value={"Id": "exec"})
+        docker_container.client.api.exec_start = Mock(return_value=iter([b"result"]))
+        docker_container.client.api.exec_inspect = Mock(return_value={"ExitCode": 0})
+        output = Mock()
+        output.text = "result"
+
+        container = CFNInitLocalContainer(IMAGE, RUN_CMD, docker_container, self.resource, self.stack)
+
+        self.assertEqual(container.run_cfn_init(output=output), "result")
+        output.write.assert_called_once_with(b"result")
+        docker_container.exec_run.assert_not_called()
+
+    def test_collect_artifacts_stages_paths_and_fetches_them_once(self):
+        docker_container = Mock()
+        docker_container.exec_run = Mock(return_value=(0, b""))
+        docker_container.get_archive = Mock(return_value=(iter([b"tar", b"data"]), {}))
+        container = CFNInitLocalContainer(IMAGE, RUN_CMD, docker_container, self.resource, self.stack)
+
+        with tempfile.TemporaryDirectory() as directory:
+            destination = os.path.join(directory, "stack", "resource.tar.gz")
+            container.collect_artifacts(["/var/log/cfn-init.log", "/opt/my app/out"], destination)
+
+            with gzip.open(destination) as fh:
+                self.assertEqual(fh.read(), b"tardata")
+        cmd = docker_container.exec_run.call_args[0][0]
+        self.assertEqual(cmd[:2], ["/bin/sh", "-c"])
+        self.assertIn("/var/log/cfn-init.log '/opt/my app/out'", cmd[2])
+        docker_container.get_archive.assert_called_once_with("/var/cfn-init-local/artifacts")
+
+    def test_wait_until_ready_returns_time_from_start_to_ready(self):
+        docker_container = Mock()
+        container = CFNInitLocalContainer(IMAGE, RUN_CMD, None, self.resource, self.stack)
+        container.set_container(docker_container)
+        ready_at = container.started_at + 1.5
+        docker_container.exec_run = Mock(return_value=(0, str(ready_at).encode()))
+
+        time_to_ready = container.wait_until_ready(5)
+
+        self.assertAlmostEqual(time_to_ready, 1.5)
+        self.assertAlmostEqual(container.time_to_ready, 1.5)
+        cmd = docker_container.exec_run.call_args[0][0]
+        self.assertIn("/var/cfn-init-local/ready", cmd)
+        self.assertIn("-gt 50 ]", cmd)
+
+    def test_wait_until_ready_when_never_ready_throws_error(self):
+        docker_container = Mock()
+        docker_container.exec_run = Mock(return_value=(1, b""))
+        container = CFNInitLocalContainer(IMAGE, RUN_CMD, docker_container, self.resource, self.stack)
 
+        with self.assertRaises(ContainerNotReadyException):
+            container.wait_until_ready(1)
+        self.assertIsNone(container.time_to_ready)
@@ -0,0 +1,166 @@
+import json
+import os
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch, Mock
+from cfn_init_local.drivers.batch_driver import BatchDriver
+
+IMAGE = "image"
+OTHER_IMAGE = "other_image"
+TEMPLATE = {
+    "Resources": {
+        "First": {"Metadata": {"AWS::CloudFormation::Init": {"config": {"commands": {}}}}},
+        "Second": {"Metadata": {"AWS::CloudFormation::Init": {"config": {"files": {}}}}},
+        "NoInit": {}
+    }
+}
+
+
+@patch("cfn_init_local.drivers.run_driver.CFNInitLocalContainer")
+class TestBatchDriver(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.client = Mock()
+        self.client.get_image_id = Mock(side_effect=lambda image: "sha256:" + image)
+        self.pod = Mock()
+        self.pod.__enter__ = Mock(return_value=self.pod)
+        self.pod.__exit__ = Mock(return_value=False)
+        self.pod.retained_containers = Mock(return_value=[])
+        self.pod.teardown_duration = 0.0
+        self.client.create_pod = Mock(return_value=self.pod)
+        self.driver = BatchDriver(self.client)
+
+    def test_execute_runs_every_resource_of_every_template_in_one_pod(self, containercls):
+        self.write_template("a.json")
+        self.write_template("b.json")
+        self.write_file("notes.txt", "not a template")
+        containercls.create = Mock(side_effect=lambda **kwargs: Mock())
+
+        self.driver.execute(templates=[self.directory.name], image=IMAGE, parallelism=3, no_cache=True,
+                            cache_dir=self.directory.name)
+
+        self.assertEqual(containercls.create.call_count, 4)
+        stacks = sorted({kwargs["stack"].name for _, kwargs in containercls.create.call_args_list})
+        self.assertListEqual(stacks, ["a", "b"])
+        self.client.create_pod.assert_called_once()
+        self.assertEqual(self.client.create_pod.call_args[1]["max_concurrent_requests"], 3)
+        for container in self.client.create_pod.call_args[0][0]:
+            self.assertEqual(container.run_cfn_init.call_count, 2)
+        self.client.get_image_id.assert_called_once_with(IMAGE)
+
+    def test_execute_with_glob_only_runs_matching_templates(self, containercls):
+        self.write_template("a.json")
+        self.write_template("b.yaml")
+        containercls.create = Mock(side_effect=lambda **kwargs: Mock())
+
+        self.driver.execute(templates=[os.path.join(self.directory.name, "*.json")], image=IMAGE, no_cache=True,
+                            cache_dir=self.directory.name)
+
+        self.assertEqual(containercls.create.call_count, 2)
+
+    def test_execute_with_manifest_uses_images_and_names_from_manifest(self, containercls):
+        self.write_template("a.json")
+        self.write_template("b.json")
+        manifest = self.write_file("manifest.json", json.dumps({"templates": [
+            {"path": "a.json", "name": "StackA", "image": OTHER_IMAGE},
+            {"path": "b.json"}
+        ]}))
+        containercls.create = Mock(side_effect=lambda **kwargs: Mock())
+
+        self.driver.execute(manifest=manifest, image=IMAGE, no_cache=True, cache_dir=self.directory.name)
+
+        images = {kwargs["stack"].name: kwargs["image"] for _, kwargs in containercls.create.call_args_list}
+        self.assertDictEqual(images, {"StackA": OTHER_IMAGE, "b": IMAGE})
+
+    def test_execute_runs_resources_of_nested_stacks_under_nested_stack_names(self, containercls):
+        self.write_file("child.json", json.dumps({
+            "Parameters": {"Env": {"Type": "String"}},
+            "Resources": {"Child": {"Metadata": {"AWS::CloudFormation::Init": {"config": {"commands": {
+                "env": {"command": {"Fn::Sub": "echo ${Env}"}}}}}}}}
+        }))
+        self.write_file("parent.json", json.dumps({"Resources": {
+            "Nested": {"Type": "AWS::CloudFormation::Stack",
+                       "Properties": {"TemplateURL": "child.json", "Parameters": {"Env": "prod"}}},
+            "Parent": TEMPLATE["Resources"]["First"]
+        }}))
+        containercls.create = Mock(side_effect=lambda **kwargs: Mock())
+
+        self.driver.execute(templates=[os.path.join(self.directory.name, "parent.json")], image=IMAGE, no_cache=True,
+                            cache_dir=self.directory.name)
+
+        created = {(kwargs["stack"].name, kwargs["resource"].name): kwargs["resource"]
+                   for _, kwargs in containercls.create.call_args_list}
+        self.assertListEqual(sorted(created), [("parent", "Parent"), ("parent-Nested", "Child")])
+        child_config = created[("parent-Nested", "Child")].get_config("config")
+        self.assertEqual(child_config["commands"]["env"]["command"], "echo prod")
+
+    def test_execute_names_templates_sharing_a_file_name_after_their_relative_path(self, containercls):
+        for directory in ("a", "b"):
+            os.makedirs(os.path.join(self.directory.name, directory))
+            self.write_template(os.path.join(directory, "template.json"))
+        containercls.create = Mock(side_effect=lambda **kwargs: Mock())
+
+        self.driver.execute(templates=[os.path.join(self.directory.name, "*", "template.json")], image=IMAGE,
+                            no_cache=True, cache_dir=self.directory.name)
+
+        stacks = sorted({kwargs["stack"].name for _, kwargs in containercls.create.call_args_list})
+        self.assertListEqual(stacks, ["a-template", "b-template"])
+
+    def test_execute_with_templates_sharing_a_name_throws_error(self, containercls):
+        self.write_template("a.json")
+        self.write_template("b.json")
+        manifest = self.write_file("manifest.json", json.dumps({"templates": [
+            {"path": "a.json", "name": "Stack"}, {"path": "b.json", "name": "Stack"}
+        ]}))
+        with self.assertRaises(ValueError):
+            self.driver.execute(manifest=manifest, image=IMAGE, no_cache=True, cache_dir=self.directory.name)
+        containercls.create.assert_not_called()
+
+    @patch("cfn_init_local.drivers.batch_driver.LOGGER")
+    def test_execute_logs_summary_counting_each_status(self, logger, containercls):
+        template = json.loads(json.dumps(TEMPLATE))
+        template["Resources"]["Second"]["Metadata"]["AWS::CloudFormation::Init"]["config"] = {"comands": {}}
+        self.write_file("a.json", json.dumps(template))
+        containercls.create = Mock(side_effect=lambda **kwargs: Mock())
+
+        self.driver.execute(templates=[self.directory.name], image=IMAGE, no_cache=True,
+                            cache_dir=self.directory.name)
+
+        summary = [args for args, _ in logger.info.call_args_list if args[0].startswith("Batch summary")][0]
+        self.assertEqual(summary[2], 1)
+        self.assertTrue(summary[3].endswith(": 1 passed, 1 failed, 0 cached, 0 not run"))
+
+    @patch("cfn_init_local.drivers.run_driver.JsonReportWriter")
+    def test_execute_reports_templates_that_can_not_be_loaded_as_failed(self, jsoncls, containercls):
+        self.write_template("a.json")
+        self.write_file("b.json", "{not json")
+        containercls.create = Mock(side_effect=lambda **kwargs: Mock())
+
+        self.driver.execute(templates=[self.directory.name], image=IMAGE, no_cache=True,
+                            cache_dir=self.directory.name, report_json="report.json")
+
+        resources = jsoncls.write.call_args[0][0].resources
+        failed = [resource for resource in resources if resource.stack == "b"]
+        self.assertEqual([(resource.resource, resource.status) for resource in failed], [("b.json", "failed")])
+        self.assertTrue(failed[0].error.startswith("Could not load template"))
+        self.assertEqual(len(resources), 3)
+
+    def test_execute_without_templates_throws_error(self, containercls):
+        with self.assertRaises(ValueError):
+            self.driver.execute(templates=[], image=IMAGE)
+
+    def test_execute_without_image_throws_error(self, containercls):
+        self.write_template("a.json")
+        with self.assertRaises(ValueError):
+            self.driver.execute(templates=[self.directory.name])
+
+    def write_template(self, name):
+        return self.write_file(name, json.dumps(TEMPLATE))
+
+    def write_file(self, name, content):
+        path = os.path.join(self.directory.name, name)
+        with open(path, "w") as fh:
+            fh.write(content)
+        return path
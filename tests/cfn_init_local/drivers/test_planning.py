@@ -0,0 +1,43 @@
+import unittest
+from unittest.mock import Mock
+from cfn_init_local.drivers.planning import ExecutionPlanner
+
+METADATA = '{"metadata": "metadata"}'
+OTHER_METADATA = '{"metadata": "other"}'
+CFN_INIT = {"AWS::CloudFormation::Init": {"config": {"files": {}}}}
+OTHER_CFN_INIT = {"AWS::CloudFormation::Init": {"config": {"commands": {}}}}
+
+
+class ExecutionPlannerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.metadata_factory = Mock()
+        self.metadata_factory.get_metadata = Mock(return_value=METADATA)
+        self.planner = ExecutionPlanner(self.metadata_factory)
+
+    def test_plan_without_dedupe_puts_every_resource_in_its_own_group(self):
+        resources = [self.resource("a", CFN_INIT), self.resource("b", CFN_INIT)]
+        groups = self.planner.plan(resources)
+        self.assertEqual([group.members for group in groups], [[resources[0]], [resources[1]]])
+
+    def test_plan_with_dedupe_groups_identical_resources(self):
+        resources = [self.resource("a", CFN_INIT), self.resource("b", OTHER_CFN_INIT), self.resource("c", CFN_INIT)]
+        groups = self.planner.plan(resources, dedupe=True)
+        self.assertEqual(len(groups), 2)
+        self.assertEqual(groups[0].representative, resources[0])
+        self.assertEqual(groups[0].duplicates, [resources[2]])
+        self.assertEqual(groups[1].members, [resources[1]])
+        self.assertEqual(groups[0].metadata, METADATA)
+
+    def test_plan_with_dedupe_keeps_resources_with_different_metadata_apart(self):
+        resources = [self.resource("a", CFN_INIT), self.resource("b", CFN_INIT)]
+        self.metadata_factory.get_metadata = Mock(side_effect=[METADATA, OTHER_METADATA])
+        groups = self.planner.plan(resources, dedupe=True)
+        self.assertEqual(len(groups), 2)
+
+    @staticmethod
+    def resource(name, cfn_init):
+        resource = Mock()
+        resource.name = name
+        resource.cfn_init = cfn_init
+        return resource
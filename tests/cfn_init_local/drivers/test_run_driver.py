@@ -1,6 +1,12 @@
 
-from unittest.mock import patch, Mock, call
+import json
+import os
+import tempfile
+from unittest.mock import patch, Mock, call, DEFAULT
 from unittest import TestCase
+from cfn_init_local.cloudformation.models import Template
+from cfn_init_local.docker.exceptions import CommandTimeoutException, DockerException
+from cfn_init_local.drivers import run_driver
 from cfn_init_local.drivers.run_driver import RunDriver
 
 
@@ -19,11 +25,27 @@ class TestRunDriver(TestCase):
         self.entered_pod = Mock()
         self.pod = Mock()
         self.pod.__enter__ = Mock(return_value=self.pod)
-        self.pod.__exit__ = Mock()
+        self.pod.__exit__ = Mock(return_value=False)
+        self.pod.retained_containers = Mock(side_effect=lambda: self.pod.containers)
+        self.pod.teardown_duration = 0.0
         self.client.create_pod = Mock(return_value=self.pod)
         self.stack = Mock()
-        self.metadata = Mock()
+        self.metadata = '{"metadata": "metadata"}'
         self.driver = RunDriver(self.client)
+        checkpoint_patcher = patch("cfn_init_local.drivers.run_driver.CheckpointStore")
+        self.checkpointcls = checkpoint_patcher.start()
+        self.addCleanup(checkpoint_patcher.stop)
+        cache_patcher = patch("cfn_init_local.drivers.run_driver.ResultCache")
+        self.cachecls = cache_patcher.start()
+        self.addCleanup(cache_patcher.stop)
+        self.cache = self.cachecls.return_value
+        self.cache.get = Mock(return_value=None)
+        template_cache_patcher = patch("cfn_init_local.drivers.run_driver.TemplateCache")
+        self.templatecachecls = template_cache_patcher.start()
+        self.addCleanup(template_cache_patcher.stop)
+        loader_patcher = patch("cfn_init_local.drivers.run_driver.TemplateLoader")
+        self.loadercls = loader_patcher.start()
+        self.addCleanup(loader_patcher.stop)
 
     def test_execute_when_both_runs_succeeds(self, containercls, factorycls, templatecls):
         resources = [Mock()]
@@ -38,6 +60,7 @@ class TestRunDriver(TestCase):
         self.verify_template_creation_calls(templatecls)
         self.verify_run_calls([2])
         self.verify_exit_called()
+        self.pod.containers[0].mark_failed.assert_not_called()
 
     def test_execute_when_first_run_fails(self, containercls, factorycls, templatecls):
         resources = [Mock()]
@@ -52,6 +75,8 @@ class TestRunDriver(TestCase):
         self.verify_template_creation_calls(templatecls)
         self.verify_run_calls([1])
         self.verify_exit_called()
+        self.pod.containers[0].mark_failed.assert_called_once()
+        self.cache.put.assert_not_called()
 
     def test_execute_when_first_run_fails_for_first_container_but_second_container_succeeds(self, containercls, factorycls, templatecls):
         resources = [Mock(), Mock()]
@@ -82,11 +107,525 @@ class TestRunDriver(TestCase):
         self.verify_run_calls([2])
         self.verify_exit_called()
 
+    def test_execute_with_parallelism_runs_every_container_twice(self, containercls, factorycls, templatecls):
+        resources = [Mock(), Mock(), Mock()]
+        self.mock_stack(templatecls, resources)
+        factory = self.mock_metadata_factory(factorycls)
+        self.mock_containers_with_side_effect("success")
+
+        self.driver.execute(TEMPLATE_NAME, TEMPLATE_BODY, DUMMY_IMAGE, parallelism=3)
+
+        self.verify_container_creation(containercls, resources)
+        self.verify_get_metadata_calls(factory, resources)
+        self.verify_run_calls([2, 2, 2])
+        self.verify_exit_called()
+
+    def test_execute_when_container_never_ready_does_not_run_cfn_init(self, containercls, factorycls, templatecls):
+        resources = [Mock()]
+        self.mock_stack(templatecls, resources)
+        self.mock_metadata_factory(factorycls)
+        self.mock_containers_with_side_effect("success")
+        self.pod.containers[0].wait_until_ready = Mock(side_effect=ValueError)
+
+        self.driver.execute(TEMPLATE_NAME, TEMPLATE_BODY, DUMMY_IMAGE, ready_timeout=5)
+
+        self.pod.containers[0].wait_until_ready.assert_called_once_with(5)
+        self.verify_run_calls([0])
+        self.pod.containers[0].mark_failed.assert_called_once()
+        self.verify_exit_called()
+
+    def test_execute_skips_resources_with_cached_results(self, containercls, factorycls, templatecls):
+        resources = [Mock(), Mock()]
+        self.mock_stack(templatecls, resources)
+        self.mock_metadata_factory(factorycls)
+        self.mock_containers_with_side_effect("success")
+        self.cache.get = Mock(side_effect=[{"resource": "cached"}, None])
+
+        self.driver.execute(TEMPLATE_NAME, TEMPLATE_BODY, DUMMY_IMAGE)
+
+        self.verify_container_creation(containercls, resources[1:])
+        self.assertEqual(containercls.create.call_count, 1)
+        self.cache.evict.assert_called_once()
+
+    def test_execute_with_no_cache_runs_cached_resources(self, containercls, factorycls, templatecls):
+        resources = [Mock()]
+        self.mock_stack(templatecls, resources)
+        self.mock_metadata_factory(factorycls)
+        self.mock_containers_with_side_effect("success")
+        self.cache.get = Mock(return_value={"resource": "cached"})
+
+        self.driver.execute(TEMPLATE_NAME, TEMPLATE_BODY, DUMMY_IMAGE, no_cache=True)
+
+        self.verify_container_creation(containercls, resources)
+        self.cache.get.assert_not_called()
+        self.cache.put.assert_called_once()
+
+    def test_execute_with_exec_timeout_passes_timeout_to_every_run(self, containercls, factorycls, templatecls):
+        self.mock_stack(templatecls, [Mock()])
+        self.mock_metadata_factory(factorycls)
+        self.mock_containers_with_side_effect("success")
+
+        self.driver.execute(TEMPLATE_NAME, TEMPLATE_BODY, DUMMY_IMAGE, exec_timeout=60)
+
+        self.pod.containers[0].run_cfn_init.assert_has_calls([call(output=None, timeout=60),
+                                                              call(None, output=None, timeout=60)])
+
+    def test_execute_with_log_dir_writes_both_runs_to_resource_log(self, containercls, factorycls, templatecls):
+        resources = [Mock()]
+        resources[0].name = "Resource"
+        self.stack.name = "stack"
+        self.mock_stack(templatecls, resources)
+        self.mock_metadata_factory(factorycls)
+        self.pod.containers[0].run_cfn_init = Mock(side_effect=self.stream_lines(["first\n", "second\n"]))
+
+        with tempfile.TemporaryDirectory() as log_dir:
+            self.driver.execute(TEMPLATE_NAME, TEMPLATE_BODY, DUMMY_IMAGE, log_dir=log_dir)
+
+            with open(os.path.join(log_dir, "stack", "Resource.log")) as fh:
+                self.assertEqual(fh.read(), "first\nsecond\n")
+        self.cache.put.assert_called_once()
+
+    @patch("cfn_init_local.drivers.run_driver.JsonReportWriter")
+    def test_execute_with_artifacts_dir_collects_from_every_container(self, jsoncls, containercls, factorycls,
+                                                                       templatecls):
+        resources = [Mock(), Mock()]
+        resources[0].name, resources[1].name = "First", "Second"
+        self.stack.name = "stack"
+        self.mock_stack(templatecls, resources)
+        self.mock_metadata_factory(factorycls)
+        self.mock_containers_with_side_effect("success")
+        self.pod.containers[1].collect_artifacts = Mock(side_effect=ValueError("gone"))
+
+        self.driver.execute(TEMPLATE_NAME, TEMPLATE_BODY, DUMMY_IMAGE, artifacts_dir="artifacts",
+                            artifact_paths=["/opt/app.log"], report_json="report.json")
+
+        paths = ["/var/log/cfn-init.log", "/var/log/cfn-init-cmd.log", "/opt/app.log"]
+        self.pod.containers[0].collect_artifacts.assert_called_once_with(
+            paths, os.path.join("artifacts", "stack", "First.tar.gz"))
+        self.pod.containers[1].collect_artifacts.assert_called_once_with(
+            paths, os.path.join("artifacts", "stack", "Second.tar.gz"))
+        report = jsoncls.write.call_args[0][0]
+        self.assertEqual([resource.artifacts for resource in report.resources],
+                         [os.path.join("artifacts", "stack", "First.tar.gz"), None])
+
+    def test_execute_without_artifacts_dir_does_not_collect(self, containercls, factorycls, templatecls):
+        self.mock_stack(templatecls, [Mock()])
+        self.mock_metadata_factory(factorycls)
+        self.mock_containers_with_side_effect("success")
+
+        self.driver.execute(TEMPLATE_NAME, TEMPLATE_BODY, DUMMY_IMAGE)
+
+        self.pod.containers[0].collect_artifacts.assert_not_called()
+
+    def test_execute_evaluates_template_with_parameters(self, containercls, factorycls, templatecls):
+        self.mock_stack(templatecls, [])
+        self.mock_metadata_factory(factorycls)
+
+        self.driver.execute(TEMPLATE_NAME, TEMPLATE_BODY, DUMMY_IMAGE, parameters={"Env": "prod"})
+
+        self.stack.evaluator.assert_called_once_with({"Env": "prod"})
+        self.assertEqual(self.stack.get_resources_using_cfn_init.call_args[0][0], self.stack.evaluator.return_value)
+
+    def test_execute_with_unresolvable_ref_serves_metadata_as_written(self, containercls, factorycls, templatecls):
+        self.mock_metadata_factory(factorycls)
+        command = {"command": {"Fn::Sub": "echo ${Env}"}}
+        self.loadercls.return_value.load = Mock(return_value=Template(TEMPLATE_NAME, {
+            "Parameters": {"Env": {"Type": "String"}},
+            "Resources": {"Instance": {"Metadata": {"AWS::CloudFormation::Init": {"config": {"commands": {
+                "env": command}}}}}}
+        }))
+        self.client.create_pod = Mock(side_effect=lambda containers, **kwargs: self.pod)
+        self.pod.containers = []
+
+        self.driver.execute(TEMPLATE_NAME, TEMPLATE_BODY, DUMMY_IMAGE)
+
+        resource = containercls.create.call_args[1]["resource"]
+        self.assertEqual(resource.get_config("config")["commands"]["env"], command)
+
+    def test_execute_with_no_evaluate_does_not_evaluate_template(self, containercls, factorycls, templatecls):
+        self.mock_stack(templatecls, [])
+        self.mock_metadata_factory(factorycls)
+
+        self.driver.execute(TEMPLATE_NAME, TEMPLATE_BODY, DUMMY_IMAGE, parameters={"Env": "prod"}, no_evaluate=True)
+
+        self.stack.evaluator.assert_not_called()
+        self.stack.get_resources_using_cfn_init.assert_called_once()
+        self.assertIsNone(self.stack.get_resources_using_cfn_init.call_args[0][0])
+
+    def test_execute_with_fail_fast_skips_resources_after_a_failure(self, containercls, factorycls, templatecls):
+        resources = [Mock(), Mock()]
+        self.mock_stack(templatecls, resources)
+        self.mock_metadata_factory(factorycls)
+        self.mock_containers_with_side_effect(ValueError)
+
+        self.driver.execute(TEMPLATE_NAME, TEMPLATE_BODY, DUMMY_IMAGE, fail_fast=True)
+
+        self.verify_run_calls([1, 0])
+        self.pod.containers[0].mark_failed.assert_called_once()
+        self.pod.containers[1].wait_until_ready.assert_not_called()
+        self.pod.containers[1].mark_failed.assert_not_called()
+
+    def test_execute_without_fail_fast_runs_resources_after_a_failure(self, containercls, factorycls, templatecls):
+        resources = [Mock(), Mock()]
+        self.mock_stack(templatecls, resources)
+        self.mock_metadata_factory(factorycls)
+        self.mock_containers_with_side_effect(ValueError)
+
+        self.driver.execute(TEMPLATE_NAME, TEMPLATE_BODY, DUMMY_IMAGE)
+
+        self.verify_run_calls([1, 1])
+
+    @patch("cfn_init_local.drivers.run_driver.JUnitReportWriter")
+    @patch("cfn_init_local.drivers.run_driver.JsonReportWriter")
+    def test_execute_with_reports_writes_outcome_of_every_resource(self, jsoncls, junitcls, containercls, factorycls,
+                                                                    templatecls):
+        resources = [Mock(), Mock(), Mock()]
+        self.mock_stack(templatecls, resources)
+        self.mock_metadata_factory(factorycls)
+        self.mock_containers_with_side_effect("success")
+        self.pod.containers[1].run_cfn_init = Mock(side_effect=["success", ValueError("broken")])
+        self.cache.get = Mock(side_effect=[{"resource": "cached"}, None, None])
+
+        self.driver.execute(TEMPLATE_NAME, TEMPLATE_BODY, DUMMY_IMAGE, report_json="report.json",
+                            report_junit="report.xml")
+
+        report = jsoncls.write.call_args[0][0]
+        jsoncls.write.assert_called_once_with(report, "report.json")
+        junitcls.write.assert_called_once_with(report, "report.xml")
+        self.assertEqual([resource.status for resource in report.resources], ["cached", "passed", "failed"])
+        self.assertEqual(report.resources[1].first_run.exit_code, 0)
+        self.assertEqual(report.resources[2].second_run.error, "broken")
+        self.assertEqual(report.resources[2].second_run.exception.args, ("broken",))
+        self.assertIsNotNone(report.duration)
+
+    def test_execute_with_failed_runs_writes_reports(self, containercls, factorycls, templatecls):
+        resources = [Mock(), Mock()]
+        self.mock_stack(templatecls, resources)
+        self.mock_metadata_factory(factorycls)
+        self.stack.name = "stack"
+        for index, (resource, container) in enumerate(zip(resources, self.pod.containers)):
+            resource.name = "Resource{}".format(index)
+            container.id = "container{}".format(index)
+            container.create_duration = container.teardown_duration = 0.1
+        self.pod.containers[0].run_cfn_init = Mock(side_effect=DockerException(1, "failed"))
+        self.pod.containers[1].run_cfn_init = Mock(side_effect=["success", CommandTimeoutException(124, "", 5)])
+
+        with tempfile.TemporaryDirectory() as directory:
+            report_json, report_junit = os.path.join(directory, "report.json"), os.path.join(directory, "report.xml")
+            self.driver.execute(TEMPLATE_NAME, TEMPLATE_BODY, DUMMY_IMAGE, report_json=report_json,
+                                report_junit=report_junit)
+            with open(report_json) as fh:
+                resources = json.load(fh)["resources"]
+            self.assertTrue(os.path.exists(report_junit))
+
+        self.assertEqual([resource["status"] for resource in resources], ["failed", "failed"])
+        self.assertEqual(resources[0]["first_run"]["error"], "Exit Code: 1; Message: failed")
+        self.assertEqual(resources[1]["second_run"]["error"], "Timed out after 5 seconds; Exit Code: 124; Message: ")
+
+    @patch("cfn_init_local.drivers.run_driver.JsonReportWriter")
+    def test_execute_skips_resources_with_invalid_cfn_init_before_creating_containers(self, jsoncls, containercls,
+                                                                                     factorycls, templatecls):
+        resources = [Mock(), Mock()]
+        resources[1].name = "Invalid"
+        self.mock_stack(templatecls, resources)
+        resources[1].cfn_init = {"AWS::CloudFormation::Init": {"config": {"comands": {}}}}
+        self.mock_metadata_factory(factorycls)
+        self.mock_containers_with_side_effect("success")
+
+        self.driver.execute(TEMPLATE_NAME, TEMPLATE_BODY, DUMMY_IMAGE, report_json="report.json")
+
+        containercls.create.assert_called_once_with(image=DUMMY_IMAGE, metadata=self.metadata, resource=resources[0],
+                                                    stack=self.stack, artifact_mirrors={},
+                                                    package_cache_volume=None, imds_v2_only=False)
+        invalid = jsoncls.write.call_args[0][0].resources[0]
+        self.assertEqual((invalid.resource, invalid.status), ("Invalid", "failed"))
+        self.assertIn("Metadata.AWS::CloudFormation::Init.config.comands", invalid.error)
+
+    @patch("cfn_init_local.drivers.run_driver.JsonReportWriter")
+    def test_execute_when_template_can_not_be_loaded_reports_it_as_failed(self, jsoncls, containercls, factorycls,
+                                                                          templatecls):
+        self.loadercls.return_value.load = Mock(side_effect=ImportError("PyYAML is required"))
+
+        self.driver.execute(TEMPLATE_NAME, TEMPLATE_BODY, DUMMY_IMAGE, report_json="report.json")
+
+        containercls.create.assert_not_called()
+        failed = jsoncls.write.call_args[0][0].resources[0]
+        self.assertEqual((failed.stack, failed.status), (TEMPLATE_NAME, "failed"))
+        self.assertIn("PyYAML is required", failed.error)
+
+    def test_execute_with_no_validate_runs_invalid_resources(self, containercls, factorycls, templatecls):
+        resources = [Mock()]
+        self.mock_stack(templatecls, resources)
+        resources[0].cfn_init = {"AWS::CloudFormation::Init": {"config": {"comands": {}}}}
+        self.mock_metadata_factory(factorycls)
+        self.mock_containers_with_side_effect("success")
+
+        self.driver.execute(TEMPLATE_NAME, TEMPLATE_BODY, DUMMY_IMAGE, no_validate=True)
+
+        self.verify_run_calls([2])
+
+    @patch("cfn_init_local.drivers.run_driver.JsonReportWriter")
+    def test_execute_without_reports_does_not_write_reports(self, jsoncls, containercls, factorycls, templatecls):
+        self.mock_stack(templatecls, [Mock()])
+        self.mock_metadata_factory(factorycls)
+        self.mock_containers_with_side_effect("success")
+
+        self.driver.execute(TEMPLATE_NAME, TEMPLATE_BODY, DUMMY_IMAGE)
+
+        jsoncls.write.assert_not_called()
+
+    def test_execute_with_clear_cache_clears_cache(self, containercls, factorycls, templatecls):
+        self.mock_stack(templatecls, [])
+        self.mock_metadata_factory(factorycls)
+
+        self.driver.execute(TEMPLATE_NAME, TEMPLATE_BODY, DUMMY_IMAGE, clear_cache=True)
+
+        self.cache.clear.assert_called_once()
+        self.templatecachecls.return_value.clear.assert_called_once()
+
+    def test_execute_with_no_template_cache_loads_without_cache(self, containercls, factorycls, templatecls):
+        self.mock_stack(templatecls, [])
+        self.mock_metadata_factory(factorycls)
+
+        self.driver.execute(TEMPLATE_NAME, TEMPLATE_BODY, DUMMY_IMAGE, no_template_cache=True)
+
+        self.loadercls.assert_called_once_with(False, template_cache=None)
+
+    def test_execute_with_dedupe_runs_identical_resources_once(self, containercls, factorycls, templatecls):
+        resources = [Mock(), Mock(), Mock()]
+        self.mock_stack(templatecls, resources[:2])
+        resources[2].cfn_init = resources[0].cfn_init
+        self.stack.get_resources_using_cfn_init = Mock(return_value=resources)
+        self.mock_metadata_factory(factorycls)
+        self.mock_containers_with_side_effect("success")
+
+        self.driver.execute(TEMPLATE_NAME, TEMPLATE_BODY, DUMMY_IMAGE, dedupe=True)
+
+        self.verify_container_creation(containercls, resources[:2])
+        self.assertEqual(containercls.create.call_count, 2)
+        self.verify_run_calls([2, 2])
+
+    def test_execute_without_dedupe_runs_identical_resources_separately(self, containercls, factorycls, templatecls):
+        resources = [Mock(), Mock()]
+        self.mock_stack(templatecls, resources)
+        resources[1].cfn_init = resources[0].cfn_init
+        self.mock_metadata_factory(factorycls)
+        self.mock_containers_with_side_effect("success")
+
+        self.driver.execute(TEMPLATE_NAME, TEMPLATE_BODY, DUMMY_IMAGE)
+
+        self.verify_container_creation(containercls, resources)
+        self.assertEqual(containercls.create.call_count, 2)
+
+    def test_execute_with_checkpoint_starts_containers_from_checkpoint_and_runs_plan(self, containercls, factorycls,
+                                                                                     templatecls):
+        resources = [Mock()]
+        self.mock_stack(templatecls, resources)
+        self.mock_metadata_factory(factorycls)
+        self.mock_containers_with_side_effect("success")
+        plan = Mock()
+        plan.restored_steps = []
+        self.checkpointcls.return_value.plan = Mock(return_value=plan)
+
+        self.driver.execute(TEMPLATE_NAME, TEMPLATE_BODY, DUMMY_IMAGE, checkpoint=True)
+
+        containercls.create.assert_called_once_with(image=plan.start_image, metadata=self.metadata,
+                                                    resource=plan.resource, stack=self.stack, artifact_mirrors={},
+                                                    package_cache_volume=None, imds_v2_only=False)
+        self.checkpointcls.run.assert_called_once_with(self.pod.containers[0], plan, output=None, timeout=None)
+        self.pod.containers[0].run_cfn_init.assert_called_once_with(plan.config_sets, output=None, timeout=None)
+
+    @patch("cfn_init_local.drivers.run_driver.JsonReportWriter")
+    def test_execute_with_all_config_sets_runs_each_config_set_in_its_own_container(self, jsoncls, containercls,
+                                                                                    factorycls, templatecls):
+        resources = [Mock()]
+        resources[0].name = "Resource"
+        resources[0].config_set_names = ["install", "configure"]
+        self.mock_stack(templatecls, resources + resources)
+        self.mock_metadata_factory(factorycls)
+        self.mock_containers_with_side_effect("success")
+        self.stack.get_resources_using_cfn_init = Mock(return_value=resources)
+
+        self.driver.execute(TEMPLATE_NAME, TEMPLATE_BODY, DUMMY_IMAGE, all_config_sets=True, report_json="r.json")
+
+        self.assertEqual(containercls.create.call_count, 2)
+        for container, config_set in zip(self.pod.containers, ["install", "configure"]):
+            container.run_cfn_init.assert_has_calls([call([config_set], output=None, timeout=None)] * 2)
+        report = jsoncls.write.call_args[0][0]
+        self.assertEqual([resource.name for resource in report.resources], ["Resource[install]", "Resource[configure]"])
+        self.assertEqual(self.cache.put.call_count, 2)
+
+    def test_execute_with_config_sets_runs_only_selected_config_sets(self, containercls, factorycls, templatecls):
+        resources = [Mock(), Mock()]
+        resources[0].config_set_names = ["install", "configure"]
+        resources[1].config_set_names = ["default"]
+        self.mock_stack(templatecls, resources)
+        self.mock_metadata_factory(factorycls)
+        self.mock_containers_with_side_effect("success")
+
+        self.driver.execute(TEMPLATE_NAME, TEMPLATE_BODY, DUMMY_IMAGE, config_sets=["configure"])
+
+        self.assertEqual(containercls.create.call_count, 1)
+        self.pod.containers[0].run_cfn_init.assert_called_with(["configure"], output=None, timeout=None)
+
+    def test_execute_with_config_sets_and_all_config_sets_throws_error(self, containercls, factorycls, templatecls):
+        with self.assertRaises(ValueError):
+            self.driver.execute(TEMPLATE_NAME, TEMPLATE_BODY, DUMMY_IMAGE, config_sets=["a"], all_config_sets=True)
+
+    def test_execute_with_artifact_mirrors_passes_absolute_paths_to_containers(self, containercls, factorycls,
+                                                                              templatecls):
+        self.mock_stack(templatecls, [Mock()])
+        self.mock_metadata_factory(factorycls)
+        self.mock_containers_with_side_effect("success")
+
+        with tempfile.TemporaryDirectory() as mirror:
+            self.driver.execute(TEMPLATE_NAME, TEMPLATE_BODY, DUMMY_IMAGE, artifact_mirrors={"https://bucket/": mirror})
+
+        self.assertEqual(containercls.create.call_args[1]["artifact_mirrors"],
+                         {"https://bucket/": os.path.abspath(mirror)})
+
+    def test_execute_with_imds_v2_only_passes_it_to_containers(self, containercls, factorycls, templatecls):
+        self.mock_stack(templatecls, [Mock()])
+        self.mock_metadata_factory(factorycls)
+        self.mock_containers_with_side_effect("success")
+
+        self.driver.execute(TEMPLATE_NAME, TEMPLATE_BODY, DUMMY_IMAGE, imds_v2_only=True)
+
+        self.assertTrue(containercls.create.call_args[1]["imds_v2_only"])
+        self.assertEqual(self.cachecls.key.call_args[0][4], {"imds_v2_only": True})
+
+    def test_execute_with_missing_artifact_mirror_path_throws_error(self, containercls, factorycls, templatecls):
+        with self.assertRaises(ValueError):
+            self.driver.execute(TEMPLATE_NAME, TEMPLATE_BODY, DUMMY_IMAGE, artifact_mirrors={"https://b/": "/missing"})
+        containercls.create.assert_not_called()
+
+    @patch("cfn_init_local.drivers.run_driver.PackageCache")
+    def test_execute_with_package_cache_seeds_and_publishes_packages(self, packagecls, containercls, factorycls,
+                                                                     templatecls):
+        self.mock_stack(templatecls, [Mock()])
+        self.mock_metadata_factory(factorycls)
+        self.mock_containers_with_side_effect("success")
+        packagecls.return_value.volume = Mock(return_value="volume")
+        packagecls.return_value.sizes = Mock(return_value={"volume": 1024})
+
+        self.driver.execute(TEMPLATE_NAME, TEMPLATE_BODY, DUMMY_IMAGE, package_cache=True, clear_package_cache=True)
+
+        packagecls.return_value.clear.assert_called_once()
+        packagecls.return_value.volume.assert_called_with(DUMMY_IMAGE)
+        self.assertEqual(containercls.create.call_args[1]["package_cache_volume"], "volume")
+        packagecls.seed.assert_called_once_with(self.pod.containers[0])
+        packagecls.return_value.publish.assert_called_once_with(self.pod.containers[0])
+        packagecls.return_value.sizes.assert_called_once()
+
+    @patch("cfn_init_local.drivers.run_driver.PackageCache")
+    def test_execute_when_seeding_packages_fails_still_runs_without_publishing(self, packagecls, containercls,
+                                                                               factorycls, templatecls):
+        self.mock_stack(templatecls, [Mock()])
+        self.mock_metadata_factory(factorycls)
+        self.mock_containers_with_side_effect("success")
+        packagecls.seed = Mock(side_effect=ValueError("no flock"))
+
+        self.driver.execute(TEMPLATE_NAME, TEMPLATE_BODY, DUMMY_IMAGE, package_cache=True)
+
+        self.verify_run_calls([2])
+        packagecls.return_value.publish.assert_not_called()
+        self.cache.put.assert_called_once()
+
+    def test_execute_without_checkpoint_does_not_plan_checkpoints(self, containercls, factorycls, templatecls):
+        resources = [Mock()]
+        self.mock_stack(templatecls, resources)
+        self.mock_metadata_factory(factorycls)
+        self.mock_containers_with_side_effect("success")
+
+        self.driver.execute(TEMPLATE_NAME, TEMPLATE_BODY, DUMMY_IMAGE)
+
+        self.checkpointcls.return_value.plan.assert_not_called()
+        self.checkpointcls.run.assert_not_called()
+
+    @patch("cfn_init_local.drivers.run_driver.FileWatcher")
+    def test_execute_with_watch_reruns_only_changed_resources_in_fresh_containers(self, watchercls, containercls,
+                                                                                 factorycls, templatecls):
+        resources = [Mock(), Mock()]
+        self.mock_stack(templatecls, resources)
+        self.mock_metadata_factory(factorycls)
+        self.mock_containers_with_side_effect("success")
+        watchercls.return_value.wait = Mock(side_effect=self.edit_then_interrupt(resources[1]))
+        new_container = containercls.create.return_value
+        new_container.run_cfn_init = Mock(side_effect="success")
+
+        self.driver.execute(TEMPLATE_NAME, TEMPLATE_BODY, DUMMY_IMAGE, watch=True)
+
+        watchercls.assert_called_once_with([TEMPLATE_BODY], run_driver.DEFAULT_WATCH_INTERVAL)
+        self.assertEqual(containercls.create.call_count, 3)
+        self.client.start_container.assert_called_once_with(new_container)
+        self.pod.add_container.assert_called_once_with(new_container)
+        self.pod.discard_container.assert_called_once_with(self.pod.containers[1])
+        self.assertEqual(new_container.run_cfn_init.call_count, 2)
+        self.verify_exit_called()
+
+    @patch("cfn_init_local.drivers.run_driver.FileWatcher")
+    def test_execute_with_watch_and_reuse_reruns_changed_resources_in_existing_containers(self, watchercls,
+                                                                                         containercls, factorycls,
+                                                                                         templatecls):
+        resources = [Mock(), Mock()]
+        self.mock_stack(templatecls, resources)
+        self.mock_metadata_factory(factorycls)
+        self.mock_containers_with_side_effect("success")
+        watchercls.return_value.wait = Mock(side_effect=self.edit_then_interrupt(resources[1]))
+
+        self.driver.execute(TEMPLATE_NAME, TEMPLATE_BODY, DUMMY_IMAGE, watch=True, reuse_containers=True)
+
+        self.client.start_container.assert_not_called()
+        self.pod.containers[1].update.assert_called_once_with(self.metadata, resources[1])
+        self.verify_run_calls([2, 4])
+
+    @patch("cfn_init_local.drivers.run_driver.FileWatcher")
+    def test_execute_with_watch_and_reuse_clears_failed_mark_when_rerun_passes(self, watchercls, containercls,
+                                                                               factorycls, templatecls):
+        resources = [Mock(), Mock()]
+        self.mock_stack(templatecls, resources)
+        self.mock_metadata_factory(factorycls)
+        self.mock_containers_with_side_effect("success")
+        self.pod.containers[1].run_cfn_init = Mock(side_effect=[DockerException(1, "failed"), "success", "success"])
+        watchercls.return_value.wait = Mock(side_effect=self.edit_then_interrupt(resources[1]))
+
+        self.driver.execute(TEMPLATE_NAME, TEMPLATE_BODY, DUMMY_IMAGE, watch=True, reuse_containers=True)
+
+        self.pod.containers[1].mark_failed.assert_called_once()
+        self.pod.containers[1].clear_failed.assert_called_once()
+        self.pod.containers[0].clear_failed.assert_not_called()
+
+    @staticmethod
+    def edit_then_interrupt(resource):
+        def wait():
+            if resource.cfn_init.get("edited"):
+                raise KeyboardInterrupt()
+            resource.cfn_init = dict(resource.cfn_init, edited=True)
+            return [TEMPLATE_BODY]
+        return wait
+
+    @staticmethod
+    def stream_lines(lines):
+        pending = list(lines)
+
+        def run_cfn_init(*args, output=None, timeout=None):
+            output.write(pending.pop(0).encode("utf-8"))
+            return output.text
+        return run_cfn_init
+
     def mock_stack(self, templatecls, resources):
         containers = [Mock() for _ in range(len(resources))]
+        for index, (container, resource) in enumerate(zip(containers, resources)):
+            container.resource = resource
+            resource.cfn_init = {"AWS::CloudFormation::Init": {"config": {"commands": {str(index): {"command": "true"}}}}}
         self.stack.get_resources_using_cfn_init = Mock(return_value=resources)
-        templatecls.from_file_path = Mock(return_value=self.stack)
+        self.stack.nested_stacks = {}
+        self.stack.path = TEMPLATE_BODY
+        self.loadercls.return_value.load = Mock(return_value=self.stack)
         self.pod.containers = containers
+        # containers created for the stack's resources are the ones in the pod, anything created later is new
+        pending = list(containers)
+        run_driver.CFNInitLocalContainer.create.side_effect = lambda **kwargs: pending.pop(0) if pending else DEFAULT
 
     def mock_metadata_factory(self, factorycls):
         factory = Mock()
@@ -99,7 +638,9 @@ class TestRunDriver(TestCase):
             container.run_cfn_init = Mock(side_effect=side_effect)
 
     def verify_container_creation(self, containercls, resources):
-        calls = [call(image=DUMMY_IMAGE, metadata=self.metadata, resource=resource, stack=self.stack) for resource in resources]
+        calls = [call(image=DUMMY_IMAGE, metadata=self.metadata, resource=resource, stack=self.stack,
+                      artifact_mirrors={}, package_cache_volume=None, imds_v2_only=False)
+                 for resource in resources]
         containercls.create.assert_has_calls(calls)
 
     def verify_run_calls(self, num_calls):
@@ -111,7 +652,8 @@ class TestRunDriver(TestCase):
         factory.get_metadata.assert_has_calls(calls)
 
     def verify_template_creation_calls(self, templatecls):
-        templatecls.from_file_path.assert_called_once_with(TEMPLATE_BODY, TEMPLATE_NAME)
+        self.loadercls.assert_called_once_with(False, template_cache=self.templatecachecls.return_value)
+        self.loadercls.return_value.load.assert_called_once_with(TEMPLATE_BODY, TEMPLATE_NAME)
 
     def verify_exit_called(self):
         self.assertEqual(self.pod.__exit__.call_count, 1)
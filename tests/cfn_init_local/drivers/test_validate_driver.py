@@ -0,0 +1,55 @@
+import json
+import os
+import tempfile
+from unittest import TestCase
+from cfn_init_local.drivers.validate_driver import ValidateDriver
+
+VALID_RESOURCE = {"Metadata": {"AWS::CloudFormation::Init": {"config": {"commands": {"a": {"command": "true"}}}}}}
+
+
+class TestValidateDriver(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.driver = ValidateDriver()
+
+    def test_execute_when_every_block_is_valid_returns_zero(self):
+        path = self.write("template.json", {"Resources": {"Valid": VALID_RESOURCE, "Bucket": {}}})
+
+        self.assertEqual(self.driver.execute("Stack", path), 0)
+
+    def test_execute_counts_problems_of_nested_stacks_after_evaluation(self):
+        self.write("child.json", {
+            "Parameters": {"Mode": {"Type": "String"}},
+            "Resources": {"Child": {"Metadata": {"AWS::CloudFormation::Init": {"config": {
+                "files": {"/f": {"content": "", "mode": {"Ref": "Mode"}}},
+                "services": {"upstart": {}}}}}}}
+        })
+        path = self.write("template.json", {"Resources": {
+            "Valid": VALID_RESOURCE,
+            "Nested": {"Type": "AWS::CloudFormation::Stack",
+                       "Properties": {"TemplateURL": "child.json", "Parameters": {"Mode": "rw"}}}
+        }})
+
+        self.assertEqual(self.driver.execute("Stack", path), 2)
+        self.assertEqual(self.driver.execute("Stack", path, no_evaluate=True), 1)
+
+    def test_execute_when_template_cannot_be_evaluated_returns_problem(self):
+        path = self.write("template.json", {"Resources": {"Bad": {"Metadata": {"AWS::CloudFormation::Init": {
+            "config": {"commands": {"a": {"command": {"Ref": "Missing"}}}}}}}}})
+
+        self.assertEqual(self.driver.execute("Stack", path), 1)
+
+    def test_execute_when_template_cannot_be_parsed_returns_problem(self):
+        path = os.path.join(self.directory.name, "template.yaml")
+        with open(path, "w") as fh:
+            fh.write("Resources: [unclosed\n")
+
+        self.assertEqual(self.driver.execute("Stack", path), 1)
+
+    def write(self, name, body):
+        path = os.path.join(self.directory.name, name)
+        with open(path, "w") as fh:
+            json.dump(body, fh)
+        return path
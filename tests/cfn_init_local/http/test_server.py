@@ -1,6 +1,12 @@
 
+import http.client
+import io
+import os
+import tarfile
+import tempfile
 import unittest
-from cfn_init_local.http.server import DataProducer, NotFoundException
+from cfn_init_local.http.server import ArtifactServer, ArtifactStore, AsynchronousServerWrapper, \
+    CloudFormationServer, DataProducer, MetadataServer, NotFoundException, ReloadableData, TokenTable
 
 
 class MetadataServerTest(unittest.TestCase):
@@ -25,3 +31,180 @@ class MetadataServerTest(unittest.TestCase):
         data = server.get_data("foo")
         self.assertSetEqual(set(data.split("\n")), {"biz", "bar"})
 
+    def test_get_key_with_trailing_slash_matches_page_without_it(self):
+        server = DataProducer({"meta-data/": {"instance-id": "i-1234", "network/": {"mac": "00:00"}}})
+        self.assertEqual(server.get_data("/meta-data/network/mac/"), "00:00")
+        self.assertEqual(server.get_data(""), "meta-data/")
+        self.assertSetEqual(set(server.get_data("meta-data/").split("\n")), {"instance-id", "network/"})
+
+    def test_get_nested_key_chain_returns_deepest_string(self):
+        server = DataProducer({"foo": {"bar": "baz"}})
+        self.assertEqual(server.get_bytes("foo/bar/biz/bur"), b"baz")
+        with self.assertRaises(NotFoundException):
+            server.get_data("foo/biz/bar")
+
+    def test_servers_keep_connections_alive(self):
+        for server, requests in ((MetadataServer.create_server({"foo": {"bar": "baz"}}, port=0),
+                                  [("/foo/bar", 200, b"baz"), ("/missing", 404, b"Not Found"), ("/foo", 200, b"bar")]),
+                                 (CloudFormationServer.create_server('{"a": 1}', port=0),
+                                  [("/", 200, b'{"a": 1}'), ("/?Action=DescribeStackResource", 200, b'{"a": 1}')])):
+            self.addCleanup(server.server_close)
+            wrapper = AsynchronousServerWrapper(server)
+            wrapper.serve()
+            self.addCleanup(wrapper.shutdown)
+            connection = http.client.HTTPConnection("127.0.0.1", server.server_address[1])
+            self.addCleanup(connection.close)
+            sockets = set()
+            for path, status, body in requests:
+                connection.request("GET", path)
+                response = connection.getresponse()
+                self.assertEqual((response.version, response.status, response.getheader("Content-Length"),
+                                  response.read()), (11, status, str(len(body)), body))
+                sockets.add(connection.sock)
+            self.assertEqual(len(sockets), 1)
+
+
+class TokenTableTest(unittest.TestCase):
+
+    def test_tokens_are_valid_until_their_ttl_passes(self):
+        now = [100.0]
+        tokens = TokenTable(clock=lambda: now[0])
+        token = tokens.issue(60)
+        self.assertTrue(tokens.is_valid(token))
+        self.assertFalse(tokens.is_valid("unknown"))
+        now[0] = 160.0
+        self.assertFalse(tokens.is_valid(token))
+
+    def test_parse_ttl(self):
+        self.assertEqual(TokenTable.parse_ttl("21600"), 21600)
+        for value in (None, "", "abc", "0", "21601"):
+            self.assertIsNone(TokenTable.parse_ttl(value))
+
+    def test_imds_v2_only_server_requires_token(self):
+        server = MetadataServer.create_server({"foo": "bar"}, port=0, imds_v2_only=True)
+        self.addCleanup(server.server_close)
+        wrapper = AsynchronousServerWrapper(server)
+        wrapper.serve()
+        self.addCleanup(wrapper.shutdown)
+        connection = http.client.HTTPConnection("127.0.0.1", server.server_address[1])
+        self.addCleanup(connection.close)
+
+        def request(method, path, headers):
+            connection.request(method, path, headers=headers)
+            response = connection.getresponse()
+            return response.status, response.read()
+
+        self.assertEqual(request("GET", "/foo", {})[0], 401)
+        self.assertEqual(request("PUT", "/latest/api/token", {})[0], 400)
+        status, token = request("PUT", "/latest/api/token", {"X-aws-ec2-metadata-token-ttl-seconds": "60"})
+        self.assertEqual(status, 200)
+        self.assertEqual(request("GET", "/foo", {"X-aws-ec2-metadata-token": token.decode()}), (200, b"bar"))
+        self.assertEqual(request("GET", "/foo", {"X-aws-ec2-metadata-token": "invalid"})[0], 401)
+
+
+class ReloadableDataTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.path = os.path.join(self.directory.name, "data")
+
+    def test_get_without_path_returns_initial_data(self):
+        self.assertEqual(ReloadableData("initial").get(), "initial")
+
+    def test_get_when_file_does_not_exist_returns_initial_data(self):
+        self.assertEqual(ReloadableData("initial", self.path).get(), "initial")
+
+    def test_get_returns_parsed_file_contents_and_reloads_when_replaced(self):
+        data = ReloadableData("initial", self.path, str.upper)
+        self.write("first")
+        self.assertEqual(data.get(), "FIRST")
+        self.write("second!")
+        self.assertEqual(data.get(), "SECOND!")
+
+    def test_get_reads_file_as_utf8(self):
+        self.write("caf\u00e9 \u2713")
+        self.assertEqual(ReloadableData("initial", self.path).get(), "caf\u00e9 \u2713")
+
+    def write(self, content):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "wb") as fh:
+            fh.write(content.encode("utf-8"))
+        os.replace(tmp_path, self.path)
+
+
+class ArtifactStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.root = os.path.join(self.directory.name, "root")
+        os.makedirs(os.path.join(self.root, "app"))
+        with open(os.path.join(self.root, "app", "app.tar.gz"), "wb") as fh:
+            fh.write(b"tarball")
+        self.archive = os.path.join(self.directory.name, "bundle.tar")
+        with tarfile.open(self.archive, "w") as tar:
+            info = tarfile.TarInfo("./conf/app.conf")
+            info.size = 4
+            tar.addfile(info, io.BytesIO(b"conf"))
+        self.compressed = os.path.join(self.directory.name, "bundle.tar.gz")
+        with tarfile.open(self.compressed, "w:gz") as tar:
+            tar.add(self.archive, "bundle.tar")
+        self.store = ArtifactStore({"https://bucket.s3.amazonaws.com/releases/": self.root,
+                                    "http://example.com/bundle/": self.archive,
+                                    "http://example.com/bundle.tar": self.archive,
+                                    "http://example.com/bundle.tar.gz": self.compressed})
+
+    def test_resolve_serves_files_of_directory_regardless_of_scheme(self):
+        path, offset, size = self.store.resolve("http://bucket.s3.amazonaws.com/releases/app/app.tar.gz?v=1")
+        self.assertEqual((path, offset, size), (os.path.realpath(os.path.join(self.root, "app", "app.tar.gz")), 0, 7))
+
+    def test_resolve_serves_members_of_tar_archive(self):
+        path, offset, size = self.store.resolve("http://example.com/bundle/conf/app.conf")
+        with open(path, "rb") as fh:
+            fh.seek(offset)
+            self.assertEqual(fh.read(size), b"conf")
+
+    def test_resolve_serves_file_for_its_prefix(self):
+        self.assertEqual(self.store.resolve("http://example.com/bundle.tar")[2], os.path.getsize(self.archive))
+
+    def test_resolve_serves_compressed_tar_archive_whole(self):
+        self.assertEqual(self.store.resolve("http://example.com/bundle.tar.gz"),
+                         (os.path.realpath(self.compressed), 0, os.path.getsize(self.compressed)))
+        with self.assertRaises(NotFoundException):
+            self.store.resolve("http://example.com/bundle.tar.gz/bundle.tar")
+
+    def test_resolve_outside_of_directory_throws_not_found_error(self):
+        for url in ("https://bucket.s3.amazonaws.com/releases/../bundle.tar", "https://bucket.s3.amazonaws.com/other",
+                    "http://example.com/bundle/missing"):
+            with self.assertRaises(NotFoundException):
+                self.store.resolve(url)
+
+    def test_parse_range(self):
+        self.assertIsNone(ArtifactServer.parse_range(None, 10))
+        self.assertIsNone(ArtifactServer.parse_range("bytes=0-1,4-5", 10))
+        self.assertEqual(ArtifactServer.parse_range("bytes=2-4", 10), (2, 4))
+        self.assertEqual(ArtifactServer.parse_range("bytes=2-", 10), (2, 9))
+        self.assertEqual(ArtifactServer.parse_range("bytes=-3", 10), (7, 9))
+        self.assertEqual(ArtifactServer.parse_range("bytes=5-100", 10), (5, 9))
+        self.assertFalse(ArtifactServer.parse_range("bytes=10-", 10))
+
+    def test_server_sends_content_length_and_ranges(self):
+        server = ArtifactServer.create_server({"http://example.com/bundle/": self.archive}, port=0)
+        self.addCleanup(server.server_close)
+        wrapper = AsynchronousServerWrapper(server)
+        wrapper.serve()
+        self.addCleanup(wrapper.shutdown)
+        connection = http.client.HTTPConnection("127.0.0.1", server.server_address[1])
+        self.addCleanup(connection.close)
+
+        connection.request("GET", "/bundle/conf/app.conf", headers={"Host": "example.com"})
+        response = connection.getresponse()
+        self.assertEqual((response.status, response.getheader("Content-Length"), response.read()), (200, "4", b"conf"))
+
+        connection = http.client.HTTPConnection("127.0.0.1", server.server_address[1])
+        connection.request("GET", "http://example.com/bundle/conf/app.conf", headers={"Range": "bytes=1-2"})
+        response = connection.getresponse()
+        self.assertEqual((response.status, response.getheader("Content-Range"), response.read()),
+                         (206, "bytes 1-2/4", b"on"))
+        connection.close()
@@ -0,0 +1,75 @@
+from unittest import TestCase
+from cfn_init_local.report.models import CommandResult, ResourceReport, RunReport, PASSED, FAILED, CACHED, \
+    PHASE_CREATE, PHASE_FIRST_RUN, PHASE_TEARDOWN
+
+
+class CommandResultTest(TestCase):
+
+    def test_status_when_exit_code_zero_is_passed(self):
+        self.assertEqual(CommandResult(0, "output", 1.0).status, PASSED)
+
+    def test_status_when_exit_code_non_zero_is_failed(self):
+        self.assertEqual(CommandResult(1, "output", 1.0, "error").status, FAILED)
+
+    def test_status_when_command_never_completed_is_failed(self):
+        self.assertEqual(CommandResult(None, "", 1.0, "error").status, FAILED)
+
+    def test_to_dict(self):
+        self.assertEqual(CommandResult(0, "output", 1.5).to_dict(),
+                         {"status": PASSED, "exit_code": 0, "duration": 1.5, "error": None, "output": "output"})
+
+
+class ResourceReportTest(TestCase):
+
+    def test_duration_sums_known_phases(self):
+        report = ResourceReport("stack", "resource", PASSED, timings={PHASE_CREATE: 1.0, PHASE_FIRST_RUN: 2.5,
+                                                                      PHASE_TEARDOWN: None})
+        self.assertEqual(report.duration, 3.5)
+
+    def test_to_dict_includes_every_phase(self):
+        result = ResourceReport("stack", "resource", PASSED, timings={PHASE_CREATE: 1.0}).to_dict()
+        self.assertEqual(result["timings"][PHASE_CREATE], 1.0)
+        self.assertIsNone(result["timings"][PHASE_TEARDOWN])
+        self.assertEqual(len(result["timings"]), 5)
+
+    def test_to_dict_includes_runs(self):
+        result = ResourceReport("stack", "resource", FAILED, first_run=CommandResult(0, "first", 1.0),
+                                second_run=CommandResult(1, "second", 1.0, "error")).to_dict()
+        self.assertEqual(result["first_run"]["output"], "first")
+        self.assertEqual(result["second_run"]["status"], FAILED)
+
+
+class RunReportTest(TestCase):
+
+    def test_add_replaces_earlier_outcome_of_same_resource(self):
+        report = RunReport()
+        report.add(ResourceReport("stack", "first", FAILED))
+        report.add(ResourceReport("stack", "second", PASSED))
+        report.add(ResourceReport("stack", "first", PASSED))
+        self.assertEqual([(resource.resource, resource.status) for resource in report.resources],
+                         [("first", PASSED), ("second", PASSED)])
+
+    def test_add_keeps_outcomes_of_each_config_set(self):
+        report = RunReport()
+        report.add(ResourceReport("stack", "first", FAILED, config_set="install"))
+        report.add(ResourceReport("stack", "first", PASSED, config_set="configure"))
+        report.add(ResourceReport("stack", "first", PASSED, config_set="install"))
+        self.assertEqual([(resource.name, resource.status) for resource in report.resources],
+                         [("first[install]", PASSED), ("first[configure]", PASSED)])
+
+    def test_passed_when_any_resource_failed_is_false(self):
+        report = RunReport()
+        report.add(ResourceReport("stack", "first", CACHED))
+        self.assertTrue(report.passed)
+        report.add(ResourceReport("stack", "second", FAILED))
+        self.assertFalse(report.passed)
+
+    def test_to_dict_summarizes_statuses(self):
+        report = RunReport(started_at=0)
+        report.add(ResourceReport("stack", "first", CACHED))
+        report.add(ResourceReport("stack", "second", PASSED))
+        report.complete()
+        result = report.to_dict()
+        self.assertEqual(result["summary"], {PASSED: 1, FAILED: 0, CACHED: 1, "not_run": 0})
+        self.assertEqual(len(result["resources"]), 2)
+        self.assertIsNotNone(result["duration"])
@@ -0,0 +1,53 @@
+import json
+import os
+import tempfile
+import xml.etree.ElementTree as ElementTree
+from unittest import TestCase
+from cfn_init_local.report.models import CommandResult, ResourceReport, RunReport, PASSED, FAILED, CACHED, \
+    PHASE_FIRST_RUN
+from cfn_init_local.report.writers import JsonReportWriter, JUnitReportWriter
+
+
+class ReportWriterTest(TestCase):
+
+    def setUp(self):
+        self.report = RunReport(started_at=0)
+        self.report.add(ResourceReport("first-stack", "Passed", PASSED, "id", first_run=CommandResult(0, "ok", 1.0),
+                                       second_run=CommandResult(0, "ok again", 1.0), timings={PHASE_FIRST_RUN: 1.0}))
+        self.report.add(ResourceReport("first-stack", "Failed", FAILED, "id", first_run=CommandResult(0, "ok", 1.0),
+                                       second_run=CommandResult(2, "not idempotent", 1.0, "error")))
+        self.report.add(ResourceReport("second-stack", "Cached", CACHED))
+        self.report.complete()
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+
+    def test_json_writer_writes_report_dict(self):
+        path = os.path.join(self.dir.name, "report.json")
+        JsonReportWriter.write(self.report, path)
+        with open(path) as fh:
+            self.assertEqual(json.load(fh), self.report.to_dict())
+
+    def test_junit_writer_writes_suite_per_stack(self):
+        path = os.path.join(self.dir.name, "report.xml")
+        JUnitReportWriter.write(self.report, path)
+        suites = ElementTree.parse(path).getroot()
+        self.assertEqual([suite.get("name") for suite in suites], ["first-stack", "second-stack"])
+        self.assertEqual(suites[0].get("tests"), "2")
+        self.assertEqual(suites[0].get("failures"), "1")
+        self.assertEqual(suites[1].get("skipped"), "1")
+
+    def test_junit_writer_reports_failures_with_failing_run_output(self):
+        suites = JUnitReportWriter.to_element(self.report)
+        failure = suites[0][1].find("failure")
+        self.assertEqual(failure.get("message"), "Second run of cfn-init failed with exit code 2")
+        self.assertEqual(failure.text, "not idempotent")
+
+    def test_junit_writer_reports_passes_with_output(self):
+        case = JUnitReportWriter.to_element(self.report)[0][0]
+        self.assertIsNone(case.find("failure"))
+        self.assertEqual(case.find("system-out").text, "ok\nok again")
+        self.assertEqual(case.get("time"), "1.000")
+
+    def test_junit_writer_reports_cached_resources_as_skipped(self):
+        case = JUnitReportWriter.to_element(self.report)[1][0]
+        self.assertIsNotNone(case.find("skipped"))
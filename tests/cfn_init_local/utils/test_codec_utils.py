@@ -0,0 +1,27 @@
+import json
+import unittest
+from unittest.mock import patch
+from cfn_init_local.utils import codec_utils
+from cfn_init_local.utils.codec_utils import JsonCodec
+
+DATA = {"key": ["value", 1, 1.5, True, None, {"nested": "ü"}]}
+
+
+class JsonCodecTest(unittest.TestCase):
+
+    def test_dumps_and_loads_round_trip(self):
+        self.assertEqual(JsonCodec.loads(JsonCodec.dumps(DATA)), DATA)
+        self.assertEqual(json.loads(JsonCodec.dumps(DATA)), DATA)
+
+    def test_round_trip_without_orjson(self):
+        with patch.object(codec_utils, "orjson", None):
+            self.assertEqual(JsonCodec.loads(JsonCodec.dumps(DATA)), DATA)
+
+    def test_dumps_falls_back_for_data_orjson_cannot_encode(self):
+        self.assertEqual(json.loads(JsonCodec.dumps({"big": 2 ** 70})), {"big": 2 ** 70})
+
+    def test_loads_invalid_json_throws_value_error(self):
+        with self.assertRaises(ValueError):
+            JsonCodec.loads("{")
+        with patch.object(codec_utils, "orjson", None), self.assertRaises(ValueError):
+            JsonCodec.loads("{")
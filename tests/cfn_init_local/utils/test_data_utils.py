@@ -0,0 +1,25 @@
+import unittest
+from unittest.mock import patch, Mock
+from cfn_init_local.utils.data_utils import MetadataPathFactory, DEFAULT_METADATA_PATH
+from cfn_init_local.utils.io_utils import IOUtils
+
+
+class MetadataPathFactoryTest(unittest.TestCase):
+
+    @patch.object(IOUtils, "read_file", side_effect=lambda path: path)
+    def test_get_metadata_looks_up_resources_by_name(self, read_file):
+        resource = Mock()
+        resource.__str__ = Mock(return_value="WebServer")
+        factory = MetadataPathFactory({"WebServer": "web.json"})
+
+        self.assertEqual(factory.get_metadata(resource), "web.json")
+        self.assertEqual(factory.get_metadata("Other"), DEFAULT_METADATA_PATH)
+
+    @patch.object(IOUtils, "read_file", side_effect=lambda path: path)
+    def test_get_metadata_reads_each_file_once(self, read_file):
+        factory = MetadataPathFactory()
+
+        for resource in ["First", "Second", "Third"]:
+            factory.get_metadata(resource)
+
+        read_file.assert_called_once_with(DEFAULT_METADATA_PATH)
@@ -0,0 +1,34 @@
+import gzip
+import os
+import tempfile
+import unittest
+from cfn_init_local.utils.io_utils import IOUtils
+
+
+class IOUtilsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def test_write_stream_writes_every_chunk(self):
+        path = os.path.join(self.directory.name, "nested", "file")
+        self.assertEqual(IOUtils.write_stream(iter([b"first", b"second"]), path), 11)
+        with open(path, "rb") as fh:
+            self.assertEqual(fh.read(), b"firstsecond")
+
+    def test_write_stream_with_compress_gzips(self):
+        path = os.path.join(self.directory.name, "file.gz")
+        IOUtils.write_stream(iter([b"first", b"second"]), path, compress=True)
+        with gzip.open(path) as fh:
+            self.assertEqual(fh.read(), b"firstsecond")
+
+    def test_write_stream_when_stream_fails_leaves_no_file(self):
+        def chunks():
+            yield b"first"
+            raise ValueError("failed")
+
+        path = os.path.join(self.directory.name, "file")
+        with self.assertRaises(ValueError):
+            IOUtils.write_stream(chunks(), path)
+        self.assertListEqual(os.listdir(self.directory.name), [])
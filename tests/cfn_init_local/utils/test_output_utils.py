@@ -0,0 +1,42 @@
+import os
+import tempfile
+import unittest
+from cfn_init_local.utils.output_utils import StreamedOutput, TRUNCATED_MARKER
+
+
+class StreamedOutputTest(unittest.TestCase):
+
+    def setUp(self):
+        self.lines = []
+
+    def test_write_passes_on_complete_lines_across_chunks(self):
+        output = StreamedOutput(self.lines.append)
+        output.write(b"first li")
+        output.write(b"ne\r\nsecond")
+        self.assertListEqual(self.lines, ["first line"])
+        output.close()
+        self.assertListEqual(self.lines, ["first line", "second"])
+        self.assertEqual(output.text, "first line\r\nsecond")
+
+    def test_write_decodes_characters_split_across_chunks(self):
+        output = StreamedOutput(self.lines.append)
+        data = "café\n".encode("utf-8")
+        output.write(data[:4])
+        output.write(data[4:])
+        self.assertListEqual(self.lines, ["café"])
+
+    def test_text_keeps_only_tail_of_output(self):
+        output = StreamedOutput(max_buffered_chars=5)
+        output.write(b"abc")
+        output.write(b"defgh")
+        self.assertEqual(output.text, TRUNCATED_MARKER + "defgh")
+
+    def test_log_file_gets_all_output(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "nested", "resource.log")
+            with StreamedOutput(log_path=path, max_buffered_chars=1) as output:
+                output.write(b"first\n")
+            with StreamedOutput(log_path=path, append=True) as output:
+                output.write(b"second\n")
+            with open(path) as fh:
+                self.assertEqual(fh.read(), "first\nsecond\n")
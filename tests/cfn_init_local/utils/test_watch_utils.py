@@ -0,0 +1,37 @@
+import os
+import tempfile
+import unittest
+from cfn_init_local.utils.watch_utils import FileWatcher
+
+
+class FileWatcherTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.path = os.path.join(self.directory.name, "template.json")
+        self.write("{}")
+
+    def test_poll_when_nothing_changed_returns_nothing(self):
+        watcher = FileWatcher([self.path])
+        self.assertListEqual(watcher.poll(), [])
+
+    def test_poll_when_file_changed_returns_path_once(self):
+        watcher = FileWatcher([self.path])
+        self.write('{"Resources": {}}')
+        self.assertListEqual(watcher.poll(), [self.path])
+        self.assertListEqual(watcher.poll(), [])
+
+    def test_poll_when_file_deleted_returns_path(self):
+        watcher = FileWatcher([self.path])
+        os.remove(self.path)
+        self.assertListEqual(watcher.poll(), [self.path])
+
+    def test_wait_returns_changed_paths(self):
+        watcher = FileWatcher([self.path], interval=0)
+        self.write('{"Resources": {}}')
+        self.assertListEqual(watcher.wait(), [self.path])
+
+    def write(self, content):
+        with open(self.path, "w") as fh:
+            fh.write(content)